@@ -11,23 +11,48 @@ bl_info = {
     "tracker_url": ""
 }
 
-from . import (
-    properties,
-    operators,
-    panels,
-    geometry_utils,
-    boundary_conditions,
-    therm_export,
-    therm_import,
-    therm_runner
-)
+try:
+    import bpy
+except ImportError:
+    # Poza Blenderem (testy, procesy robocze) używane są tylko moduły bez zależności od bpy
+    bpy = None
+
+if bpy is not None:
+    from . import (
+        properties,
+        operators,
+        panels,
+        geometry_utils,
+        boundary_conditions,
+        therm_export,
+        therm_import,
+        therm_runner,
+        therm_geometry,
+        therm_fingerprint,
+        therm_results,
+        therm_sockets,
+        therm_layers,
+        therm_solver,
+        therm_queue,
+        therm_discovery,
+        therm_backends,
+        therm_progress,
+        therm_timeout,
+        therm_refine,
+        therm_watch,
+        therm_history,
+        therm_filelock,
+        therm_scheduler
+    )
 
 def register():
     properties.register()
     operators.register()
     panels.register()
+    therm_sockets.register()
 
 def unregister():
+    therm_sockets.unregister()
     panels.unregister()
     operators.unregister()
     properties.unregister()
@@ -1,7 +1,7 @@
 import bpy
 import os
 import subprocess
-from . import geometry_utils, boundary_conditions, therm_export, therm_import, therm_runner
+from . import properties, geometry_utils, boundary_conditions, therm_export, therm_import, therm_runner, therm_results, therm_sockets, therm_geometry, therm_layers, therm_queue, therm_backends, therm_refine
 import xml.etree.ElementTree as ET
 import shutil
 import os
@@ -291,16 +291,192 @@ class THERM_OT_create_ufactor_auto(bpy.types.Operator):
 
 # Operatory dla uruchamiania THERM
 class THERM_OT_run_therm_calculation_thmx(bpy.types.Operator):
-    """Uruchom obliczenia THERM z plikiem .thmx"""
+    """Uruchom obliczenia THERM z plikiem .thmx w tle (ESC przerywa obliczenia)"""
     bl_idname = "therm.run_therm_calculation_thmx"
     bl_label = "Uruchom obliczenia THERM (.thmx)"
     bl_description = "Uruchom obliczenia w THERM z plikiem .thmx (wymaga THERM7.exe)"
     
+    # Obliczenia w toku - widoczne dla panelu i operatora anulowania
+    active_solver = None
+    _timer = None
+    
+    @classmethod
+    def poll(cls, context):
+        return THERM_OT_run_therm_calculation_thmx.active_solver is None
+    
     def execute(self, context):
+        # Wywołanie ze skryptu - obliczenia blokujące
         runner = therm_runner.THERMRunner()
         result_type, message = runner.run_calculation_thmx(context)
         self.report(result_type, message)
         return {'FINISHED'}
+    
+    def invoke(self, context, event):
+        self._runner = therm_runner.THERMRunner()
+        thmx_filepath, error = self._runner.project_thmx_path()
+        if not thmx_filepath:
+            self.report({'ERROR'}, error)
+            return {'CANCELLED'}
+        
+        self._fingerprint = None
+        if context.scene.therm_props.reuse_results:
+            self._fingerprint, reused = self._runner.reuse_cached_result(thmx_filepath)
+            if reused:
+                self.report_results(thmx_filepath, "Użyto zapisanych wyników identycznego modelu")
+                return {'FINISHED'}
+        
+        # Zagęszczanie siatki: kolejne poziomy MeshLevel liczone jeden po drugim w tym samym operatorze
+        self._refinement = None
+        settings = self._runner.create_refinement_settings()
+        if settings:
+            self._refinement = therm_refine.MeshRefinement(thmx_filepath, **settings)
+            thmx_filepath = self._refinement.next_input()
+        
+        self._solver = self._runner.start_therm_process_thmx(thmx_filepath)
+        if self._solver is None:
+            self.report({'ERROR'}, "Nie można uruchomić obliczeń THERM. Sprawdź instalację.")
+            return {'CANCELLED'}
+        
+        THERM_OT_run_therm_calculation_thmx.active_solver = self._solver
+        
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.5, window=context.window)
+        wm.modal_handler_add(self)
+        self.update_status(context)
+        return {'RUNNING_MODAL'}
+    
+    def modal(self, context, event):
+        if event.type == 'ESC' and event.value == 'PRESS':
+            self._solver.cancel()
+            return self.finish(context)
+        
+        if event.type == 'TIMER':
+            self._solver.poll()
+            if not self._solver.running:
+                if self._refinement is not None and self.next_refinement_level():
+                    return {'PASS_THROUGH'}
+                return self.finish(context)
+            self.update_status(context)
+        
+        return {'PASS_THROUGH'}
+    
+    def cancel(self, context):
+        # Blender zamyka operator (np. wczytanie pliku) - nie zostawiaj procesu THERM
+        self._solver.cancel()
+        self.cleanup(context)
+    
+    def update_status(self, context):
+        """Czas i etap obliczeń na pasku stanu"""
+        solver = self._solver
+        name = os.path.basename(solver.thmx_filepath)
+        if self._refinement is not None:
+            name += f" (zagęszczanie {self._refinement.level}/{self._refinement.max_level})"
+        context.workspace.status_text_set(
+            f"THERM: {name} - {solver.phase()} - {solver.elapsed:.0f} s / limit {solver.timeout:.0f} s (ESC: anuluj)"
+        )
+    
+    def cleanup(self, context):
+        if self._timer is not None:
+            context.window_manager.event_timer_remove(self._timer)
+            self._timer = None
+        context.workspace.status_text_set(None)
+        THERM_OT_run_therm_calculation_thmx.active_solver = None
+    
+    def next_refinement_level(self):
+        """Zapisuje wynik poziomu siatki i uruchamia kolejny - False, gdy zagęszczanie się kończy"""
+        solver = self._solver
+        if solver.cancelled:
+            return False
+        success = self._runner.finish_therm_process(solver)
+        self._refinement.record(solver.thmx_filepath, success, solver.elapsed)
+        
+        level_thmx = self._refinement.next_input()
+        if not level_thmx:
+            return False
+        next_solver = self._runner.start_therm_process_thmx(level_thmx)
+        if next_solver is None:
+            return False
+        self._solver = next_solver
+        THERM_OT_run_therm_calculation_thmx.active_solver = next_solver
+        return True
+    
+    def finish(self, context):
+        self.cleanup(context)
+        solver = self._solver
+        
+        if self._refinement is not None and not solver.cancelled:
+            if not self._refinement.history or self._refinement.history[-1]['thmx'] != solver.thmx_filepath:
+                self._refinement.record(solver.thmx_filepath, self._runner.finish_therm_process(solver), solver.elapsed)
+            return self.finish_refinement(context)
+        
+        success = self._runner.finish_therm_process(solver)
+        
+        if solver.cancelled:
+            self.report({'WARNING'}, f"Przerwano obliczenia THERM po {solver.elapsed:.0f} s")
+            return {'CANCELLED'}
+        
+        if not success:
+            self.report({'ERROR'}, "Obliczenia THERM zakończone błędem - szczegóły w konsoli")
+            return {'FINISHED'}
+        
+        if self._fingerprint:
+            self._runner.store_result_fingerprint(self._fingerprint, solver.thmx_filepath)
+        
+        self.report_results(solver.thmx_filepath, f"THERM zakończony w {solver.elapsed:.0f} s")
+        for area in context.screen.areas:
+            area.tag_redraw()
+        return {'FINISHED'}
+    
+    def finish_refinement(self, context):
+        """Wyniki ostatniego policzonego poziomu siatki trafiają do pliku projektu"""
+        refinement = self._refinement
+        entry = refinement.finalize()
+        if entry is None:
+            self.report({'ERROR'}, f"Zagęszczanie siatki bez wyników ({refinement.summary()}) - szczegóły w konsoli")
+            return {'FINISHED'}
+        
+        if self._fingerprint:
+            self._runner.store_result_fingerprint(self._fingerprint, refinement.thmx_filepath)
+        
+        total = sum(level['elapsed'] for level in refinement.history)
+        self.report_results(refinement.thmx_filepath, f"{refinement.summary()} w {total:.0f} s")
+        for area in context.screen.areas:
+            area.tag_redraw()
+        return {'FINISHED'}
+    
+    def report_results(self, thmx_filepath, message):
+        """Raportuje U-factors odczytane z pliku .thmx"""
+        try:
+            ufactors = therm_results.read_ufactors(thmx_filepath)
+        except Exception as e:
+            print(f"⚠️  Nie można odczytać wyników: {e}")
+            ufactors = {}
+        
+        for tag, ufactor in ufactors.items():
+            print(f"   {tag}: U = {ufactor} W/m²K")
+        
+        if ufactors:
+            summary = ", ".join(f"{tag}={ufactor:.4f}" if isinstance(ufactor, float) else f"{tag}={ufactor}"
+                                for tag, ufactor in ufactors.items())
+            self.report({'INFO'}, f"{message}: {summary}")
+        else:
+            self.report({'INFO'}, f"{message} (brak U-factors w pliku)")
+
+class THERM_OT_cancel_therm_calculation(bpy.types.Operator):
+    """Przerwij trwające obliczenia THERM"""
+    bl_idname = "therm.cancel_therm_calculation"
+    bl_label = "Przerwij obliczenia THERM"
+    
+    @classmethod
+    def poll(cls, context):
+        return THERM_OT_run_therm_calculation_thmx.active_solver is not None
+    
+    def execute(self, context):
+        solver = THERM_OT_run_therm_calculation_thmx.active_solver
+        if solver is not None:
+            solver.cancel()
+        self.report({'INFO'}, "Przerwano obliczenia THERM")
+        return {'FINISHED'}
 
 class THERM_OT_run_therm_calculation_thm(bpy.types.Operator):
     """Uruchom obliczenia THERM z plikiem .thm"""
@@ -326,6 +502,182 @@ class THERM_OT_open_therm_folder(bpy.types.Operator):
         self.report(result_type, message)
         return {'FINISHED'}
 
+# Kolejka obliczeń THERM projektu (stan w therm_queue.json obok pliku .blend)
+def get_project_queue():
+    """Kolejka folderu projektu lub None dla niezapisanego pliku"""
+    blend_filepath = bpy.data.filepath
+    if not blend_filepath:
+        return None
+    return therm_queue.JobQueue.for_directory(os.path.dirname(blend_filepath))
+
+def refresh_queue_panel():
+    """Timer odświeżający panel, dopóki w kolejce są zadania"""
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+    
+    queue = get_project_queue()
+    if queue is None or not queue.has_pending():
+        return None
+    return 1.0
+
+def start_queue_worker(context, queue):
+    """Uruchamia odłączony proces roboczy kolejki - zwraca (sukces, komunikat)"""
+    props = context.scene.therm_props
+    spool_dir = None
+    therm_exe = ''
+    if props.solver_backend == 'SPOOL':
+        if not props.spool_directory:
+            return False, "Wskaż folder wymiany zadań"
+        spool_dir = bpy.path.abspath(props.spool_directory)
+    else:
+        therm_exe = therm_runner.THERMRunner().find_therm_executable()
+        if not therm_exe:
+            return False, "Nie znaleziono THERM7.exe"
+    
+    max_workers = props.therm_max_workers or os.cpu_count() or 1
+    try:
+        pid = therm_queue.start_worker(queue.directory, therm_exe, max_workers, spool_dir,
+                                       stall_timeout=props.therm_stall_timeout or None)
+    except Exception as e:
+        return False, f"Nie można uruchomić procesu roboczego: {e}"
+    
+    if not bpy.app.timers.is_registered(refresh_queue_panel):
+        bpy.app.timers.register(refresh_queue_panel, first_interval=1.0)
+    
+    if pid is None:
+        return True, "Proces roboczy kolejki już działa"
+    return True, f"Uruchomiono proces roboczy kolejki (PID {pid}, {max_workers} równolegle)"
+
+class THERM_OT_start_spool_worker(bpy.types.Operator):
+    """Uruchamia na tym komputerze proces roboczy liczący zadania z folderu wymiany"""
+    bl_idname = "therm.start_spool_worker"
+    bl_label = "Uruchom proces roboczy"
+    
+    def execute(self, context):
+        props = context.scene.therm_props
+        if not props.spool_directory:
+            self.report({'ERROR'}, "Wskaż folder wymiany zadań")
+            return {'CANCELLED'}
+        
+        therm_exe = therm_runner.THERMRunner().find_therm_executable()
+        if not therm_exe:
+            self.report({'ERROR'}, "Nie znaleziono THERM7.exe")
+            return {'CANCELLED'}
+        
+        max_jobs = props.therm_max_workers or os.cpu_count() or 1
+        try:
+            pid = therm_backends.start_spool_worker(bpy.path.abspath(props.spool_directory), therm_exe, max_jobs,
+                                                    stall_timeout=props.therm_stall_timeout or None)
+        except Exception as e:
+            self.report({'ERROR'}, f"Nie można uruchomić procesu roboczego: {e}")
+            return {'CANCELLED'}
+        
+        self.report({'INFO'}, f"Uruchomiono proces roboczy folderu wymiany (PID {pid}, {max_jobs} naraz)")
+        return {'FINISHED'}
+
+class THERM_OT_queue_project_thmx(bpy.types.Operator):
+    """Dodaje wszystkie pliki .thmx z folderu projektu do kolejki obliczeń"""
+    bl_idname = "therm.queue_project_thmx"
+    bl_label = "Kolejkuj pliki .thmx projektu"
+    
+    def execute(self, context):
+        queue = get_project_queue()
+        if queue is None:
+            self.report({'ERROR'}, "Zapisz plik Blender przed kolejkowaniem obliczeń")
+            return {'CANCELLED'}
+        
+        props = context.scene.therm_props
+        thmx_files = sorted(name for name in os.listdir(queue.directory) if name.lower().endswith('.thmx'))
+        if not thmx_files:
+            self.report({'WARNING'}, "Brak plików .thmx w folderze projektu")
+            return {'CANCELLED'}
+        
+        try:
+            for name in thmx_files:
+                queue.enqueue(os.path.join(queue.directory, name), priority=props.queue_priority,
+                              timeout=props.queue_timeout, retries=props.queue_retries,
+                              adaptive=props.adaptive_timeout, safety_factor=props.timeout_safety_factor)
+        except therm_queue.QueueLockError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        
+        success, message = start_queue_worker(context, queue)
+        self.report({'INFO'} if success else {'ERROR'}, f"Zakolejkowano {len(thmx_files)} plików. {message}")
+        return {'FINISHED'}
+
+class THERM_OT_queue_start_worker(bpy.types.Operator):
+    """Wznawia przetwarzanie kolejki (np. po ponownym uruchomieniu komputera)"""
+    bl_idname = "therm.queue_start_worker"
+    bl_label = "Wznów kolejkę"
+    
+    def execute(self, context):
+        queue = get_project_queue()
+        if queue is None:
+            self.report({'ERROR'}, "Zapisz plik Blender przed kolejkowaniem obliczeń")
+            return {'CANCELLED'}
+        
+        success, message = start_queue_worker(context, queue)
+        self.report({'INFO'} if success else {'ERROR'}, message)
+        return {'FINISHED'} if success else {'CANCELLED'}
+
+class THERM_OT_queue_job(bpy.types.Operator):
+    """Zmienia zadanie kolejki: priorytet, anulowanie, usunięcie lub ponowienie"""
+    bl_idname = "therm.queue_job"
+    bl_label = "Zadanie kolejki"
+    
+    job_id: bpy.props.StringProperty()
+    action: bpy.props.EnumProperty(
+        items=[
+            ('PRIORITY_UP', "Wyższy priorytet", ""),
+            ('PRIORITY_DOWN', "Niższy priorytet", ""),
+            ('CANCEL', "Anuluj", ""),
+            ('REMOVE', "Usuń", ""),
+            ('RETRY', "Ponów", ""),
+        ]
+    )
+    
+    def execute(self, context):
+        queue = get_project_queue()
+        if queue is None:
+            return {'CANCELLED'}
+        
+        try:
+            if self.action in {'PRIORITY_UP', 'PRIORITY_DOWN'}:
+                job = next((job for job in queue.jobs() if job['id'] == self.job_id), None)
+                step = 1 if self.action == 'PRIORITY_UP' else -1
+                changed = job is not None and queue.reprioritize(self.job_id, job['priority'] + step)
+            elif self.action == 'CANCEL':
+                changed = queue.cancel(self.job_id)
+            elif self.action == 'REMOVE':
+                changed = queue.dequeue(self.job_id)
+            else:
+                changed = queue.retry(self.job_id)
+                if changed:
+                    start_queue_worker(context, queue)
+        except therm_queue.QueueLockError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        
+        if not changed:
+            self.report({'WARNING'}, "Nie można zmienić zadania w obecnym stanie")
+            return {'CANCELLED'}
+        return {'FINISHED'}
+
+class THERM_OT_queue_clear_finished(bpy.types.Operator):
+    """Usuwa z listy zakończone, błędne i anulowane zadania"""
+    bl_idname = "therm.queue_clear_finished"
+    bl_label = "Wyczyść zakończone"
+    
+    def execute(self, context):
+        queue = get_project_queue()
+        if queue is None:
+            return {'CANCELLED'}
+        removed = queue.clear_finished()
+        self.report({'INFO'}, f"Usunięto {removed} zadań z listy")
+        return {'FINISHED'}
+
 # Operator importu THERM
 class THERM_OT_import_from_therm(bpy.types.Operator):
     """Importuj plik THERM (.thmx) do Blendera"""
@@ -399,23 +751,6 @@ class THERM_OT_create_usection_base(bpy.types.Operator):
     """Klasa bazowa dla tworzenia sekcji U z grubościami materiałów"""
     bl_options = {'REGISTER', 'UNDO'}
     
-    socket_map = {
-        'u1': 'Socket_25',
-        'usection': 'Socket_2',
-        'y': 'Socket_24', 
-        'u-value': 'Socket_26',
-        'r01': 'Socket_28', 'r02': 'Socket_29', 'r03': 'Socket_30', 'r04': 'Socket_31',
-        'r05': 'Socket_32', 'r06': 'Socket_33', 'r07': 'Socket_34', 'r08': 'Socket_35',
-        'r09': 'Socket_36', 'r10': 'Socket_37',
-        'ti': 'Socket_22', 'te': 'Socket_23',
-        'm01': 'Socket_8', 'm02': 'Socket_14', 'm03': 'Socket_15', 'm04': 'Socket_16',
-        'm05': 'Socket_17', 'm06': 'Socket_18', 'm07': 'Socket_19', 'm08': 'Socket_20',
-        'm09': 'Socket_13', 'm10': 'Socket_12',
-        # Dodaj sockety dla grubości jeśli są dostępne w Geometry Nodes
-        't01': 'Socket_3', 't02': 'Socket_4', 't03': 'Socket_5', 't04': 'Socket_6',
-        't05': 'Socket_7', 't06': 'Socket_9', 't07': 'Socket_10', 't08': 'Socket_11',
-    }
-    
     usection_name: bpy.props.StringProperty()
     
     def find_ti_curves_from_selected(self):
@@ -447,6 +782,96 @@ class THERM_OT_create_usection_base(bpy.types.Operator):
         target_name = f"USection_{usection_name}"
         return target_name in bpy.data.objects
     
+    def curve_segments_mm(self, curve_obj):
+        """Odcinki krzywej POLY w przestrzeni świata [mm]"""
+        segments = []
+        world_matrix = curve_obj.matrix_world
+        for spline in curve_obj.data.splines:
+            if spline.type != 'POLY':
+                continue
+            points = [world_matrix @ point.co.xyz for point in spline.points]
+            for start, end in zip(points, points[1:]):
+                segments.append(((start.x * 1000, start.y * 1000), (end.x * 1000, end.y * 1000)))
+        return segments
+    
+    def find_all_ti_curves(self):
+        """Znajduje wszystkie krzywe Ti w scenie"""
+        ti_curves = []
+        for coll in bpy.data.collections:
+            if coll.name.startswith('THERM_Ti='):
+                for obj in coll.objects:
+                    if obj.type == 'CURVE' and obj not in ti_curves:
+                        ti_curves.append(obj)
+        return ti_curves
+    
+    def find_closest_curve(self, curves, point):
+        """Krzywa (Ti lub Te) najbliższa punktowi [mm], np. końcowi układu warstw"""
+        best_curve = None
+        best_distance = None
+        for curve in curves:
+            for start, end in self.curve_segments_mm(curve):
+                distance = therm_geometry.point_segment_distance(point, start, end)
+                if best_distance is None or distance < best_distance:
+                    best_curve, best_distance = curve, distance
+        return best_curve
+    
+    def next_usection_name(self):
+        """Pierwsza wolna nazwa U<n>"""
+        index = 1
+        while self.check_usection_exists(f"U{index}"):
+            index += 1
+        return f"U{index}"
+    
+    def prepare_usection_batch(self, mesh_objects, polygons=None):
+        """Dane wspólne dla wszystkich sekcji tworzonych w jednym przebiegu
+        
+        Krzywe Te, grupa węzłów i sonda warstw są wyznaczane raz, a conductivity
+        materiałów trafia do pamięci podręcznej partii.
+        """
+        if polygons is None:
+            polygons = []
+            for mesh_obj in mesh_objects:
+                polygons.extend(therm_export.get_all_polygons_from_mesh(mesh_obj))
+        
+        return {
+            'mesh_objects': mesh_objects,
+            'te_curves': self.find_all_te_curves(),
+            'node_group': self.create_usection_node_group(therm_sockets.USECTION_NODE_GROUP),
+            'probe': therm_layers.LayerProbe(polygons),
+            'conductivities': {}
+        }
+    
+    def batch_conductivity(self, batch, mesh_object, material_name=None):
+        """Conductivity materiału z pamięci podręcznej partii (jedno wyszukiwanie na materiał)"""
+        key = (mesh_object.name if mesh_object else '', material_name or '')
+        if key not in batch['conductivities']:
+            material = bpy.data.materials.get(material_name) if material_name else None
+            batch['conductivities'][key] = self.get_material_conductivity(mesh_object, material)
+        return batch['conductivities'][key]
+    
+    def probe_layer_sequence(self, probe, ti_curve):
+        """Układ warstw na linii próbkującej wzdłuż normalnej krzywej Ti (od środka pierwszego odcinka)
+        
+        Zwraca (warstwy, punkt końcowy [mm]) - warstwy {'object', 'material', 'thickness' [mm], ...}
+        są puste, jeśli linia nie trafia w żadną siatkę.
+        """
+        segments = self.curve_segments_mm(ti_curve)
+        if not segments:
+            return [], None
+        
+        start, end = segments[0]
+        normal = therm_layers.inward_normal(probe, start, end)
+        if normal is None:
+            return [], None
+        
+        middle = ((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+        layers = probe.probe(middle, normal)
+        if not layers:
+            return [], None
+        
+        depth = layers[-1]['end']
+        return layers, (middle[0] + normal[0] * depth, middle[1] + normal[1] * depth)
+    
     def calculate_all_thicknesses(self, mesh_objects, ti_curve, te_curve):
         """Oblicza grubości dla wszystkich obiektów siatki"""
         thicknesses = []
@@ -475,24 +900,22 @@ class THERM_OT_create_usection_base(bpy.types.Operator):
     
     def set_basic_values(self, modifier, usection_name, ti_curve, te_curve):
         """Ustawia podstawowe wartości w Geometry Nodes"""
-        available_inputs = list(modifier.keys())
-        
         # Ustaw USection
-        if 'usection' in self.socket_map and self.socket_map['usection'] in available_inputs:
-            modifier[self.socket_map['usection']] = usection_name
-            print(f"✅ Ustawiono {self.socket_map['usection']} (USection) = {usection_name}")
+        identifier = therm_sockets.set_modifier_input(modifier, 'usection', usection_name)
+        if identifier:
+            print(f"✅ Ustawiono {identifier} (USection) = {usection_name}")
         
         # Ustaw Ti
-        ti_curves = self.find_ti_curves_from_selected()
-        if 'ti' in self.socket_map and self.socket_map['ti'] in available_inputs and ti_curves:
-            modifier[self.socket_map['ti']] = ti_curves[0]
-            print(f"✅ Ustawiono {self.socket_map['ti']} (Ti) = {ti_curves[0].name}")
+        if ti_curve:
+            identifier = therm_sockets.set_modifier_input(modifier, 'ti', ti_curve)
+            if identifier:
+                print(f"✅ Ustawiono {identifier} (Ti) = {ti_curve.name}")
         
         # Ustaw Te  
-        te_curves = self.find_all_te_curves()
-        if 'te' in self.socket_map and self.socket_map['te'] in available_inputs and te_curves:
-            modifier[self.socket_map['te']] = te_curves[0] 
-            print(f"✅ Ustawiono {self.socket_map['te']} (Te) = {te_curves[0].name}")
+        if te_curve:
+            identifier = therm_sockets.set_modifier_input(modifier, 'te', te_curve)
+            if identifier:
+                print(f"✅ Ustawiono {identifier} (Te) = {te_curve.name}")
     
     def calculate_u_value(self, thicknesses, conductivities, ti_rsi, te_rse):
         """Oblicza współczynnik U (U-Value) na podstawie grubości, conductivity i oporów"""
@@ -550,23 +973,53 @@ class THERM_OT_create_usection_base(bpy.types.Operator):
             print(f"❌ Błąd obliczania U-Value: {e}")
             return 0.0, 0.0, 0.0
 
-    def set_geometry_nodes_values_with_thickness(self, curve_obj, usection_name, modifier, mesh_objects, ti_curve, te_curve):
+    def set_geometry_nodes_values_with_thickness(self, curve_obj, usection_name, modifier, batch, ti_curve):
         """Ustawia wartości w geometry nodes z grubościami materiałów i oblicza U-Value"""
         try:
-            available_inputs = list(modifier.keys())
-            
             print(f"🎯 Ustawianie Geometry Nodes dla {curve_obj.name} z grubościami i U-Value:")
             print("═" * 50)
             
-            # Oblicz grubości materiałów
-            thicknesses = self.calculate_all_thicknesses(mesh_objects, ti_curve, te_curve)
+            mesh_objects = batch['mesh_objects']
+            te_curves = batch['te_curves']
             
-            # Pobierz conductivities
-            conductivities = []
-            for mesh_obj in mesh_objects:
-                conductivity = self.get_material_conductivity(mesh_obj)
-                conductivities.append(conductivity)
+            # Układ warstw z linii próbkującej (dokładne grubości w kolejności od Ti)
+            layers, layers_end = self.probe_layer_sequence(batch['probe'], ti_curve)
             
+            if layers:
+                # Te najbliższa końcowi układu warstw
+                te_curve = self.find_closest_curve(te_curves, layers_end) or te_curves[0]
+                layer_objects = [bpy.data.objects.get(layer['object']) for layer in layers]
+                thicknesses = [layer['thickness'] / 1000.0 for layer in layers]
+                conductivities = [self.batch_conductivity(batch, obj, layer['material'])
+                                  for obj, layer in zip(layer_objects, layers)]
+                
+                print("📐 UKŁAD WARSTW NA LINII PRÓBKUJĄCEJ:")
+                for i, layer in enumerate(layers):
+                    print(f"   {i+1:2d}. {layer['object']} / {layer['material']}: {layer['thickness']:.2f} mm")
+                
+                missed = [obj.name for obj in mesh_objects if obj not in layer_objects]
+                if missed:
+                    print(f"⚠️  Obiekty poza linią próbkującą: {missed}")
+            else:
+                # Linia nie trafia w geometrię - grubości z wymiarów obiektów
+                print("⚠️  Linia próbkująca nie przecina siatek - używam grubości z wymiarów obiektów")
+                te_curve = te_curves[0]
+                layer_objects = mesh_objects
+                thicknesses = self.calculate_all_thicknesses(mesh_objects, ti_curve, te_curve)
+                conductivities = [self.batch_conductivity(batch, mesh_obj) for mesh_obj in mesh_objects]
+            
+            return self.apply_layer_values(curve_obj, usection_name, modifier, layer_objects,
+                                           thicknesses, conductivities, ti_curve, te_curve)
+                        
+        except Exception as e:
+            print(f"❌ Błąd ustawiania geometry nodes: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+    
+    def apply_layer_values(self, curve_obj, usection_name, modifier, mesh_objects, thicknesses, conductivities, ti_curve, te_curve):
+        """Oblicza U-Value dla układu warstw i zapisuje obiekty, conductivity i grubości w Geometry Nodes"""
+        try:
             # Pobierz wartości Rsi i Rse z właściwości sceny
             ti_rsi = bpy.context.scene.therm_edge_props.ti_rsi
             te_rse = bpy.context.scene.therm_edge_props.te_rse
@@ -580,50 +1033,51 @@ class THERM_OT_create_usection_base(bpy.types.Operator):
             self.set_basic_values(modifier, usection_name, ti_curve, te_curve)
             
             # Ustaw U-Value w Geometry Nodes jeśli socket istnieje
-            if 'u-value' in self.socket_map and self.socket_map['u-value'] in available_inputs:
-                try:
-                    modifier[self.socket_map['u-value']] = u_value
-                    print(f"✅ Ustawiono {self.socket_map['u-value']} (U-Value) = {u_value:.6f} W/m²K")
-                except Exception as e:
-                    print(f"❌ Błąd ustawiania U-Value: {e}")
+            try:
+                identifier = therm_sockets.set_modifier_input(modifier, 'u-value', u_value)
+                if identifier:
+                    print(f"✅ Ustawiono {identifier} (U-Value) = {u_value:.6f} W/m²K")
+            except Exception as e:
+                print(f"❌ Błąd ustawiania U-Value: {e}")
             
             # Ustaw obiekty, conductivities i grubości
             objects_set = 0
             conductivities_set = 0
             thicknesses_set = 0
             
-            # Mapowanie socketów
-            object_keys = ['m01', 'm02', 'm03', 'm04', 'm05', 'm06', 'm07', 'm08', 'm09', 'm10']
-            conductivity_keys = ['r01', 'r02', 'r03', 'r04', 'r05', 'r06', 'r07', 'r08', 'r09', 'r10']
-            thickness_keys = ['t01', 't02', 't03', 't04', 't05', 't06', 't07', 't08', 't09', 't10']
-            
-            for i, (obj_key, cond_key, thick_key) in enumerate(zip(object_keys, conductivity_keys, thickness_keys)):
-                if i >= len(mesh_objects):
-                    break
+            # Sockety numerowane wg nazw interfejsu (M01..., R01..., T01...)
+            for i, mesh_obj in enumerate(mesh_objects):
+                obj_key, cond_key, thick_key = f"m{i + 1:02d}", f"r{i + 1:02d}", f"t{i + 1:02d}"
                 
                 # Ustaw obiekt
-                if obj_key in self.socket_map and self.socket_map[obj_key] in available_inputs:
-                    modifier[self.socket_map[obj_key]] = mesh_objects[i]
-                    print(f"✅ Ustawiono {self.socket_map[obj_key]} ({obj_key.upper()}) = {mesh_objects[i].name}")
+                identifier = therm_sockets.set_modifier_input(modifier, obj_key, mesh_obj)
+                if identifier:
+                    print(f"✅ Ustawiono {identifier} ({obj_key.upper()}) = {mesh_obj.name}")
                     objects_set += 1
                 
                 # Ustaw conductivity
-                if cond_key in self.socket_map and self.socket_map[cond_key] in available_inputs:
-                    try:
-                        modifier[self.socket_map[cond_key]] = conductivities[i]
-                        print(f"✅ Ustawiono {self.socket_map[cond_key]} ({cond_key.upper()}) = {conductivities[i]:.4f} W/mK")
+                try:
+                    identifier = therm_sockets.set_modifier_input(modifier, cond_key, conductivities[i])
+                    if identifier:
+                        print(f"✅ Ustawiono {identifier} ({cond_key.upper()}) = {conductivities[i]:.4f} W/mK")
                         conductivities_set += 1
-                    except Exception as e:
-                        print(f"❌ Błąd ustawiania conductivity: {e}")
+                except Exception as e:
+                    print(f"❌ Błąd ustawiania conductivity: {e}")
                 
                 # Ustaw grubość
-                if thick_key in self.socket_map and self.socket_map[thick_key] in available_inputs:
-                    try:
-                        modifier[self.socket_map[thick_key]] = thicknesses[i]
-                        print(f"✅ Ustawiono {self.socket_map[thick_key]} ({thick_key.upper()}) = {thicknesses[i]:.4f} m")
+                try:
+                    identifier = therm_sockets.set_modifier_input(modifier, thick_key, thicknesses[i])
+                    if identifier:
+                        print(f"✅ Ustawiono {identifier} ({thick_key.upper()}) = {thicknesses[i]:.4f} m")
                         thicknesses_set += 1
-                    except Exception as e:
-                        print(f"❌ Błąd ustawiania grubości: {e}")
+                except Exception as e:
+                    print(f"❌ Błąd ustawiania grubości: {e}")
+            
+            # Pełny układ warstw we właściwości krzywej - liczba warstw nie jest ograniczona socketami grupy
+            therm_sockets.store_layer_stack(curve_obj, mesh_objects, thicknesses, conductivities)
+            if objects_set < len(mesh_objects):
+                print(f"ℹ️  Grupa węzłów ma sockety dla {objects_set} warstw - "
+                      f"wszystkie {len(mesh_objects)} zapisano w '{therm_sockets.LAYER_STACK_PROPERTY}'")
             
             # Podsumowanie
             print("═" * 50)
@@ -653,34 +1107,24 @@ class THERM_OT_create_usection_base(bpy.types.Operator):
             traceback.print_exc()
             return False
     
-    def create_usection_geometry_nodes(self, curve_obj, usection_name):
+    def create_usection_geometry_nodes(self, curve_obj, usection_name, batch, ti_curve):
         """Dodaje geometry nodes do krzywej U-Section i ustawia wartości z grubościami"""
         try:
             # Usuń istniejące modyfikatory geometry nodes
-            for mod in curve_obj.modifiers:
+            for mod in list(curve_obj.modifiers):
                 if mod.type == 'NODES':
                     curve_obj.modifiers.remove(mod)
             
-            node_group_name = "THERM U-Section"
-            if node_group_name not in bpy.data.node_groups:
-                self.create_usection_node_group(node_group_name)
-            
-            node_group = bpy.data.node_groups[node_group_name]
             modifier = curve_obj.modifiers.new(name=f"THERM_U_{usection_name}", type='NODES')
-            modifier.node_group = node_group
+            modifier.node_group = batch['node_group']
             
-            # Znajdź potrzebne obiekty
-            mesh_objects = [obj for obj in bpy.context.selected_objects if obj.type == 'MESH']
-            ti_curves = self.find_ti_curves_from_selected()
-            te_curves = self.find_all_te_curves()
-            
-            if not ti_curves or not te_curves:
-                print("❌ Brak krzywych Ti lub Te")
-                return False, "Brak krzywych Ti lub Te"
+            if not batch['te_curves']:
+                print("❌ Brak krzywych Te")
+                return False, "Brak krzywych Te"
             
             # Ustaw wartości z grubościami
             success = self.set_geometry_nodes_values_with_thickness(
-                curve_obj, usection_name, modifier, mesh_objects, ti_curves[0], te_curves[0]
+                curve_obj, usection_name, modifier, batch, ti_curve
             )
             
             return success, "Success"
@@ -714,15 +1158,19 @@ class THERM_OT_create_usection_base(bpy.types.Operator):
         
         return node_group
     
-    def get_material_conductivity(self, mesh_object):
-        """Pobiera wartość conductivity z materiału obiektu - POPRAWIONA WERSJA"""
+    def get_material_conductivity(self, mesh_object, material=None):
+        """Pobiera wartość conductivity z materiału obiektu - POPRAWIONA WERSJA
+        
+        Jeśli podano material, używany jest on zamiast pierwszego materiału obiektu.
+        """
         try:
-            if not mesh_object.data.materials:
-                print(f"    ❌ Obiekt {mesh_object.name} nie ma materiałów")
-                return 0.04  # Wartość domyślna
-            
-            # Weź pierwszy materiał
-            material = mesh_object.data.materials[0]
+            if material is None:
+                if not mesh_object.data.materials:
+                    print(f"    ❌ Obiekt {mesh_object.name} nie ma materiałów")
+                    return 0.04  # Wartość domyślna
+                
+                # Weź pierwszy materiał
+                material = mesh_object.data.materials[0]
             if not material:
                 return 0.04
             
@@ -837,174 +1285,217 @@ class THERM_OT_create_usection_base(bpy.types.Operator):
                         te_curves.append(obj)
         return te_curves
     
-    def create_usection(self, usection_name):
-        """Główna funkcja tworząca sekcję U tylko z zaznaczonych obiektów"""
+    def create_usection(self, usection_name, ti_curve, batch):
+        """Tworzy sekcję U jako kopię krzywej Ti z wypełnionymi wartościami Geometry Nodes
+        
+        Zwraca (krzywa lub None, komunikat).
+        """
+        target_name = f"USection_{usection_name}"
+        
+        # Sprawdź czy krzywa już istnieje
+        if self.check_usection_exists(usection_name):
+            return None, f"Krzywa {target_name} już istnieje!"
+        
+        print(f"Kopiowanie krzywej: {ti_curve.name} -> {target_name}")
+        
+        # Skopiuj krzywą
+        new_curve = ti_curve.copy()
+        new_curve.data = ti_curve.data.copy()
+        new_curve.name = target_name
+        new_curve.data.name = target_name
+        
+        # Dodaj do kolekcji
+        self.ensure_usection_collection().objects.link(new_curve)
+        print(f"✅ Krzywa {target_name} została utworzona")
+        
+        # Dodaj geometry nodes
+        success, message = self.create_usection_geometry_nodes(new_curve, usection_name, batch, ti_curve)
+        if not success:
+            print(f"❌ Błąd Geometry Nodes: {message}")
+            return new_curve, f"{target_name}: błąd Geometry Nodes: {message}"
+        
+        print(f"✅ Geometry Nodes dodane do {target_name}")
+        return new_curve, "Success"
+
+# Definicje sekcji są listą, więc jeden operator obsługuje dowolną liczbę sekcji
+class THERM_OT_create_usections(THERM_OT_create_usection_base):
+    """Tworzy sekcje U z listy definicji (nazwa, krzywa Ti) w jednym przebiegu
+    
+    Bez definicji tworzy po jednej sekcji dla każdej zaznaczonej krzywej Ti (kolejne wolne nazwy U<n>).
+    """
+    bl_idname = "therm.create_usections"
+    bl_label = "Utwórz sekcje U"
+    
+    sections: bpy.props.CollectionProperty(type=properties.THERMUSectionDefinition)
+    
+    def section_definitions(self):
+        """Lista (nazwa lub None, krzywa Ti) z właściwości operatora lub z zaznaczenia
+        
+        Zaznaczenie używane jest tylko bez definicji - definicja z pustą lub nieznaną nazwą
+        krzywej dostaje None, a execute() zgłasza ją jako brak krzywej Ti.
+        """
+        if not self.sections:
+            return [(None, ti_curve) for ti_curve in self.find_ti_curves_from_selected()]
+        
+        definitions = []
+        for section in self.sections:
+            ti_curve = bpy.data.objects.get(section.ti_curve) if section.ti_curve else None
+            if ti_curve is None and section.ti_curve:
+                print(f"⚠️  {section.name or 'Sekcja U'}: nie znaleziono krzywej Ti '{section.ti_curve}'")
+            definitions.append((section.name or None, ti_curve))
+        return definitions
+    
+    def execute(self, context):
         try:
-            target_name = f"USection_{usection_name}"
-            
-            # Sprawdź czy krzywa już istnieje
-            if self.check_usection_exists(usection_name):
-                self.report({'WARNING'}, f"Krzywa {target_name} już istnieje!")
-                return {'CANCELLED'}
-            
-            # Znajdź krzywe Ti tylko z zaznaczonych obiektów
-            ti_curves = self.find_ti_curves_from_selected()
-            if not ti_curves:
+            definitions = self.section_definitions()
+            if not definitions:
                 self.report({'WARNING'}, "Nie znaleziono zaznaczonych krzywych Ti")
                 return {'CANCELLED'}
             
-            print(f"Znaleziono {len(ti_curves)} zaznaczonych krzywych Ti")
-            
-            # Używamy tylko pierwszej zaznaczonej krzywej Ti
-            ti_curve = ti_curves[0]
-            
-            print(f"Kopiowanie krzywej: {ti_curve.name} -> {target_name}")
-            
-            # Sprawdź ponownie czy krzywa już nie powstała (dla bezpieczeństwa)
-            if self.check_usection_exists(usection_name):
-                self.report({'WARNING'}, f"Krzywa {target_name} już istnieje! (ponowne sprawdzenie)")
+            mesh_objects = [obj for obj in context.selected_objects if obj.type == 'MESH']
+            batch = self.prepare_usection_batch(mesh_objects)
+            if not batch['te_curves']:
+                self.report({'WARNING'}, "Brak krzywych Te")
                 return {'CANCELLED'}
             
-            # Utwórz kolekcję
-            usection_coll = self.ensure_usection_collection()
+            print(f"Tworzenie {len(definitions)} sekcji U ({len(mesh_objects)} siatek)")
             
-            # Skopiuj krzywą
-            new_curve = ti_curve.copy()
-            new_curve.data = ti_curve.data.copy()
-            new_curve.name = target_name
-            new_curve.data.name = target_name
-            
-            # Dodaj do kolekcji
-            usection_coll.objects.link(new_curve)
+            created = []
+            problems = []
+            for usection_name, ti_curve in definitions:
+                usection_name = usection_name or self.next_usection_name()
+                if ti_curve is None:
+                    problems.append(f"{usection_name}: brak krzywej Ti")
+                    continue
+                
+                curve_obj, message = self.create_usection(usection_name, ti_curve, batch)
+                if curve_obj:
+                    created.append(curve_obj)
+                if message != "Success":
+                    problems.append(message)
             
-            # Odśwież scenę
-            bpy.context.view_layer.update()
+            for problem in problems:
+                print(f"⚠️  {problem}")
             
-            # Sprawdź czy krzywa została poprawnie utworzona
-            if new_curve.name not in bpy.data.objects:
-                self.report({'ERROR'}, f"Błąd: Krzywa {target_name} nie została utworzona")
+            if not created:
+                self.report({'WARNING'}, "; ".join(problems) or "Nie utworzono sekcji U")
                 return {'CANCELLED'}
             
-            print(f"✅ Krzywa {target_name} została utworzona")
-            
-            # Dodaj geometry nodes
-            success, message = self.create_usection_geometry_nodes(new_curve, usection_name)
-            if success:
-                print(f"✅ Geometry Nodes dodane do {target_name}")
-                self.report({'INFO'}, f"Utworzono krzywą {target_name} z Geometry Nodes")
-            else:
-                print(f"❌ Błąd Geometry Nodes: {message}")
-                self.report({'WARNING'}, f"Utworzono krzywą {target_name} ale błąd Geometry Nodes: {message}")
-            
-            # Odznacz wszystko i zaznacz nową krzywą
+            # Odznacz wszystko i zaznacz nowe krzywe
             bpy.ops.object.select_all(action='DESELECT')
-            new_curve.select_set(True)
-            bpy.context.view_layer.objects.active = new_curve
+            for curve_obj in created:
+                curve_obj.select_set(True)
+            context.view_layer.objects.active = created[-1]
             
+            names = ', '.join(curve_obj.name for curve_obj in created)
+            if problems:
+                self.report({'WARNING'}, f"Utworzono {names}; problemy: {'; '.join(problems)}")
+            else:
+                self.report({'INFO'}, f"Utworzono {len(created)} sekcji U z Geometry Nodes: {names}")
             return {'FINISHED'}
             
         except Exception as e:
-            self.report({'ERROR'}, f"Błąd tworzenia U{usection_name}: {str(e)}")
+            self.report({'ERROR'}, f"Błąd tworzenia sekcji U: {str(e)}")
             import traceback
             traceback.print_exc()
             return {'CANCELLED'}
 
-# Operatory dla tworzenia poszczególnych sekcji U
-class THERM_OT_create_usection_1(THERM_OT_create_usection_base):
-    """Tworzy sekcję U1 z zaznaczonych krzywych Ti"""
-    bl_idname = "therm.create_usection_1"
-    bl_label = "Utwórz U1"
-    
-    def execute(self, context):
-        return self.create_usection("U1")
-
-class THERM_OT_create_usection_2(THERM_OT_create_usection_base):
-    """Tworzy sekcję U2 z zaznaczonych krzywych Ti"""
-    bl_idname = "therm.create_usection_2"
-    bl_label = "Utwórz U2"
+class THERM_OT_auto_usections(THERM_OT_create_usection_base):
+    """Wyznacza obszary jednorodnego układu warstw wzdłuż krzywych Ti i Te i tworzy dla nich sekcje U"""
+    bl_idname = "therm.auto_usections"
+    bl_label = "Automatyczne sekcje U"
     
-    def execute(self, context):
-        return self.create_usection("U2")
-
-class THERM_OT_create_usection_3(THERM_OT_create_usection_base):
-    """Tworzy sekcję U3 z zaznaczonych krzywych Ti"""
-    bl_idname = "therm.create_usection_3"
-    bl_label = "Utwórz U3"
-    
-    def execute(self, context):
-        return self.create_usection("U3")
-
-class THERM_OT_create_usection_4(THERM_OT_create_usection_base):
-    """Tworzy sekcję U4 z zaznaczonych krzywych Ti"""
-    bl_idname = "therm.create_usection_4"
-    bl_label = "Utwórz U4"
-    
-    def execute(self, context):
-        return self.create_usection("U4")
-
-class THERM_OT_create_usection_5(THERM_OT_create_usection_base):
-    """Tworzy sekcję U5 z zaznaczonych krzywych Ti"""
-    bl_idname = "therm.create_usection_5"
-    bl_label = "Utwórz U5"
-    
-    def execute(self, context):
-        return self.create_usection("U5")
-
-class THERM_OT_create_usection_6(THERM_OT_create_usection_base):
-    """Tworzy sekcję U6 z zaznaczonych krzywych Ti"""
-    bl_idname = "therm.create_usection_6"
-    bl_label = "Utwórz U6"
-    
-    def execute(self, context):
-        return self.create_usection("U6")
-
-class THERM_OT_create_usection_7(THERM_OT_create_usection_base):
-    """Tworzy sekcję U7 z zaznaczonych krzywych Ti"""
-    bl_idname = "therm.create_usection_7"
-    bl_label = "Utwórz U7"
-    
-    def execute(self, context):
-        return self.create_usection("U7")
-
-class THERM_OT_create_usection_8(THERM_OT_create_usection_base):
-    """Tworzy sekcję U8 z zaznaczonych krzywych Ti"""
-    bl_idname = "therm.create_usection_8"
-    bl_label = "Utwórz U8"
-    
-    def execute(self, context):
-        return self.create_usection("U8")
-
-class THERM_OT_create_usection_9(THERM_OT_create_usection_base):
-    """Tworzy sekcję U9 z zaznaczonych krzywych Ti"""
-    bl_idname = "therm.create_usection_9"
-    bl_label = "Utwórz U9"
-    
-    def execute(self, context):
-        return self.create_usection("U9")
-
-class THERM_OT_create_usection_10(THERM_OT_create_usection_base):
-    """Tworzy sekcję U10 z zaznaczonych krzywych Ti"""
-    bl_idname = "therm.create_usection_10"
-    bl_label = "Utwórz U10"
-    
-    def execute(self, context):
-        return self.create_usection("U10")
-
-class THERM_OT_create_usection_11(THERM_OT_create_usection_base):
-    """Tworzy sekcję U11 z zaznaczonych krzywych Ti"""
-    bl_idname = "therm.create_usection_11"
-    bl_label = "Utwórz U11"
+    def create_region_curve(self, usection_name, region):
+        """Tworzy krzywą sekcji U wzdłuż odcinka regionu"""
+        target_name = f"USection_{usection_name}"
+        curve_data = bpy.data.curves.new(target_name, type='CURVE')
+        curve_data.dimensions = '3D'
+        spline = curve_data.splines.new('POLY')
+        spline.points.add(1)
+        for point, (x, y) in zip(spline.points, (region['start'], region['end'])):
+            point.co = (x / 1000.0, y / 1000.0, 0.0, 1.0)
+        
+        curve_obj = bpy.data.objects.new(target_name, curve_data)
+        self.ensure_usection_collection().objects.link(curve_obj)
+        return curve_obj
     
-    def execute(self, context):
-        return self.create_usection("U11")
-
-class THERM_OT_create_usection_12(THERM_OT_create_usection_base):
-    """Tworzy sekcję U12 z zaznaczonych krzywych Ti"""
-    bl_idname = "therm.create_usection_12"
-    bl_label = "Utwórz U12"
+    def create_region_usection(self, region, ti_curves, batch):
+        """Tworzy sekcję U dla regionu z wypełnionymi warstwami i U-Value
+        
+        Region znaleziony wzdłuż krzywej Te opisany jest od drugiej strony warstw - krzywa Ti
+        to wtedy krzywa najbliższa początkowi regionu.
+        """
+        usection_name = self.next_usection_name()
+        curve_obj = self.create_region_curve(usection_name, region)
+        
+        modifier = curve_obj.modifiers.new(name=f"THERM_U_{usection_name}", type='NODES')
+        modifier.node_group = batch['node_group']
+        
+        layers = region['layers']
+        end = (region['start'][0] + region['normal'][0] * layers[-1]['end'],
+               region['start'][1] + region['normal'][1] * layers[-1]['end'])
+        if region['side'] == 'Te':
+            te_curve = bpy.data.objects[region['source']]
+            ti_curve = self.find_closest_curve(ti_curves, region['start'])
+        else:
+            ti_curve = bpy.data.objects[region['source']]
+            te_curve = self.find_closest_curve(batch['te_curves'], end)
+        
+        layer_objects = [bpy.data.objects.get(layer['object']) for layer in layers]
+        thicknesses = [layer['thickness'] / 1000.0 for layer in layers]
+        conductivities = [self.batch_conductivity(batch, obj, layer['material'])
+                          for obj, layer in zip(layer_objects, layers)]
+        
+        print(f"🧱 {usection_name}: {region['length']:.0f} mm wzdłuż {region['source']}, "
+              f"warstwy: {[layer['material'] for layer in layers]}")
+        self.apply_layer_values(curve_obj, usection_name, modifier, layer_objects,
+                                thicknesses, conductivities, ti_curve, te_curve)
+        return curve_obj
     
     def execute(self, context):
-        return self.create_usection("U12")
+        try:
+            props = context.scene.therm_props
+            
+            polygons_data, mesh_objects = therm_export.get_export_polygons(context.selected_objects)
+            if not polygons_data:
+                self.report({'WARNING'}, "Zaznacz obiekty siatki złącza")
+                return {'CANCELLED'}
+            
+            ti_curves = self.find_all_ti_curves()
+            batch = self.prepare_usection_batch(mesh_objects, polygons_data)
+            if not ti_curves or not batch['te_curves']:
+                self.report({'WARNING'}, "Brak krzywych Ti lub Te")
+                return {'CANCELLED'}
+            
+            # Układy warstw sprawdzane od strony Ti i od strony Te - układ jednorodny tylko
+            # od jednej strony też jest znajdowany, a wspólne układy łączy distinct_stacks
+            regions = []
+            for side, curves in (('Ti', ti_curves), ('Te', batch['te_curves'])):
+                segments = [(curve.name, start, end)
+                            for curve in curves for start, end in self.curve_segments_mm(curve)]
+                regions.extend(therm_layers.find_uniform_regions(batch['probe'], segments,
+                                                                 step=props.usection_probe_step,
+                                                                 min_length=props.usection_min_length,
+                                                                 side=side))
+            stacks = therm_layers.distinct_stacks(regions)
+            print(f"🔎 Obszary jednorodne: {len(regions)}, odrębne układy warstw: {len(stacks)}")
+            
+            if not stacks:
+                self.report({'WARNING'}, "Nie znaleziono obszarów o stałym układzie warstw")
+                return {'CANCELLED'}
+            
+            created = []
+            for region in stacks:
+                created.append(self.create_region_usection(region, ti_curves, batch).name)
+            
+            self.report({'INFO'}, f"Utworzono {len(created)} sekcji U: {', '.join(created)}")
+            return {'FINISHED'}
+            
+        except Exception as e:
+            self.report({'ERROR'}, f"Błąd automatycznych sekcji U: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return {'CANCELLED'}
 
 # Operatory debugujące
 class THERM_OT_debug_usections(bpy.types.Operator):
@@ -1065,6 +1556,7 @@ class THERM_OT_debug_sockets(bpy.types.Operator):
                         # Socket-y w modyfikatorze
                         available_inputs = list(modifier.keys())
                         print(f"  Dostępne w modyfikatorze: {sorted(available_inputs)}")
+                        print(f"  Mapa socketów: {therm_sockets.get_socket_map(modifier.node_group)}")
                         print("---")
         
         print("=== KONIEC DEBUG SOCKETS ===")
@@ -1141,38 +1633,14 @@ class THERM_OT_export_to_excel(bpy.types.Operator):
     def extract_all_u_factors_from_thmx(self, thmx_file):
         """Ekstrahuje WSZYSTKIE U-Factors z pliku .thmx"""
         try:
-            with open(thmx_file, 'r', encoding='utf-8') as file:
-                content = file.read()
-            
-            # Usuń namespace dla prostszego parsowania
-            content = content.replace(' xmlns="http://windows.lbl.gov"', '')
-            root = ET.fromstring(content)
-            
             all_u_factors = {}
             
-            # Szukaj wszystkich U-factors
-            for u_factor in root.findall('.//U-factors'):
-                tag_elem = u_factor.find('Tag')
-                if tag_elem is not None and tag_elem.text:
-                    tag = tag_elem.text.strip()
-                    
-                    # Szukaj wartości U dla "Total length"
-                    for projection in u_factor.findall('Projection'):
-                        length_type_elem = projection.find('Length-type')
-                        if length_type_elem is not None and 'Total length' in length_type_elem.text:
-                            
-                            # Pobierz wartość U
-                            u_factor_elem = projection.find('U-factor')
-                            if u_factor_elem is not None:
-                                u_value_str = u_factor_elem.get('value')
-                                if u_value_str and u_value_str != 'NA':
-                                    try:
-                                        u_value = float(u_value_str)
-                                        all_u_factors[tag] = u_value
-                                        print(f"Znaleziono U-Factor '{tag}' = {u_value}")
-                                        break  # Tylko pierwsza znaleziona wartość dla Total length
-                                    except ValueError:
-                                        print(f"Nieprawidłowa wartość U dla '{tag}': {u_value_str}")
+            for tag, u_value in therm_results.read_ufactors(thmx_file).items():
+                if isinstance(u_value, float):
+                    all_u_factors[tag] = u_value
+                    print(f"Znaleziono U-Factor '{tag}' = {u_value}")
+                else:
+                    print(f"Nieprawidłowa wartość U dla '{tag}': {u_value}")
             
             return all_u_factors
             
@@ -1226,46 +1694,23 @@ class THERM_OT_export_to_excel(bpy.types.Operator):
     def extract_heat_flux_for_tag(self, thmx_file, tag_name):
         """Ekstrahuje strumień ciepła dla konkretnego tagu"""
         try:
-            with open(thmx_file, 'r', encoding='utf-8') as file:
-                content = file.read()
+            projection = therm_results.find_projection(thmx_file, tag_name)
+            if projection is None or not isinstance(projection['ufactor'], float):
+                return None
             
-            content = content.replace(' xmlns="http://windows.lbl.gov"', '')
-            root = ET.fromstring(content)
+            print(f"Znaleziono U-factors dla '{tag_name}'")
             
-            # Szukaj konkretnego tagu
-            for u_factor in root.findall('.//U-factors'):
-                tag_elem = u_factor.find('Tag')
-                if tag_elem is not None and tag_elem.text and tag_elem.text.strip() == tag_name:
-                    print(f"Znaleziono U-factors dla '{tag_name}'")
-                    
-                    # Pobierz DeltaT
-                    delta_t_elem = u_factor.find('DeltaT')
-                    delta_t = float(delta_t_elem.get('value')) if delta_t_elem is not None else 40.0
-                    
-                    # Szukaj projekcji z "Total length"
-                    for projection in u_factor.findall('Projection'):
-                        length_type_elem = projection.find('Length-type')
-                        if length_type_elem is not None and 'Total length' in length_type_elem.text:
-                            
-                            # Pobierz długość
-                            length_elem = projection.find('Length')
-                            length_value = float(length_elem.get('value')) if length_elem is not None else 0.0
-                            
-                            # Pobierz wartość U
-                            u_factor_elem = projection.find('U-factor')
-                            if u_factor_elem is not None:
-                                u_value_str = u_factor_elem.get('value')
-                                if u_value_str and u_value_str != 'NA':
-                                    u_value = float(u_value_str)
-                                    
-                                    # OBLICZENIE STRUMIENIA CIEPŁA
-                                    heat_flux_per_meter = u_value * delta_t  # W/m
-                                    total_heat_flux = heat_flux_per_meter * (length_value / 1000.0)  # zamiana mm na m
-                                    
-                                    print(f"🔥 Obliczono strumień ciepła dla '{tag_name}': {total_heat_flux:.6f} W")
-                                    print(f"   U = {u_value}, ΔT = {delta_t}, L = {length_value}mm")
-                                    return total_heat_flux
-            return None
+            u_value = projection['ufactor']
+            delta_t = projection['delta_t'] if projection['delta_t'] is not None else 40.0
+            length_value = projection['length'] if projection['length'] is not None else 0.0
+            
+            # OBLICZENIE STRUMIENIA CIEPŁA
+            heat_flux_per_meter = u_value * delta_t  # W/m
+            total_heat_flux = heat_flux_per_meter * (length_value / 1000.0)  # zamiana mm na m
+            
+            print(f"🔥 Obliczono strumień ciepła dla '{tag_name}': {total_heat_flux:.6f} W")
+            print(f"   U = {u_value}, ΔT = {delta_t}, L = {length_value}mm")
+            return total_heat_flux
             
         except Exception as e:
             print(f"❌ Błąd ekstrakcji strumienia ciepła dla '{tag_name}': {e}")
@@ -1283,15 +1728,10 @@ class THERM_OT_export_to_excel(bpy.types.Operator):
                 # Sprawdź czy obiekt ma Geometry Nodes z wartością U
                 for modifier in obj.modifiers:
                     if modifier.type == 'NODES' and modifier.node_group:
-                        # Sprawdź dostępne socket-y
-                        available_inputs = list(modifier.keys())
-                        
-                        # Szukaj socketu U-Value
-                        u_value_sockets = [s for s in available_inputs if 'u-value' in s.lower() or 'u_value' in s.lower() or s == 'Socket_26']
-                        
-                        if u_value_sockets:
+                        # Szukaj socketu U-Value po nazwie w interfejsie grupy
+                        if therm_sockets.get_socket_identifier(modifier, 'u-value'):
                             try:
-                                u_value = modifier[u_value_sockets[0]]
+                                u_value = therm_sockets.get_modifier_input(modifier, 'u-value')
                                 u_values[usection_num] = u_value
                                 print(f"Znaleziono U-Value dla {usection_num}: {u_value}")
                                 break
@@ -1599,22 +2039,18 @@ classes = (
     THERM_OT_create_ufactor_edges,
     THERM_OT_export_to_therm,
     THERM_OT_run_therm_calculation_thmx,
+    THERM_OT_cancel_therm_calculation,
+    THERM_OT_start_spool_worker,
+    THERM_OT_queue_project_thmx,
+    THERM_OT_queue_start_worker,
+    THERM_OT_queue_job,
+    THERM_OT_queue_clear_finished,
     THERM_OT_run_therm_calculation_thm,
     THERM_OT_open_therm_folder,
     THERM_OT_import_from_therm,
     THERM_OT_clean_to_boundary,
-    THERM_OT_create_usection_1,
-    THERM_OT_create_usection_2,
-    THERM_OT_create_usection_3,
-    THERM_OT_create_usection_4,
-    THERM_OT_create_usection_5,
-    THERM_OT_create_usection_6,
-    THERM_OT_create_usection_7,
-    THERM_OT_create_usection_8,
-    THERM_OT_create_usection_9,
-    THERM_OT_create_usection_10,
-    THERM_OT_create_usection_11,
-    THERM_OT_create_usection_12,
+    THERM_OT_create_usections,
+    THERM_OT_auto_usections,
     THERM_OT_debug_usections,
     THERM_OT_debug_sockets,
     THERM_OT_export_to_excel  # DODAJ TĘ LINIĘ
@@ -1,5 +1,7 @@
 import bpy
 import os
+import time
+from . import operators, therm_queue, therm_discovery, therm_progress, therm_refine, therm_history
 
 def get_all_therm_collections():
     """Zwraca wszystkie kolekcje THERM - bezpieczna wersja"""
@@ -15,6 +17,22 @@ def get_all_therm_collections():
         print(f"Warning: Could not get THERM collections: {e}")
         return []
 
+# Podsumowanie historii obliczeń odświeżane co kilka sekund - panel rysowany jest często
+HISTORY_REFRESH_SECONDS = 10.0
+_history_overview = {'time': 0.0, 'data': None}
+
+def get_history_overview():
+    """Podsumowanie historii obliczeń THERM (z pamięci podręcznej panelu)"""
+    now = time.time()
+    if now - _history_overview['time'] > HISTORY_REFRESH_SECONDS:
+        _history_overview['time'] = now
+        try:
+            _history_overview['data'] = therm_history.RunHistory().overview()
+        except Exception as e:
+            print(f"Warning: Could not read THERM run history: {e}")
+            _history_overview['data'] = None
+    return _history_overview['data']
+
 class THERM_PT_panel(bpy.types.Panel):
     """Panel THERM Exporter"""
     bl_label = "THERM Exporter"
@@ -227,7 +245,7 @@ class THERM_PT_panel(bpy.types.Panel):
         
         # Informacja o zaznaczeniu
         selected_count = len(bpy.context.selected_objects)
-        box.label(text=f"Zaznacz JEDNĄ krzywą Ti ({selected_count} obiektów zaznaczonych)", icon='INFO')
+        box.label(text=f"Zaznacz krzywe Ti i siatki złącza ({selected_count} obiektów zaznaczonych)", icon='INFO')
         
         # Sprawdź które USection już istnieją
         existing_usections = []
@@ -238,26 +256,19 @@ class THERM_PT_panel(bpy.types.Panel):
         if existing_usections:
             box.label(text=f"Istniejące: {', '.join(sorted(existing_usections))}", icon='CURVE_DATA')
         
-        # Pierwszy wiersz U1-U6
-        row = box.row(align=True)
-        row.operator("therm.create_usection_1", text="U1")
-        row.operator("therm.create_usection_2", text="U2")
-        row.operator("therm.create_usection_3", text="U3")
-        row.operator("therm.create_usection_4", text="U4")
-        row.operator("therm.create_usection_5", text="U5")
-        row.operator("therm.create_usection_6", text="U6")
-        
-        # Drugi wiersz U7-U12
-        row = box.row(align=True)
-        row.operator("therm.create_usection_7", text="U7")
-        row.operator("therm.create_usection_8", text="U8")
-        row.operator("therm.create_usection_9", text="U9")
-        row.operator("therm.create_usection_10", text="U10")
-        row.operator("therm.create_usection_11", text="U11")
-        row.operator("therm.create_usection_12", text="U12")
+        # Jedna sekcja na każdą zaznaczoną krzywą Ti (kolejne wolne nazwy U<n>)
+        row = box.row()
+        row.scale_y = 1.2
+        row.operator("therm.create_usections", text="Utwórz sekcje U z zaznaczonych Ti", icon='ADD')
+        
+        # Automatyczne rozmieszczenie sekcji wzdłuż krzywych Ti
+        col = box.column(align=True)
+        col.prop(context.scene.therm_props, "usection_probe_step")
+        col.prop(context.scene.therm_props, "usection_min_length")
+        col.operator("therm.auto_usections", icon='AUTO')
         
         # Instrukcja
-        box.label(text="Uwaga: Tworzy USection_U1 z zaznaczonej krzywej Ti", icon='RESTRICT_SELECT_OFF')
+        box.label(text="Uwaga: Każda zaznaczona krzywa Ti tworzy osobną USection_U<n>", icon='RESTRICT_SELECT_OFF')
         box.label(text="Automatycznie ustawia wartości w Geometry Nodes", icon='NODETREE')
 
         # Tymczasowo dodaj w sekcji U-Sections:
@@ -274,6 +285,30 @@ class THERM_PT_panel(bpy.types.Panel):
         box.label(text="Opcje eksportu:")
         box.prop(context.scene.therm_props, "open_export_folder")
         
+        box.prop(context.scene.therm_props, "bc_snap_tolerance")
+        
+        # Obszar mostka - wspólny dla przycinania i upraszczania
+        col = box.column()
+        col.prop(context.scene.therm_props, "junction_object")
+        
+        # Pas sekcji U
+        col.prop(context.scene.therm_props, "usection_clip_enabled")
+        if context.scene.therm_props.usection_clip_enabled:
+            col.prop(context.scene.therm_props, "usection_strip_width")
+        
+        # Przycinanie elementów flankujących (ISO 10211)
+        col.prop(context.scene.therm_props, "crop_enabled")
+        if context.scene.therm_props.crop_enabled:
+            col.prop(context.scene.therm_props, "crop_cutoff_length")
+        
+        # Upraszczanie geometrii z dala od mostka
+        col.prop(context.scene.therm_props, "simplify_enabled")
+        if context.scene.therm_props.simplify_enabled:
+            col.prop(context.scene.therm_props, "simplify_roi_radius")
+            col.prop(context.scene.therm_props, "simplify_base_tolerance")
+            col.prop(context.scene.therm_props, "simplify_growth")
+            col.prop(context.scene.therm_props, "simplify_max_tolerance")
+        
         layout.separator()
         layout.operator("therm.export_to_therm", text="Eksportuj do THERM", icon='EXPORT')
         
@@ -283,9 +318,32 @@ class THERM_PT_panel(bpy.types.Panel):
         
         col = box.column()
         col.prop(context.scene.therm_props, "therm_executable_path", text="Ścieżka do THERM")
-        
-        if context.scene.therm_props.therm_executable_path and os.path.exists(context.scene.therm_props.therm_executable_path):
+        col.prop(context.scene.therm_props, "reuse_results")
+        col.prop(context.scene.therm_props, "therm_max_workers")
+        col.prop(context.scene.therm_props, "therm_stall_timeout")
+        col.prop(context.scene.therm_props, "mesh_level")
+        col.prop(context.scene.therm_props, "mesh_error_limit")
+        col.prop(context.scene.therm_props, "mesh_max_iterations")
+        col.prop(context.scene.therm_props, "mesh_refinement")
+        if context.scene.therm_props.mesh_refinement:
+            col.prop(context.scene.therm_props, "refine_start_level")
+            col.prop(context.scene.therm_props, "refine_tolerance")
+        col.prop(context.scene.therm_props, "adaptive_timeout")
+        if context.scene.therm_props.adaptive_timeout:
+            col.prop(context.scene.therm_props, "timeout_safety_factor")
+        col.prop(context.scene.therm_props, "solver_backend")
+        if context.scene.therm_props.solver_backend == 'SPOOL':
+            col.prop(context.scene.therm_props, "spool_directory")
+            col.operator("therm.start_spool_worker", icon='NETWORK_DRIVE')
+        
+        manual_path = context.scene.therm_props.therm_executable_path
+        override = os.environ.get(therm_discovery.ENV_VARIABLE)
+        if override and os.path.exists(override):
+            col.label(text=f"✓ THERM z {therm_discovery.ENV_VARIABLE}", icon='CHECKMARK')
+        elif manual_path and os.path.exists(manual_path):
             col.label(text="✓ THERM znaleziony", icon='CHECKMARK')
+        elif therm_discovery.load_cached(manual_path):
+            col.label(text=f"✓ THERM: {therm_discovery.load_cached(manual_path)}", icon='CHECKMARK')
         else:
             col.label(text="✗ Wskaż ścieżkę do THERM7.exe", icon='ERROR')
         
@@ -302,10 +360,30 @@ class THERM_PT_panel(bpy.types.Panel):
             row = col.row()
             row.operator("therm.run_therm_calculation_thmx", text="Uruchom obliczenia (.thmx)", icon='RENDER_RESULT')
             
+            # Obliczenia w tle - postęp na pasku stanu
+            active_solver = operators.THERM_OT_run_therm_calculation_thmx.active_solver
+            if active_solver is not None:
+                row = col.row()
+                row.label(text=f"THERM: {active_solver.phase()}", icon='TIME')
+                row.operator("therm.cancel_therm_calculation", text="Przerwij", icon='CANCEL')
+            
             if not os.path.exists(therm_thmx_path):
                 row = col.row()
                 row.label(text="Plik .thmx nie istnieje", icon='ERROR')
             
+            # Historia zbieżności ostatniego zagęszczania siatki
+            history = therm_refine.load_history(therm_thmx_path)
+            if history and history.get('levels'):
+                state = "zbieżne" if history.get('converged') else "niezbieżne"
+                col.label(text=f"Zagęszczanie siatki ({state}, tolerancja {history.get('tolerance', 0):.2f}%):", icon='MOD_REMESH')
+                for level in history['levels']:
+                    if not level['success']:
+                        col.label(text=f"    MeshLevel {level['level']}: błąd ({level['elapsed']:.0f} s)")
+                        continue
+                    values = ", ".join(f"{value:.4f}" for value in level['ufactors'].values() if isinstance(value, float))
+                    change = f", zmiana {level['change']:.2f}%" if level.get('change') is not None else ""
+                    col.label(text=f"    MeshLevel {level['level']}: U {values or '-'} ({level['elapsed']:.0f} s{change})")
+            
             row = col.row()
             row.operator("therm.run_therm_calculation_thm", text="Uruchom THERM (.thm)", icon='FILE')
             
@@ -318,6 +396,83 @@ class THERM_PT_panel(bpy.types.Panel):
         
 
 
+        # Kolejka obliczeń THERM
+        box = layout.box()
+        box.label(text="Kolejka obliczeń THERM:", icon='SORTTIME')
+        
+        queue = operators.get_project_queue()
+        if queue is None:
+            box.label(text="Zapisz plik Blender aby użyć kolejki", icon='ERROR')
+        else:
+            col = box.column(align=True)
+            col.prop(context.scene.therm_props, "queue_priority")
+            col.prop(context.scene.therm_props, "queue_timeout")
+            col.prop(context.scene.therm_props, "queue_retries")
+            
+            row = box.row(align=True)
+            row.operator("therm.queue_project_thmx", text="Kolejkuj .thmx projektu", icon='ADD')
+            row.operator("therm.queue_start_worker", text="Wznów", icon='PLAY')
+            
+            state = queue.snapshot()
+            if queue.worker_alive(state):
+                box.label(text=f"Proces roboczy: PID {state['worker'].get('pid')}", icon='CHECKMARK')
+            
+            state_icons = {
+                therm_queue.QUEUED: 'SORTTIME',
+                therm_queue.RUNNING: 'TIME',
+                therm_queue.DONE: 'CHECKMARK',
+                therm_queue.FAILED: 'ERROR',
+                therm_queue.CANCELLED: 'CANCEL',
+            }
+            now = time.time()
+            
+            for job in sorted(state['jobs'], key=lambda job: (job['state'] not in therm_queue.ACTIVE_STATES,
+                                                              -job['priority'], job['enqueued'])):
+                row = box.row(align=True)
+                name = os.path.basename(job['thmx'])
+                if job['state'] == therm_queue.RUNNING and job['started']:
+                    timing = f"{now - job['started']:.0f} s"
+                elif job['elapsed'] is not None:
+                    timing = f"{job['elapsed']:.1f} s"
+                else:
+                    timing = ""
+                row.label(text=f"{name}  P{job['priority']}  {timing}", icon=state_icons.get(job['state'], 'QUESTION'))
+                
+                if job['state'] == therm_queue.QUEUED:
+                    for action, icon in (('PRIORITY_UP', 'TRIA_UP'), ('PRIORITY_DOWN', 'TRIA_DOWN'), ('CANCEL', 'CANCEL')):
+                        op = row.operator("therm.queue_job", text="", icon=icon)
+                        op.job_id, op.action = job['id'], action
+                elif job['state'] == therm_queue.RUNNING:
+                    op = row.operator("therm.queue_job", text="", icon='CANCEL')
+                    op.job_id, op.action = job['id'], 'CANCEL'
+                    if job.get('progress'):
+                        progress = therm_progress.SolverProgress.from_dict(job['progress'])
+                        box.label(text=f"    {progress.describe()}")
+                else:
+                    op = row.operator("therm.queue_job", text="", icon='FILE_REFRESH')
+                    op.job_id, op.action = job['id'], 'RETRY'
+                    op = row.operator("therm.queue_job", text="", icon='X')
+                    op.job_id, op.action = job['id'], 'REMOVE'
+            
+            if any(job['state'] in therm_queue.FINISHED_STATES for job in state['jobs']):
+                box.operator("therm.queue_clear_finished", icon='TRASH')
+        
+        # Historia obliczeń THERM
+        overview = get_history_overview()
+        if overview and overview['summary']['runs']:
+            summary = overview['summary']
+            box = layout.box()
+            box.label(text=f"Historia obliczeń ({overview['days']} dni):", icon='TIME')
+            col = box.column(align=True)
+            col.label(text=f"Obliczenia: {summary['runs']:.0f} (udane {summary['succeeded']:.0f}, błędy {summary['failed']:.0f}, limit czasu {summary['timed_out']:.0f})")
+            col.label(text=f"Czas łącznie {summary['total_time'] / 3600:.1f} h, średnio {summary['mean_time']:.0f} s, maks. {summary['max_time']:.0f} s")
+            if overview['slowest']:
+                col.label(text="Najwolniejsze modele:")
+                for run in overview['slowest']:
+                    points = f", {run['points']} punktów" if run['points'] is not None else ""
+                    level = f", MeshLevel {run['mesh_level']}" if run['mesh_level'] is not None else ""
+                    col.label(text=f"    {os.path.basename(run['thmx'])}: {run['wall_time']:.0f} s{points}{level}")
+        
         # Eksport do Excel
         box = layout.box()
         box.label(text="Eksport do Excel:", icon='EXPORT')
@@ -1,4 +1,13 @@
 import bpy
+from . import therm_discovery
+
+def update_therm_executable_path(self, context):
+    """Zmiana ścieżki ręcznej unieważnia zapamiętany wynik wyszukiwania THERM"""
+    therm_discovery.clear_cache()
+
+def poll_roi_object(self, obj):
+    """Obszar mostka może być wskazany przez Empty lub krzywą"""
+    return obj.type in {'EMPTY', 'CURVE'}
 
 class THERMProperties(bpy.types.PropertyGroup):
     open_export_folder: bpy.props.BoolProperty(
@@ -38,6 +47,229 @@ class THERMProperties(bpy.types.PropertyGroup):
         name="Ścieżka do THERM7.exe",
         description="Ręcznie wskaż ścieżkę do THERM7.exe jeśli nie jest automatycznie znajdowana",
         subtype='FILE_PATH',
+        default="",
+        update=update_therm_executable_path
+    )
+    
+    solver_backend: bpy.props.EnumProperty(
+        name="Obliczenia",
+        description="Gdzie uruchamiać obliczenia THERM",
+        items=[
+            ('LOCAL', "Ten komputer", "Proces THERM uruchamiany lokalnie"),
+            ('SPOOL', "Folder wymiany", "Zadania w folderze współdzielonym - liczą je procesy robocze na komputerach biura"),
+        ],
+        default='LOCAL'
+    )
+    
+    spool_directory: bpy.props.StringProperty(
+        name="Folder wymiany",
+        description="Folder współdzielony, z którego procesy robocze pobierają zadania THERM",
+        subtype='DIR_PATH',
+        default=""
+    )
+    
+    therm_max_workers: bpy.props.IntProperty(
+        name="Równoległe obliczenia",
+        description="Liczba jednocześnie uruchamianych procesów THERM (0 = liczba rdzeni procesora)",
+        default=0,
+        min=0
+    )
+    
+    mesh_level: bpy.props.IntProperty(
+        name="MeshLevel",
+        description="Poziom siatki THERM (wyższy - dokładniej i dłużej); przy zagęszczaniu poziom maksymalny",
+        default=8,
+        min=3,
+        max=12
+    )
+    
+    mesh_error_limit: bpy.props.FloatProperty(
+        name="ErrorLimit [%]",
+        description="Dopuszczalny błąd energii, po którym THERM przestaje zagęszczać siatkę",
+        default=10.0,
+        min=0.1,
+        max=100.0
+    )
+    
+    mesh_max_iterations: bpy.props.IntProperty(
+        name="MaxIterations",
+        description="Maksymalna liczba iteracji adaptacyjnego zagęszczania siatki THERM",
+        default=10,
+        min=1,
+        max=100
+    )
+    
+    mesh_refinement: bpy.props.BoolProperty(
+        name="Zagęszczaj siatkę do zbieżności",
+        description="Licz od zgrubnego MeshLevel i zwiększaj poziom, dopóki U-factors zmieniają się bardziej niż tolerancja",
+        default=False
+    )
+    
+    refine_start_level: bpy.props.IntProperty(
+        name="Początkowy MeshLevel",
+        description="Poziom siatki pierwszego obliczenia przy zagęszczaniu",
+        default=5,
+        min=3,
+        max=12
+    )
+    
+    refine_tolerance: bpy.props.FloatProperty(
+        name="Tolerancja U [%]",
+        description="Zagęszczanie kończy się, gdy U-factors kolejnych poziomów różnią się mniej niż ta wartość",
+        default=1.0,
+        min=0.01,
+        max=50.0
+    )
+    
+    adaptive_timeout: bpy.props.BoolProperty(
+        name="Limit czasu z rozmiaru modelu",
+        description="Limit czasu obliczeń przewidywany z liczby wielokątów, punktów, MeshLevel i czasów wcześniejszych obliczeń",
+        default=True
+    )
+    
+    timeout_safety_factor: bpy.props.FloatProperty(
+        name="Współczynnik bezpieczeństwa",
+        description="Limit czasu = przewidywany czas obliczeń x współczynnik",
+        default=3.0,
+        min=1.5,
+        max=20.0
+    )
+    
+    therm_stall_timeout: bpy.props.FloatProperty(
+        name="Przerwij bez wyjścia po [s]",
+        description="Proces THERM, który tak długo nic nie wypisuje, jest uznawany za zawieszony i przerywany (0 = tylko ostrzeżenie)",
+        default=0.0,
+        min=0.0
+    )
+    
+    queue_priority: bpy.props.IntProperty(
+        name="Priorytet",
+        description="Priorytet zadań dodawanych do kolejki (wyższy liczony wcześniej)",
+        default=0
+    )
+    
+    queue_timeout: bpy.props.FloatProperty(
+        name="Limit czasu zadania [s]",
+        description="Po tym czasie proces THERM zadania jest przerywany",
+        default=300.0,
+        min=10.0
+    )
+    
+    queue_retries: bpy.props.IntProperty(
+        name="Ponowienia",
+        description="Ile razy ponowić nieudane zadanie przed oznaczeniem go jako błędne",
+        default=1,
+        min=0,
+        max=10
+    )
+    
+    reuse_results: bpy.props.BoolProperty(
+        name="Używaj wyników identycznych złączy",
+        description="Pomiń obliczenia THERM, jeśli w projekcie rozwiązano już model o tej samej geometrii, materiałach i warunkach brzegowych (niezależnie od położenia i obrotu)",
+        default=True
+    )
+    
+    bc_snap_tolerance: bpy.props.FloatProperty(
+        name="Tolerancja przyciągania BC [mm]",
+        description="Krzywe warunków brzegowych, które nie leżą dokładnie na krawędzi, są przyciągane do najbliższej współliniowej krawędzi w tej odległości (0 = wyłączone)",
+        default=1.0,
+        min=0.0,
+        max=50.0
+    )
+    
+    junction_object: bpy.props.PointerProperty(
+        name="Obszar mostka",
+        description="Empty lub krzywa U-Factor wyznaczająca położenie mostka termicznego (złącza)",
+        type=bpy.types.Object,
+        poll=poll_roi_object
+    )
+    
+    simplify_enabled: bpy.props.BoolProperty(
+        name="Upraszczaj geometrię",
+        description="Usuwaj drobne detale (fazy, rowki, zaokrąglenia) z dala od mostka termicznego podczas eksportu",
+        default=False
+    )
+    
+    simplify_roi_radius: bpy.props.FloatProperty(
+        name="Promień obszaru [mm]",
+        description="Odległość od obszaru mostka, w której geometria pozostaje nietknięta",
+        default=300.0,
+        min=0.0
+    )
+    
+    simplify_base_tolerance: bpy.props.FloatProperty(
+        name="Tolerancja bazowa [mm]",
+        description="Tolerancja upraszczania na granicy obszaru mostka",
+        default=0.5,
+        min=0.0
+    )
+    
+    simplify_growth: bpy.props.FloatProperty(
+        name="Przyrost tolerancji [mm/mm]",
+        description="O ile rośnie tolerancja na każdy milimetr odległości od obszaru mostka",
+        default=0.01,
+        min=0.0,
+        max=1.0
+    )
+    
+    simplify_max_tolerance: bpy.props.FloatProperty(
+        name="Maks. tolerancja [mm]",
+        description="Największy usuwany detal niezależnie od odległości",
+        default=5.0,
+        min=0.0
+    )
+
+    usection_probe_step: bpy.props.FloatProperty(
+        name="Krok próbkowania [mm]",
+        description="Odstęp linii próbkujących układ warstw wzdłuż krzywych Ti",
+        default=10.0,
+        min=0.5
+    )
+    
+    usection_min_length: bpy.props.FloatProperty(
+        name="Min. długość obszaru [mm]",
+        description="Minimalna długość odcinka Ti o stałym układzie warstw (przepływ 1D), dla którego tworzona jest sekcja U",
+        default=100.0,
+        min=1.0
+    )
+    
+    usection_clip_enabled: bpy.props.BoolProperty(
+        name="Przycinaj sekcje U do pasa",
+        description="Eksportuj tylko pas warstw wokół krzywej sekcji U (kierunek z krzywych Ti/Te)",
+        default=True
+    )
+    
+    usection_strip_width: bpy.props.FloatProperty(
+        name="Szerokość pasa U [mm]",
+        description="Szerokość pasa wzdłuż krzywej Ti (0 = długość krzywej Ti)",
+        default=0.0,
+        min=0.0
+    )
+    
+    crop_enabled: bpy.props.BoolProperty(
+        name="Przycinaj elementy flankujące",
+        description="Przycinaj geometrię i krzywe warunków brzegowych w odległości odcięcia od złącza (ISO 10211)",
+        default=False
+    )
+    
+    crop_cutoff_length: bpy.props.FloatProperty(
+        name="Długość odcięcia [mm]",
+        description="Odległość płaszczyzny cięcia od złącza (ISO 10211: co najmniej 1 m lub 3x grubość elementu)",
+        default=1000.0,
+        min=1.0
+    )
+
+class THERMUSectionDefinition(bpy.types.PropertyGroup):
+    """Definicja sekcji U dla operatora therm.create_usections"""
+    name: bpy.props.StringProperty(
+        name="Nazwa",
+        description="Nazwa sekcji (np. U3) - pusta oznacza pierwszą wolną U<n>",
+        default=""
+    )
+    
+    ti_curve: bpy.props.StringProperty(
+        name="Krzywa Ti",
+        description="Nazwa krzywej Ti, z której powstaje sekcja - pusta oznacza pierwszą zaznaczoną",
         default=""
     )
 
@@ -86,6 +318,7 @@ class THERMEdgeProperties(bpy.types.PropertyGroup):
     )
 
 def register():
+    bpy.utils.register_class(THERMUSectionDefinition)
     bpy.utils.register_class(THERMProperties)
     bpy.utils.register_class(THERMEdgeProperties)
     bpy.types.Scene.therm_props = bpy.props.PointerProperty(type=THERMProperties)
@@ -95,4 +328,5 @@ def unregister():
     del bpy.types.Scene.therm_props
     del bpy.types.Scene.therm_edge_props
     bpy.utils.unregister_class(THERMEdgeProperties)
-    bpy.utils.unregister_class(THERMProperties)
\ No newline at end of file
+    bpy.utils.unregister_class(THERMProperties)
+    bpy.utils.unregister_class(THERMUSectionDefinition)
\ No newline at end of file
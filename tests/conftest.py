@@ -0,0 +1,96 @@
+import os
+import sys
+import textwrap
+
+import pytest
+
+# Moduły bez zależności od bpy importowane bezpośrednio (jak w procesach roboczych)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODEL = """<?xml version="1.0"?>
+<THERM-XML xmlns="http://windows.lbl.gov">
+	<ThermVersion>Version 7.8.74.0</ThermVersion>
+	<SaveDate>2026-01-01T00:00:00</SaveDate>
+	<Title>U1</Title>
+	<MeshControl MeshLevel="8" ErrorCheckFlag="1" ErrorLimit="10.00" MaxIterations="10" CMAflag="0" />
+	<Materials>
+		<Material Name="Brick" Index="1" Type="0" Conductivity="0.5" />
+	</Materials>
+	<BoundaryConditions>
+		<BoundaryCondition Name="Ti" Type="0" H="7.69" Temperature="20.00" />
+		<BoundaryCondition Name="Te" Type="0" H="25.00" Temperature="0.00" />
+	</BoundaryConditions>
+	<Polygons>
+		<Polygon ID="1" Material="Brick" NSides="4" Type="1" units="mm">
+			<Point index="0" x="0.000000" y="0.000000" />
+			<Point index="1" x="100.000000" y="0.000000" />
+			<Point index="2" x="100.000000" y="50.000000" />
+			<Point index="3" x="0.000000" y="50.000000" />
+		</Polygon>
+	</Polygons>
+	<Boundaries>
+		<BCPolygon ID="1" BC="Ti" units="mm" UFactorTag="U1">
+			<Point index="0" x="0.000000" y="0.000000" />
+			<Point index="1" x="0.000000" y="50.000000" />
+		</BCPolygon>
+	</Boundaries>
+</THERM-XML>
+"""
+
+def results_section(ufactor):
+    return (f'<MeshInput><Node x="0" y="0" /></MeshInput><Results><Case><U-factors><Tag>U1</Tag>'
+            f'<DeltaT value="20" /><Projection><Length-type>Total length</Length-type><Length value="50" />'
+            f'<U-factor value="{ufactor:.6f}" /></Projection></U-factors></Case></Results>')
+
+def solved_model(ufactor):
+    """Model z sekcjami wyników, jak po obliczeniach THERM"""
+    return MODEL.replace('</THERM-XML>', results_section(ufactor) + '\n</THERM-XML>')
+
+FAKE_THERM = """
+import os, re, sys, time
+path = sys.argv[sys.argv.index('-thmx') + 1]
+base = os.path.splitext(path)[0]
+mode = os.environ.get('FAKE_THERM_MODE', 'solve')
+print('Meshing', flush=True)
+open(base + '.o', 'w').write('mesh')
+if mode == 'hang':
+    time.sleep(60)
+    sys.exit(1)
+with open(path, encoding='utf-8') as f:
+    text = f.read()
+level = int(re.search(r'MeshLevel="(\\d+)"', text).group(1))
+ufactor = float(os.environ.get('FAKE_THERM_UFACTOR', 1.0 + 0.5 * 0.3 ** (level - 3)))
+results = RESULTS.replace('UFACTOR', f'{ufactor:.6f}')
+with open(path, 'w', encoding='utf-8') as f:
+    f.write(text.replace('</THERM-XML>', results + '\\n</THERM-XML>'))
+open(base + '.thm', 'w').write('results')
+if mode == 'linger':
+    time.sleep(60)
+"""
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = tmp_path / "model.thmx"
+    path.write_text(MODEL, encoding='utf-8')
+    return str(path)
+
+@pytest.fixture
+def fake_therm(tmp_path):
+    """Skrypt udający THERM: dopisuje sekcję Results z U-factor zależnym od MeshLevel"""
+    if os.name == 'nt':
+        pytest.skip("skrypt wykonywalny wymaga systemu POSIX")
+    script = tmp_path / "fake_therm.py"
+    script.write_text(f"RESULTS = {results_section(0.0).replace('0.000000', 'UFACTOR')!r}\n"
+                      + textwrap.dedent(FAKE_THERM), encoding='utf-8')
+    exe = tmp_path / "therm"
+    exe.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n', encoding='utf-8')
+    exe.chmod(0o755)
+    return str(exe)
+
+@pytest.fixture(autouse=True)
+def isolated_home(tmp_path, monkeypatch):
+    """Historia czasów i obliczeń w folderze testu, nie w katalogu domowym"""
+    import therm_history
+    import therm_timeout
+    monkeypatch.setattr(therm_history, 'HISTORY_DIR', str(tmp_path / 'home'))
+    monkeypatch.setattr(therm_timeout, 'MODEL_DIR', str(tmp_path / 'home'))
@@ -0,0 +1,66 @@
+import os
+import threading
+import time
+
+import therm_backends
+import therm_filelock
+import therm_results
+from conftest import solved_model
+
+def submit(tmp_path, timeout=30.0):
+    thmx = tmp_path / "model.thmx"
+    thmx.write_text(solved_model(1.5), encoding='utf-8')
+    backend = therm_backends.SpoolBackend(str(tmp_path / "spool"))
+    return backend, backend.submit(str(thmx), timeout)
+
+def test_spool_round_trip(tmp_path, fake_therm, monkeypatch):
+    monkeypatch.setenv('FAKE_THERM_UFACTOR', '2.5')
+    backend, job = submit(tmp_path)
+    worker = threading.Thread(target=therm_backends.run_spool_worker,
+                              args=(backend.spool_dir, fake_therm),
+                              kwargs={'idle_exit': 0.5, 'poll_interval': 0.05})
+    worker.start()
+    job.wait(interval=0.05)
+    worker.join()
+
+    assert job.succeeded() and job.worker
+    assert therm_results.read_ufactors(job.thmx_filepath) == {'U1': 2.5}
+    assert os.listdir(backend.jobs_dir) == []
+
+def test_unclaimed_job_times_out_on_the_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(therm_backends, 'CLIENT_GRACE', 0.1)
+    backend, job = submit(tmp_path, timeout=0.1)
+    job.wait(interval=0.05)
+
+    assert job.timed_out and not job.succeeded()
+    assert therm_results.read_ufactors(job.thmx_filepath) == {'U1': 1.5}
+    # Wycofane zadanie sprząta pierwszy proces roboczy, który na nie trafi
+    assert therm_backends.claim_next_job(backend.spool_dir) is None
+    assert os.listdir(backend.jobs_dir) == []
+
+def test_claim_is_exclusive_and_judged_by_heartbeat(tmp_path, monkeypatch):
+    monkeypatch.setattr(therm_backends, 'CLAIM_STALE_AGE', 0.3)
+    backend, job = submit(tmp_path)
+    job_dir, claim = therm_backends.claim_next_job(backend.spool_dir)
+    assert therm_backends.claim_next_job(backend.spool_dir) is None
+
+    # Czas modyfikacji z rozjechanego zegara innego komputera nie czyni blokady porzuconą
+    old = time.time() - 3600
+    os.utime(claim.path, (old, old))
+    assert therm_backends._try_claim(job_dir) is None
+
+    # Odświeżana blokada pozostaje ważna
+    for _ in range(4):
+        time.sleep(0.1)
+        assert claim.refresh(force=True)
+        assert therm_backends._try_claim(job_dir) is None
+
+    # Bez odświeżeń dłużej niż CLAIM_STALE_AGE - zadanie przejmuje inny proces roboczy
+    deadline = time.time() + 2.0
+    stolen = None
+    while stolen is None and time.time() < deadline:
+        stolen = therm_backends._try_claim(job_dir)
+        time.sleep(0.05)
+    assert stolen is not None and stolen.owned()
+    assert not claim.refresh(force=True)
+    assert therm_filelock.read_lock(claim.path)['token'] == stolen.token
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+import therm_discovery
+
+@pytest.fixture
+def probe(tmp_path, monkeypatch):
+    """Wyszukiwanie zastąpione jednym plikiem THERM7.exe - licznik wywołań w probe.calls"""
+    exe = tmp_path / "THERM" / "THERM7.exe"
+    exe.parent.mkdir()
+    exe.write_text("exe", encoding='utf-8')
+
+    def probe_therm_executable():
+        probe_therm_executable.calls += 1
+        return str(exe) if exe.exists() else None
+
+    probe_therm_executable.calls = 0
+    probe_therm_executable.exe = exe
+    monkeypatch.delenv(therm_discovery.ENV_VARIABLE, raising=False)
+    monkeypatch.setattr(therm_discovery, 'probe_therm_executable', probe_therm_executable)
+    monkeypatch.setattr(therm_discovery, '_memory_cache', {})
+    return probe_therm_executable
+
+def test_environment_variable_wins(tmp_path, probe, monkeypatch):
+    override = tmp_path / "override.exe"
+    override.write_text("exe", encoding='utf-8')
+    monkeypatch.setenv(therm_discovery.ENV_VARIABLE, str(override))
+
+    assert therm_discovery.find_therm_executable(cache_dir=str(tmp_path)) == str(override)
+    assert probe.calls == 0
+
+def test_missing_override_falls_back_to_search(tmp_path, probe, monkeypatch):
+    monkeypatch.setenv(therm_discovery.ENV_VARIABLE, str(tmp_path / "missing.exe"))
+
+    assert therm_discovery.find_therm_executable(cache_dir=str(tmp_path)) == str(probe.exe)
+
+def test_manual_path_skips_search(tmp_path, probe):
+    manual = tmp_path / "manual.exe"
+    manual.write_text("exe", encoding='utf-8')
+
+    assert therm_discovery.find_therm_executable(str(manual), cache_dir=str(tmp_path)) == str(manual)
+    assert probe.calls == 0
+
+def test_search_result_is_cached_on_disk(tmp_path, probe, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+
+    assert therm_discovery.find_therm_executable(cache_dir=cache_dir) == str(probe.exe)
+    assert therm_discovery.find_therm_executable(cache_dir=cache_dir) == str(probe.exe)
+    assert probe.calls == 1
+
+    # Nowa sesja Blendera - wpis odczytany z pliku
+    monkeypatch.setattr(therm_discovery, '_memory_cache', {})
+    assert therm_discovery.find_therm_executable(cache_dir=cache_dir) == str(probe.exe)
+    assert probe.calls == 1
+
+def test_cache_invalidated_by_changed_executable(tmp_path, probe):
+    cache_dir = str(tmp_path / "cache")
+    therm_discovery.find_therm_executable(cache_dir=cache_dir)
+
+    stat = os.stat(probe.exe)
+    os.utime(probe.exe, (stat.st_atime, stat.st_mtime + 10))
+
+    assert therm_discovery.find_therm_executable(cache_dir=cache_dir) == str(probe.exe)
+    assert probe.calls == 2
+
+def test_cache_invalidated_by_removed_executable(tmp_path, probe):
+    cache_dir = str(tmp_path / "cache")
+    therm_discovery.find_therm_executable(cache_dir=cache_dir)
+    probe.exe.unlink()
+
+    assert therm_discovery.find_therm_executable(cache_dir=cache_dir) is None
+    assert therm_discovery.load_cached(cache_dir=cache_dir) is None
+
+def test_cache_invalidated_by_other_manual_path(tmp_path, probe):
+    cache_dir = str(tmp_path / "cache")
+    therm_discovery.find_therm_executable(cache_dir=cache_dir)
+
+    # Ręczna ścieżka, która nie istnieje - wpis zapisany bez niej nie jest używany
+    assert therm_discovery.load_cached(str(tmp_path / "missing.exe"), cache_dir) is None
+    therm_discovery.find_therm_executable(str(tmp_path / "missing.exe"), cache_dir=cache_dir)
+    assert probe.calls == 2
+
+def test_clear_cache(tmp_path, probe):
+    cache_dir = str(tmp_path / "cache")
+    therm_discovery.find_therm_executable(cache_dir=cache_dir)
+    therm_discovery.clear_cache(cache_dir)
+
+    assert os.listdir(cache_dir) == []
+    therm_discovery.find_therm_executable(cache_dir=cache_dir)
+    assert probe.calls == 2
@@ -0,0 +1,107 @@
+import math
+import os
+import re
+import threading
+
+import therm_fingerprint
+import therm_results
+from conftest import MODEL, solved_model
+
+def transformed(text, angle_deg, dx, dy):
+    """Model obrócony wokół początku układu i przesunięty (współrzędne jak w eksporcie - 6 miejsc)"""
+    cos_a = math.cos(math.radians(angle_deg))
+    sin_a = math.sin(math.radians(angle_deg))
+
+    def replace(match):
+        x, y = float(match.group(1)), float(match.group(2))
+        return f'x="{x * cos_a - y * sin_a + dx:.6f}" y="{x * sin_a + y * cos_a + dy:.6f}"'
+
+    return re.sub(r'x="([-\d.]+)" y="([-\d.]+)"', replace, text)
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+def test_fingerprint_invariant_to_translation_and_rotation(tmp_path):
+    reference = therm_fingerprint.fingerprint_thmx(write(tmp_path, "a.thmx", MODEL))
+    for index, (angle, dx, dy) in enumerate([(0, 0.037, -12.0449), (90, 5, 5), (37, 1234.56789, -0.05), (-123.4, 0.0, 0.0)]):
+        moved = write(tmp_path, f"moved{index}.thmx", transformed(MODEL, angle, dx, dy))
+        assert therm_fingerprint.fingerprint_thmx(moved) == reference, (angle, dx, dy)
+
+    solved = write(tmp_path, "solved.thmx", solved_model(1.5))
+    assert therm_fingerprint.fingerprint_thmx(solved) == reference
+
+    changed = write(tmp_path, "changed.thmx", MODEL.replace('x="100.000000" y="50.000000"', 'x="100.000000" y="60.000000"'))
+    assert therm_fingerprint.fingerprint_thmx(changed) != reference
+
+def test_apply_cached_result_replaces_previous_results(tmp_path):
+    source = write(tmp_path, "source.thmx", solved_model(1.5))
+    target = write(tmp_path, "target.thmx", solved_model(9.9).replace('>\n', '>'))
+
+    assert therm_fingerprint.apply_cached_result(source, target)
+
+    assert therm_results.read_ufactors(target) == {'U1': 1.5}
+    assert '<MeshInput' not in open(target, encoding='utf-8').read()
+    assert therm_results.read_model_stats(target)['polygons'] == 1
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
+
+def test_result_index_rechecks_changed_source(tmp_path):
+    source = write(tmp_path, "source.thmx", solved_model(1.5))
+    fingerprint = therm_fingerprint.fingerprint_thmx(source)
+    index = therm_fingerprint.ResultIndex.for_directory(str(tmp_path))
+    index.store(fingerprint, source)
+
+    assert index.lookup(fingerprint)['thmx'] == os.path.abspath(source)
+
+    # Ten sam model zapisany na nowo (inne formatowanie) - wpis nadal ważny
+    write(tmp_path, "source.thmx", solved_model(1.5).replace('\t', '  '))
+    assert index.lookup(fingerprint) is not None
+
+    # Inny model pod tą samą nazwą - wpis odrzucony
+    write(tmp_path, "source.thmx", solved_model(1.5).replace('Conductivity="0.5"', 'Conductivity="0.9"'))
+    assert index.lookup(fingerprint) is None
+
+def test_result_index_concurrent_stores_keep_every_entry(tmp_path):
+    sources = [write(tmp_path, f"source{i}.thmx", solved_model(1.0 + i)) for i in range(8)]
+
+    def store(i):
+        therm_fingerprint.ResultIndex.for_directory(str(tmp_path)).store(f"fingerprint{i}", sources[i])
+
+    threads = [threading.Thread(target=store, args=(i,)) for i in range(len(sources))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    index = therm_fingerprint.ResultIndex.for_directory(str(tmp_path))
+    index.load()
+    assert sorted(index.entries) == sorted(f"fingerprint{i}" for i in range(len(sources)))
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
+
+def square_model(boundaries, angle_deg=0.0):
+    cos_a = math.cos(math.radians(angle_deg))
+    sin_a = math.sin(math.radians(angle_deg))
+
+    def turn(points):
+        return [(x * cos_a - y * sin_a, x * sin_a + y * cos_a) for x, y in points]
+
+    square = [(0.0, 0.0), (100.0, 0.0), (100.0, 100.0), (0.0, 100.0)]
+    return {
+        'polygons': [(('Brick',), turn(square))],
+        'boundaries': [(name, '', turn(points)) for name, points in boundaries],
+        'mesh_control': []
+    }
+
+def test_fingerprint_encodes_boundary_placement():
+    top_ti = ('Ti', [(100.0, 100.0), (0.0, 100.0)])
+    opposite = square_model([top_ti, ('Te', [(0.0, 0.0), (100.0, 0.0)])])
+    corner = square_model([top_ti, ('Te', [(0.0, 100.0), (0.0, 0.0)])])
+
+    assert therm_fingerprint.fingerprint_model(opposite) != therm_fingerprint.fingerprint_model(corner)
+
+    # Ten sam narożnik obrócony o 90° (kwadrat symetryczny - inny punkt początkowy cyklu)
+    corner_turned = square_model([('Ti', [(0.0, 100.0), (0.0, 0.0)]), ('Te', [(0.0, 0.0), (100.0, 0.0)])])
+    assert therm_fingerprint.fingerprint_model(corner_turned) == therm_fingerprint.fingerprint_model(corner)
+    corner_rotated = square_model([top_ti, ('Te', [(0.0, 100.0), (0.0, 0.0)])], angle_deg=33.0)
+    assert therm_fingerprint.fingerprint_model(corner_rotated) == therm_fingerprint.fingerprint_model(corner)
@@ -0,0 +1,84 @@
+import therm_geometry
+
+# Kwadrat z wierzchołkiem cofniętym o 0.5 mm - skrót (100, 100) -> (0, 100) usuwa wcięcie
+NOTCHED = [(0.0, 0.0), (100.0, 0.0), (100.0, 100.0), (50.0, 99.5), (0.0, 100.0)]
+NOTCH = (50.0, 99.5)
+
+def simplify(polygons, protected_points=()):
+    far_away = [((10000.0, 10000.0), (10000.0, 10000.0))]
+    return therm_geometry.simplify_polygons(polygons, far_away, 0.0, 1.0, 0.0, 1.0, protected_points)
+
+def test_notch_is_removed():
+    (square,), removed = simplify([NOTCHED])
+
+    assert removed == 1 and NOTCH not in square
+
+def test_shortcut_may_not_cross_other_polygon():
+    # Polygon w wycięciu bez wspólnych wierzchołków - skrót przeciąłby jego boki
+    neighbour = [(40.0, 99.8), (60.0, 99.8), (60.0, 101.0), (40.0, 101.0)]
+    (square, _), _ = simplify([NOTCHED, neighbour])
+
+    assert NOTCH in square
+
+def test_shortcut_may_not_cover_other_polygon():
+    # Polygon w całości między wcięciem a skrótem - żadna krawędź nie jest przecinana
+    island = [(45.0, 99.7), (55.0, 99.7), (55.0, 99.9), (45.0, 99.9)]
+    (square, _), _ = simplify([NOTCHED, island])
+
+    assert NOTCH in square
+
+def test_protected_vertex_is_kept():
+    (square,), removed = simplify([NOTCHED], protected_points={NOTCH})
+
+    assert removed == 0 and NOTCH in square
+
+BOX = (0.0, 0.0, 10.0, 10.0)
+
+def test_curve_and_polygon_share_cut_points():
+    # Ukośna krawędź przecina dwie linie cięcia; krzywa leży 0.04 mm obok niej
+    edge = ((3.0, -7.0), (17.0, 13.0))
+    polygon = [edge[0], edge[1], (-5.0, 13.0)]
+    curve = ((3.03, -7.02), (17.03, 12.98))
+
+    (clipped_polygon,) = therm_geometry.clip_polygon_to_box(polygon, BOX)
+    carrier = therm_geometry.EdgeGrid([polygon]).find_carrier(curve[0], curve[1], 0.1)
+    clipped_curve = therm_geometry.clip_segment_to_box(curve[0], curve[1], BOX, carrier=carrier[1:])
+
+    assert all(point in clipped_polygon for point in clipped_curve)
+
+def test_neighbours_share_cut_points_on_box_corner():
+    first = [(5.0, 5.0), (12.0, 11.0), (5.0, 15.0)]
+    second = [(5.0, 5.0), (15.0, 5.0), (12.0, 11.0)]
+
+    (cut_first,) = therm_geometry.clip_polygon_to_box(first, BOX)
+    (cut_second,) = therm_geometry.clip_polygon_to_box(second, BOX)
+
+    # Wspólna krawędź (5, 5)-(12, 11) po przycięciu - oba polygony mają ten sam punkt cięcia
+    assert len(set(cut_first) & set(cut_second)) == 2
+
+def test_cut_edges_skip_parts_covered_by_curves():
+    polygon = [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0)]
+    box = (-5.0, -5.0, 10.0, 15.0)
+
+    assert therm_geometry.find_cut_edges([polygon], box) == [((10.0, 0.0), (10.0, 10.0))]
+    partly = therm_geometry.find_cut_edges([polygon], box, covered=[((10.0, 6.0), (10.0, 4.0))])
+    assert partly == [((10.0, 0.0), (10.0, 4.0)), ((10.0, 6.0), (10.0, 10.0))]
+    assert therm_geometry.find_cut_edges([polygon], box, covered=[((10.0, 10.0), (10.0, -2.0))]) == []
+
+U_SHAPE = [(0, 0), (100, 0), (100, 100), (80, 100), (80, 20), (20, 20), (20, 100), (0, 100)]
+
+def test_concave_polygon_splits_at_cut_line():
+    box = (-10, 50, 110, 110)
+    pieces = therm_geometry.clip_polygon_to_box(U_SHAPE, box)
+
+    assert sorted(sorted(piece) for piece in pieces) == [
+        [(0, 50), (0, 100), (20, 50), (20, 100)],
+        [(80, 50), (80, 100), (100, 50), (100, 100)],
+    ]
+    # Jedna krawędź Adiabatic na każdą nogę, bez mostka wzdłuż linii cięcia
+    assert sorted(therm_geometry.find_cut_edges(pieces, box)) == [((0, 50), (20, 50)), ((80, 50), (100, 50))]
+
+def test_concave_polygon_splits_at_halfplane():
+    pieces = therm_geometry.clip_polygon_to_halfplanes(U_SHAPE, [((0.0, 50.0), (0.0, 1.0))])
+
+    assert len(pieces) == 2 and all(len(piece) == 4 for piece in pieces)
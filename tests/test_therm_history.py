@@ -0,0 +1,35 @@
+import therm_backends
+import therm_history
+from conftest import MODEL, solved_model
+
+def test_input_hash_ignores_formatting_and_results(tmp_path):
+    paths = {}
+    variants = {
+        'plain': MODEL,
+        'solved': solved_model(1.5),
+        'single_line': solved_model(2.5).replace('>\n', '>').replace('\t', ''),
+        'reordered': MODEL.replace('Name="Brick" Index="1"', 'Index="1"   Name="Brick"'),
+        'saved_later': MODEL.replace('2026-01-01T00:00:00', '2026-02-02T12:00:00'),
+    }
+    for name, text in variants.items():
+        paths[name] = tmp_path / f"{name}.thmx"
+        paths[name].write_text(text, encoding='utf-8')
+
+    digests = {name: therm_history.input_hash(str(path)) for name, path in paths.items()}
+    assert len(set(digests.values())) == 1
+
+    changed = tmp_path / "changed.thmx"
+    changed.write_text(MODEL.replace('Conductivity="0.5"', 'Conductivity="0.6"'), encoding='utf-8')
+    assert therm_history.input_hash(str(changed)) != digests['plain']
+
+def test_record_handle(tmp_path, model_file):
+    history = therm_history.RunHistory(str(tmp_path / "runs.sqlite"))
+    job = therm_backends.FakeBackend().submit(model_file, timeout=60.0)
+    job.wait(interval=0.01)
+
+    run_id = history.record_handle(job)
+
+    run = history.runs_for(model_file)[0]
+    assert run['id'] == run_id and run['status'] == therm_history.STATUS_OK and run['backend'] == 'fake'
+    assert run['polygons'] == 1 and run['points'] == 4 and run['mesh_level'] == 8
+    assert history.runs_for_input(therm_history.input_hash(model_file))[0]['id'] == run_id
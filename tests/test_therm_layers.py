@@ -0,0 +1,79 @@
+import pytest
+
+import therm_layers
+
+def rectangle(x0, y0, x1, y1, material, name=None):
+    return {'coords': [(x0, y0), (x1, y0), (x1, y1), (x0, y1)], 'material': material, 'object': name or material}
+
+# Ściana: tynk 10 mm, cegła 250 mm, izolacja 140 mm (powierzchnia Ti przy x = 0, Te przy x = 400)
+WALL = [
+    rectangle(0, 0, 10, 1000, 'Plaster'),
+    rectangle(10, 0, 260, 1000, 'Brick'),
+    rectangle(260, 0, 400, 1000, 'Insulation'),
+]
+
+# Izolacja w kształcie L: 200 mm do y = 400, wyżej 100 mm
+L_WALL = [
+    rectangle(0, 0, 250, 1000, 'Brick'),
+    {'coords': [(250, 0), (450, 0), (450, 400), (350, 400), (350, 1000), (250, 1000)],
+     'material': 'Insulation', 'object': 'Insulation'},
+]
+
+def thicknesses(layers):
+    return [(layer['material'], round(layer['thickness'], 6)) for layer in layers]
+
+def test_probe_multi_layer_wall():
+    probe = therm_layers.LayerProbe(WALL)
+
+    intervals = probe.intervals((0.0, 500.0), (1.0, 0.0))
+    assert [(round(t0, 6), round(t1, 6), index) for t0, t1, index in intervals] == \
+        [(0.0, 10.0, 0), (10.0, 260.0, 1), (260.0, 400.0, 2)]
+    assert thicknesses(probe.probe((0.0, 500.0), (1.0, 0.0))) == \
+        [('Plaster', 10.0), ('Brick', 250.0), ('Insulation', 140.0)]
+
+def test_probe_stops_at_gap():
+    polygons = [rectangle(0, 0, 250, 1000, 'Brick'), rectangle(260, 0, 400, 1000, 'Insulation')]
+    assert thicknesses(therm_layers.probe_layer_stack(polygons, (0.0, 500.0), (1.0, 0.0))) == [('Brick', 250.0)]
+
+    # Szczelina węższa niż tolerancja nie przerywa układu
+    polygons[1] = rectangle(250.3, 0, 400, 1000, 'Insulation')
+    layers = therm_layers.probe_layer_stack(polygons, (0.0, 500.0), (1.0, 0.0))
+    assert [layer['material'] for layer in layers] == ['Brick', 'Insulation']
+
+def test_inward_normal_points_into_wall():
+    assert therm_layers.inward_normal(WALL, (0.0, 0.0), (0.0, 1000.0)) == pytest.approx((1.0, 0.0))
+    assert therm_layers.inward_normal(WALL, (400.0, 1000.0), (400.0, 0.0)) == pytest.approx((-1.0, 0.0))
+    assert therm_layers.inward_normal(WALL, (-50.0, 0.0), (-50.0, 1000.0)) is None
+
+def test_l_shaped_layer_gives_two_regions():
+    regions = therm_layers.find_uniform_regions(L_WALL, [('Ti', (0.0, 0.0), (0.0, 1000.0))])
+
+    assert [(round(region['length']), thicknesses(region['layers'])) for region in regions] == [
+        (400, [('Brick', 250.0), ('Insulation', 200.0)]),
+        (600, [('Brick', 250.0), ('Insulation', 100.0)]),
+    ]
+
+def test_te_regions_are_described_from_the_ti_side():
+    te_segments = [('Te', (450.0, 400.0), (450.0, 0.0))]
+    (region,) = therm_layers.find_uniform_regions(L_WALL, te_segments, side='Te')
+
+    assert region['side'] == 'Te'
+    assert thicknesses(region['layers']) == [('Brick', 250.0), ('Insulation', 200.0)]
+    assert region['normal'] == pytest.approx((1.0, 0.0))
+    assert region['start'][0] == pytest.approx(0.0)
+
+    ti_regions = therm_layers.find_uniform_regions(L_WALL, [('Ti', (0.0, 0.0), (0.0, 1000.0))])
+    stacks = therm_layers.distinct_stacks(ti_regions + [region])
+    assert [stack['source'] for stack in stacks] == ['Ti', 'Ti']
+
+def test_stack_found_only_from_te_side():
+    # Krzywa Ti z krótkich odcinków (< min_length) - układ wykrywa dopiero strona Te
+    ti_segments = [('Ti', (0.0, y), (0.0, y + 50.0)) for y in range(0, 1000, 50)]
+    te_segments = [('Te', (400.0, 1000.0), (400.0, 0.0))]
+
+    regions = therm_layers.find_uniform_regions(WALL, ti_segments)
+    regions += therm_layers.find_uniform_regions(WALL, te_segments, side='Te')
+
+    (stack,) = therm_layers.distinct_stacks(regions)
+    assert stack['source'] == 'Te'
+    assert thicknesses(stack['layers']) == [('Plaster', 10.0), ('Brick', 250.0), ('Insulation', 140.0)]
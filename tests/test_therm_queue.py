@@ -0,0 +1,82 @@
+import os
+import time
+
+import pytest
+
+import therm_backends
+import therm_filelock
+import therm_queue
+import therm_results
+import therm_timeout
+from conftest import MODEL
+
+@pytest.fixture
+def models(tmp_path):
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.thmx"
+        path.write_text(MODEL, encoding='utf-8')
+        paths.append(str(path))
+    return paths
+
+def test_stale_lock_is_taken_over_once(tmp_path):
+    lock_path = str(tmp_path / "q.lock")
+    with open(lock_path, 'w', encoding='utf-8') as f:
+        f.write('{"token": "dead"}')
+    old = time.time() - 120
+    os.utime(lock_path, (old, old))
+
+    first = therm_filelock.LockFile(lock_path, 30.0, trust_mtime=True)
+    second = therm_filelock.LockFile(lock_path, 30.0, trust_mtime=True)
+    assert first.acquire()
+    assert not second.acquire()
+    assert first.owned()
+
+def test_breaking_a_replaced_lock_restores_it(tmp_path):
+    lock_path = str(tmp_path / "q.lock")
+    stale_content = '{"token": "dead"}'
+    owner = therm_filelock.LockFile(lock_path, 30.0)
+    assert owner.acquire()
+
+    # Drugi proces odczytał porzuconą blokadę, zanim właściciel ją odebrał - jego zmiana nazwy trafia w nową
+    late = therm_filelock.LockFile(lock_path, 30.0)
+    assert not late._break(stale_content)
+    assert owner.owned()
+    assert [name for name in os.listdir(tmp_path) if '.stale-' in name] == []
+
+def test_lock_refresh_changes_content(tmp_path):
+    lock = therm_filelock.LockFile(str(tmp_path / "q.lock"), 30.0)
+    assert lock.acquire()
+    before = therm_filelock.read_lock(lock.path)
+    assert lock.refresh(force=True)
+    assert therm_filelock.read_lock(lock.path)['beat'] == before['beat'] + 1
+    lock.release()
+    assert not os.path.exists(lock.path)
+
+def test_worker_runs_jobs_without_holding_the_lock(tmp_path, models, fake_therm, monkeypatch):
+    queue = therm_queue.JobQueue.for_directory(str(tmp_path))
+    for priority, path in enumerate(models):
+        queue.enqueue(path, priority=priority, timeout=30.0)
+
+    submitted = []
+    submit = therm_backends.LocalBackend.submit
+
+    def checked_submit(backend, thmx_filepath, timeout):
+        assert not os.path.exists(queue.lock_path)
+        submitted.append(os.path.basename(thmx_filepath))
+        return submit(backend, thmx_filepath, timeout)
+
+    def failing_record(policy, handle):
+        raise ValueError("uszkodzona historia czasów")
+
+    monkeypatch.setattr(therm_backends.LocalBackend, 'submit', checked_submit)
+    monkeypatch.setattr(therm_timeout.TimeoutPolicy, 'record', failing_record)
+    monkeypatch.setattr(therm_queue, 'POLL_INTERVAL', 0.05)
+
+    therm_queue.run_worker(str(tmp_path), fake_therm, max_workers=2)
+
+    assert submitted[0] == "c.thmx"
+    assert sorted(submitted) == ["a.thmx", "b.thmx", "c.thmx"]
+    assert [job['state'] for job in queue.jobs()] == [therm_queue.DONE] * 3
+    assert all(therm_results.read_ufactors(path) for path in models)
+    assert not os.path.exists(queue.lock_path)
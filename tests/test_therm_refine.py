@@ -0,0 +1,35 @@
+import therm_refine
+import therm_results
+import therm_solver
+from conftest import solved_model
+
+def test_write_mesh_level_drops_results(tmp_path):
+    source = tmp_path / "model.thmx"
+    # Jeden wiersz, atrybut MeshLevel w innym wierszu niż początek znacznika MeshControl
+    text = solved_model(1.5).replace('>\n', '>').replace('<MeshControl MeshLevel', '<MeshControl\n MeshLevel')
+    source.write_text(text, encoding='utf-8')
+    target = tmp_path / "level.thmx"
+
+    therm_refine.write_mesh_level(str(source), str(target), 4)
+
+    assert therm_results.read_mesh_control(str(target))['MeshLevel'] == '4'
+    assert therm_results.read_ufactors(str(target)) == {}
+    assert '<MeshInput' not in target.read_text(encoding='utf-8')
+
+def test_refinement_converges(tmp_path, fake_therm):
+    thmx = tmp_path / "model.thmx"
+    thmx.write_text(solved_model(9.9), encoding='utf-8')
+    refinement = therm_refine.MeshRefinement(str(thmx), start_level=5, max_level=8, tolerance=1.0)
+
+    while True:
+        level_thmx = refinement.next_input()
+        if level_thmx is None:
+            break
+        solver = therm_solver.SolverProcess(fake_therm, level_thmx, timeout=30.0).start()
+        solver.wait(interval=0.05)
+        refinement.record(level_thmx, solver.succeeded(), solver.elapsed)
+
+    assert refinement.converged
+    assert [entry['level'] for entry in refinement.history] == [5, 6, 7]
+    entry = refinement.finalize()
+    assert therm_results.read_ufactors(str(thmx)) == entry['ufactors']
@@ -0,0 +1,108 @@
+import os
+import time
+
+import therm_backends
+import therm_results
+import therm_scheduler
+from conftest import MODEL, solved_model
+
+class DurationBackend(therm_backends.FakeBackend):
+    """Backend testowy z czasem obliczeń zależnym od pliku"""
+
+    def __init__(self, durations, **kwargs):
+        super().__init__(**kwargs)
+        self.durations = durations
+
+    def submit(self, thmx_filepath, timeout=None):
+        self.submitted.append(thmx_filepath)
+        duration = self.durations[os.path.basename(thmx_filepath)]
+        return therm_backends.FakeJob(thmx_filepath, timeout, duration, self.succeed, self.on_solve)
+
+class FailingBackend(therm_backends.FakeBackend):
+    def submit(self, thmx_filepath, timeout=None):
+        raise OSError("brak dostępu do THERM")
+
+def models(tmp_path, names):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.write_text(MODEL, encoding='utf-8')
+        paths.append(str(path))
+    return paths
+
+def write_results(thmx_filepath):
+    with open(thmx_filepath, 'w', encoding='utf-8') as f:
+        f.write(solved_model(1.5))
+
+def test_jobs_run_in_parallel(tmp_path):
+    filepaths = models(tmp_path, ["a.thmx", "b.thmx", "c.thmx"])
+    backend = therm_backends.FakeBackend(duration=0.5)
+    runner = therm_scheduler.JobRunner(backend=backend)
+
+    started = time.perf_counter()
+    results = runner.run_jobs(filepaths, max_workers=3)
+
+    assert time.perf_counter() - started < 1.2
+    assert all(result['success'] for result in results)
+    assert sorted(backend.submitted) == sorted(filepaths)
+
+def test_results_follow_input_order(tmp_path):
+    filepaths = models(tmp_path, ["slow.thmx", "medium.thmx", "fast.thmx"])
+    backend = DurationBackend({"slow.thmx": 0.6, "medium.thmx": 0.3, "fast.thmx": 0.0})
+    runner = therm_scheduler.JobRunner(backend=backend)
+
+    results = runner.run_jobs(filepaths, max_workers=3, read_results=os.path.basename)
+
+    assert [result['thmx'] for result in results] == filepaths
+    assert [result['heat_flows'] for result in results] == ["slow.thmx", "medium.thmx", "fast.thmx"]
+
+def test_failed_jobs_are_reported(tmp_path):
+    filepaths = models(tmp_path, ["a.thmx", "b.thmx"])
+    runner = therm_scheduler.JobRunner(backend=therm_backends.FakeBackend(succeed=False))
+
+    results = runner.run_jobs(filepaths, max_workers=2, read_results=os.path.basename)
+
+    assert [result['success'] for result in results] == [False, False]
+    assert all(result['error'] and result['heat_flows'] == {} for result in results)
+
+def test_submit_errors_do_not_stop_other_jobs(tmp_path):
+    filepaths = models(tmp_path, ["a.thmx", "b.thmx"])
+    runner = therm_scheduler.JobRunner(backend=FailingBackend())
+
+    results = runner.run_jobs(filepaths, max_workers=2)
+
+    assert [result['thmx'] for result in results] == filepaths
+    assert not any(result['success'] for result in results)
+
+def test_read_results_errors_are_captured(tmp_path):
+    filepaths = models(tmp_path, ["a.thmx", "b.thmx"])
+    runner = therm_scheduler.JobRunner(backend=therm_backends.FakeBackend())
+
+    def read_results(thmx_filepath):
+        if thmx_filepath.endswith("b.thmx"):
+            raise ValueError("uszkodzony plik")
+        return {'U1': 1.0}
+
+    first, second = runner.run_jobs(filepaths, max_workers=2, read_results=read_results)
+
+    assert first['success'] and first['heat_flows'] == {'U1': 1.0}
+    assert second['error'] == "ValueError: uszkodzony plik"
+
+def test_missing_backend_fails_every_job(tmp_path):
+    filepaths = models(tmp_path, ["a.thmx"])
+    results = therm_scheduler.JobRunner().run_jobs(filepaths)
+
+    assert not results[0]['success']
+    assert "THERM" in results[0]['error']
+
+def test_identical_models_reuse_results(tmp_path):
+    first, second = models(tmp_path, ["a.thmx", "b.thmx"])
+    backend = therm_backends.FakeBackend(on_solve=write_results)
+    runner = therm_scheduler.JobRunner(backend=backend)
+
+    runner.run_jobs([first], reuse_results=True)
+    results = runner.run_jobs([second], reuse_results=True)
+
+    assert results[0]['success']
+    assert backend.submitted == [first]
+    assert therm_results.read_ufactors(second) == {'U1': 1.5}
@@ -0,0 +1,62 @@
+import os
+
+import therm_results
+import therm_solver
+import therm_watch
+from conftest import solved_model
+
+def test_results_written(tmp_path, model_file):
+    assert not therm_watch.results_written(model_file)
+    solved = tmp_path / "solved.thmx"
+    solved.write_text(solved_model(1.5), encoding='utf-8')
+    assert therm_watch.results_written(str(solved))
+
+def test_harvester_ignores_results_of_previous_run(tmp_path):
+    thmx = tmp_path / "model.thmx"
+    thmx.write_text(solved_model(1.5), encoding='utf-8')
+    mesh = tmp_path / "model.o"
+    harvester = therm_watch.ResultHarvester(str(thmx), [str(mesh)], quiet_seconds=0.0)
+    try:
+        # Pierwszy plik siatki i przerwa - stara sekcja Results nie oznacza gotowych wyników
+        mesh.write_text("mesh", encoding='utf-8')
+        assert not harvester.ready()
+        assert not harvester.ready()
+
+        thmx.write_text(solved_model(2.5) + "\n", encoding='utf-8')
+        assert harvester.ready()
+    finally:
+        harvester.close()
+
+def test_write_model_input_drops_results(tmp_path):
+    source = tmp_path / "solved.thmx"
+    source.write_text(solved_model(1.5).replace('>\n', '>'), encoding='utf-8')
+    target = tmp_path / "input.thmx"
+
+    assert therm_results.write_model_input(str(source), str(target), {'MeshLevel': 5})
+    text = target.read_text(encoding='utf-8')
+    assert '<Results' not in text and '<MeshInput' not in text
+    assert therm_results.read_model_stats(str(target))['mesh_control']['MeshLevel'] == '5'
+
+def test_solver_does_not_promote_previous_results(tmp_path, fake_therm, monkeypatch):
+    thmx = tmp_path / "model.thmx"
+    thmx.write_text(solved_model(1.5), encoding='utf-8')
+    monkeypatch.setenv('FAKE_THERM_MODE', 'hang')
+
+    solver = therm_solver.SolverProcess(fake_therm, str(thmx), timeout=5.0).start()
+    solver.wait(interval=0.1)
+
+    assert solver.timed_out and not solver.harvested and not solver.succeeded()
+    assert therm_results.read_ufactors(str(thmx)) == {'U1': 1.5}
+
+def test_solver_harvests_new_results_of_presolved_input(tmp_path, fake_therm, monkeypatch):
+    thmx = tmp_path / "model.thmx"
+    thmx.write_text(solved_model(1.5), encoding='utf-8')
+    monkeypatch.setenv('FAKE_THERM_MODE', 'linger')
+    monkeypatch.setenv('FAKE_THERM_UFACTOR', '2.5')
+
+    solver = therm_solver.SolverProcess(fake_therm, str(thmx), timeout=30.0).start()
+    solver.wait(interval=0.1)
+
+    assert solver.harvested and solver.succeeded()
+    assert therm_results.read_ufactors(str(thmx)) == {'U1': 2.5}
+    assert os.path.exists(tmp_path / "model.thm")
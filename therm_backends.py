@@ -0,0 +1,448 @@
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import socket
+import argparse
+
+try:
+    from . import therm_solver, therm_progress, therm_results, therm_filelock
+except ImportError:
+    import therm_solver
+    import therm_progress
+    import therm_results
+    import therm_filelock
+
+# Wymienne sposoby wykonywania obliczeń THERM (bez zależności od bpy)
+#
+# Każdy backend ma metodę submit(thmx, timeout), która zwraca uchwyt zadania
+# o tym samym interfejsie co therm_solver.SolverProcess: poll(), wait(), cancel(),
+# running, elapsed, phase(), succeeded(), created_outputs().
+#
+# Folder wymiany (spool): klient kopiuje plik do jobs/<id>/, procesy robocze na
+# innych komputerach przejmują zadania plikiem blokady claim.lock (therm_filelock -
+# odświeżany przez proces roboczy, porzucony rozpoznawany bez porównywania zegarów)
+# i zapisują result.json oraz pliki wynikowe w folderze zadania. Klient kończy
+# zadanie z przekroczonym limitem, gdy wynik nie pojawi się w limicie z zapasem.
+
+SPOOL_JOBS_DIRNAME = "jobs"
+JOB_FILENAME = "job.json"
+CLAIM_FILENAME = "claim.lock"
+RESULT_FILENAME = "result.json"
+CANCEL_FILENAME = "cancel"
+PROGRESS_FILENAME = "progress.json"
+CLAIM_STALE_AGE = 60.0
+# Zapas ponad limit czasu zadania na kopiowanie plików i odbiór wyniku przez klienta
+CLIENT_GRACE = 120.0
+
+class LocalBackend:
+    """Proces THERM na tym komputerze"""
+
+    def __init__(self, therm_exe, stall_timeout=None):
+        self.therm_exe = therm_exe
+        self.stall_timeout = stall_timeout
+
+    def describe(self):
+        return f"lokalnie ({self.therm_exe})"
+
+    def submit(self, thmx_filepath, timeout=therm_solver.DEFAULT_TIMEOUT):
+        return therm_solver.SolverProcess(self.therm_exe, thmx_filepath, timeout,
+                                          stall_timeout=self.stall_timeout).start()
+
+class FakeJob:
+    """Zadanie backendu testowego - kończy się po zadanym czasie bez uruchamiania THERM"""
+
+    def __init__(self, thmx_filepath, timeout, duration, succeed, on_solve):
+        self.thmx_filepath = os.path.normpath(thmx_filepath)
+        self.timeout = timeout
+        self.duration = duration
+        self.succeed = succeed
+        self.on_solve = on_solve
+        self.started = time.time()
+        self.finished = None
+        self.returncode = None
+        self.cancelled = False
+        self.timed_out = False
+        self.stalled = False
+        self.harvested = False
+        self.input_changed = False
+        self.outputs = []
+        self.stdout = ''
+        self.stderr = ''
+        self.progress = therm_progress.SolverProgress()
+
+    @property
+    def running(self):
+        return self.finished is None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+    def poll(self):
+        if self.running:
+            self.progress.feed("solving")
+        if self.running and self.elapsed >= self.duration:
+            self.finished = time.time()
+            self.returncode = 0 if self.succeed else 1
+            if self.succeed:
+                if self.on_solve:
+                    self.on_solve(self.thmx_filepath)
+                output = therm_solver.expected_output_files(self.thmx_filepath)[0]
+                with open(output, 'w', encoding='utf-8') as f:
+                    f.write("fake THERM output\n")
+                self.outputs = [output]
+                self.stdout = "fake THERM: ok"
+                self.progress.mark_done()
+            else:
+                self.stderr = "fake THERM: błąd"
+        return self.returncode
+
+    def wait(self, interval=0.05):
+        while self.poll() is None:
+            time.sleep(interval)
+        return self.returncode
+
+    def cancel(self):
+        if self.running:
+            self.cancelled = True
+            self.finished = time.time()
+
+    def phase(self):
+        return self.progress.describe() if self.running else "zakończono"
+
+    def created_outputs(self):
+        return list(self.outputs)
+
+    def succeeded(self):
+        return not self.running and not self.cancelled and self.returncode == 0
+
+class FakeBackend:
+    """Backend testowy - zapisuje plik .thm zamiast uruchamiać THERM
+
+    on_solve(thmx) pozwala testom dopisać do pliku własne wyniki.
+    """
+
+    def __init__(self, duration=0.0, succeed=True, on_solve=None):
+        self.duration = duration
+        self.succeed = succeed
+        self.on_solve = on_solve
+        self.submitted = []
+
+    def describe(self):
+        return "testowy (bez THERM)"
+
+    def submit(self, thmx_filepath, timeout=therm_solver.DEFAULT_TIMEOUT):
+        self.submitted.append(thmx_filepath)
+        return FakeJob(thmx_filepath, timeout, self.duration, self.succeed, self.on_solve)
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json(path, data):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+    os.replace(temp_path, path)
+
+class SpoolJob:
+    """Zadanie w folderze wymiany - wynik odbierany z result.json i kopiowany do projektu"""
+
+    def __init__(self, job_dir, thmx_filepath, timeout, input_stamp):
+        self.job_dir = job_dir
+        self.thmx_filepath = os.path.normpath(thmx_filepath)
+        self.work_thmx = os.path.join(job_dir, os.path.basename(self.thmx_filepath))
+        self.timeout = timeout
+        self.started = time.time()
+        self.finished = None
+        self.returncode = None
+        self.cancelled = False
+        self.timed_out = False
+        self.input_changed = False
+        self.outputs = []
+        self.stdout = ''
+        self.stderr = ''
+        self.worker = ''
+        self.solve_elapsed = None
+        self.stalled = False
+        self.harvested = False
+        self.progress = therm_progress.SolverProgress()
+        self.claimed = None
+        self._claim_token = None
+        self._solved = False
+        self._input_stamp = input_stamp
+
+    @property
+    def running(self):
+        return self.finished is None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+    def poll(self):
+        if not self.running:
+            return self.returncode
+        result = _read_json(os.path.join(self.job_dir, RESULT_FILENAME))
+        if result is not None:
+            self._complete(result)
+            return self.returncode
+        progress = _read_json(os.path.join(self.job_dir, PROGRESS_FILENAME))
+        if progress:
+            self.progress = therm_progress.SolverProgress.from_dict(progress)
+
+        # Limit liczony od przejęcia przez proces roboczy (zegar klienta), a bez przejęcia od wysłania
+        claim = therm_filelock.read_lock(os.path.join(self.job_dir, CLAIM_FILENAME))
+        if claim and claim.get('token') != self._claim_token:
+            self._claim_token = claim.get('token')
+            self.claimed = time.time()
+        if self.timeout and time.time() > (self.claimed or self.started) + self.timeout + CLIENT_GRACE:
+            self._expire()
+        return self.returncode
+
+    def wait(self, interval=1.0):
+        while self.poll() is None and self.running:
+            time.sleep(interval)
+        return self.returncode
+
+    def cancel(self):
+        """Zleca przerwanie - nieprzejęte zadanie jest usuwane od razu, przejęte usuwa proces roboczy"""
+        if not self.running:
+            return
+        self.cancelled = True
+        self.finished = time.time()
+        self._withdraw()
+
+    def _withdraw(self):
+        try:
+            with open(os.path.join(self.job_dir, CANCEL_FILENAME), 'w', encoding='utf-8') as f:
+                f.write(socket.gethostname())
+        except OSError:
+            return
+        if _try_claim(self.job_dir) is not None:
+            shutil.rmtree(self.job_dir, ignore_errors=True)
+
+    def _expire(self):
+        """Brak wyniku w limicie czasu z zapasem (brak procesów roboczych lub proces roboczy przepadł)"""
+        self.timed_out = True
+        self.finished = time.time()
+        where = "przejęte, bez wyniku" if self.claimed else "nieprzejęte przez żaden proces roboczy"
+        self.stderr = f"zadanie {where} po {self.elapsed:.0f} s"
+        print(f"⚠️  {os.path.basename(self.thmx_filepath)}: {self.stderr} - przerywam")
+        self._withdraw()
+
+    def phase(self):
+        if not self.running:
+            return "zakończono"
+        claim = therm_filelock.read_lock(os.path.join(self.job_dir, CLAIM_FILENAME))
+        if claim:
+            return f"{self.progress.describe()} ({claim.get('host', '?')})"
+        return "oczekuje na proces roboczy"
+
+    def created_outputs(self):
+        return list(self.outputs)
+
+    def succeeded(self):
+        return self._solved
+
+    def _complete(self, result):
+        self.finished = time.time()
+        self.returncode = result.get('returncode')
+        self.stdout = result.get('stdout', '')
+        self.stderr = result.get('stderr', '')
+        self.timed_out = result.get('timed_out', False)
+        self.stalled = result.get('stalled', False)
+        self.harvested = result.get('harvested', False)
+        self.worker = result.get('worker', '')
+        self.solve_elapsed = result.get('elapsed')
+
+        if result.get('success'):
+            try:
+                promoted = therm_solver.promote_results(self.work_thmx, self.thmx_filepath,
+                                                        self._input_stamp, copy=True)
+            except OSError as e:
+                print(f"❌ Nie można skopiować wyników z folderu wymiany: {e}")
+                promoted = []
+            if promoted is None:
+                self.input_changed = True
+                print(f"⚠️  {os.path.basename(self.thmx_filepath)} zmienił się w trakcie obliczeń - wyniki odrzucone")
+            else:
+                self.outputs = promoted
+                self._solved = True
+
+        shutil.rmtree(self.job_dir, ignore_errors=True)
+
+class SpoolBackend:
+    """Zadania wykonywane przez procesy robocze (także na innych komputerach) przez wspólny folder"""
+
+    def __init__(self, spool_dir):
+        self.spool_dir = os.path.abspath(spool_dir)
+        self.jobs_dir = os.path.join(self.spool_dir, SPOOL_JOBS_DIRNAME)
+
+    def describe(self):
+        return f"folder wymiany {self.spool_dir}"
+
+    def submit(self, thmx_filepath, timeout=therm_solver.DEFAULT_TIMEOUT):
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        basename = os.path.splitext(os.path.basename(thmx_filepath))[0]
+        job_id = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:6]}-{basename}"
+
+        # Zadanie budowane w folderze tymczasowym i udostępniane jedną zmianą nazwy
+        temp_dir = os.path.join(self.jobs_dir, f".{job_id}")
+        os.makedirs(temp_dir)
+        input_stamp = therm_solver.file_stamp(thmx_filepath)
+        # Bez wyników poprzednich obliczeń - proces roboczy nie może ich wziąć za nowe
+        therm_results.write_model_input(thmx_filepath, os.path.join(temp_dir, os.path.basename(thmx_filepath)))
+        _write_json(os.path.join(temp_dir, JOB_FILENAME), {
+            'thmx': os.path.basename(thmx_filepath),
+            'source': os.path.abspath(thmx_filepath),
+            'timeout': timeout,
+            'submitted': time.time(),
+            'client': socket.gethostname()
+        })
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.rename(temp_dir, job_dir)
+
+        print(f"📤 Zadanie {job_id} w folderze wymiany")
+        return SpoolJob(job_dir, thmx_filepath, timeout, input_stamp)
+
+def _try_claim(job_dir):
+    """Przejmuje zadanie plikiem blokady - zwraca blokadę (do odświeżania) lub None
+
+    Porzucona blokada (bez odświeżenia przez CLAIM_STALE_AGE według zegara tego procesu)
+    jest odbierana, a zadanie wraca do puli.
+    """
+    if os.path.exists(os.path.join(job_dir, RESULT_FILENAME)):
+        return None
+    claim = therm_filelock.LockFile(os.path.join(job_dir, CLAIM_FILENAME), CLAIM_STALE_AGE,
+                                    info={'claimed': time.time()})
+    if not claim.acquire():
+        return None
+    # Wynik mógł powstać między sprawdzeniem a przejęciem
+    if os.path.exists(os.path.join(job_dir, RESULT_FILENAME)):
+        claim.release()
+        return None
+    return claim
+
+def claim_next_job(spool_dir):
+    """Najstarsze wolne zadanie folderu wymiany - (folder zadania, blokada) lub None"""
+    jobs_dir = os.path.join(os.path.abspath(spool_dir), SPOOL_JOBS_DIRNAME)
+    try:
+        names = sorted(name for name in os.listdir(jobs_dir) if not name.startswith('.'))
+    except OSError:
+        return None
+
+    for name in names:
+        job_dir = os.path.join(jobs_dir, name)
+        if os.path.exists(os.path.join(job_dir, CANCEL_FILENAME)):
+            # Zadanie wycofane przez klienta, którego nikt już nie liczy (np. po przekroczeniu limitu)
+            claim = _try_claim(job_dir)
+            if claim is not None:
+                shutil.rmtree(job_dir, ignore_errors=True)
+            continue
+        if (os.path.exists(os.path.join(job_dir, RESULT_FILENAME))
+                or not os.path.exists(os.path.join(job_dir, JOB_FILENAME))):
+            continue
+        claim = _try_claim(job_dir)
+        if claim is not None:
+            return job_dir, claim
+    return None
+
+def run_spool_worker(spool_dir, therm_exe, max_jobs=1, idle_exit=None, poll_interval=1.0, stall_timeout=None):
+    """Proces roboczy folderu wymiany: przejmuje zadania, uruchamia THERM i zapisuje wyniki
+
+    idle_exit: zakończenie po tylu sekundach bez zadań (None = praca ciągła).
+    """
+    host = socket.gethostname()
+    running = {}
+    idle_since = time.time()
+    print(f"Proces roboczy {host}:{os.getpid()} - folder wymiany {spool_dir}, {max_jobs} naraz")
+
+    while True:
+        now = time.time()
+        for job_dir, (solver, claim) in list(running.items()):
+            if not claim.refresh():
+                # Blokadę odebrał inny proces roboczy (np. po przerwie w dostępie do folderu) - zadanie jest jego
+                print(f"⚠️  {os.path.basename(job_dir)} przejęte przez inny proces roboczy - przerywam")
+                solver.cancel()
+                del running[job_dir]
+                continue
+            if os.path.exists(os.path.join(job_dir, CANCEL_FILENAME)):
+                solver.cancel()
+            if solver.poll() is None and solver.running:
+                _write_json(os.path.join(job_dir, PROGRESS_FILENAME), solver.progress.to_dict())
+                continue
+
+            del running[job_dir]
+            if solver.cancelled:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                print(f"⏹️  {os.path.basename(job_dir)} anulowane")
+                continue
+
+            _write_json(os.path.join(job_dir, RESULT_FILENAME), {
+                'success': solver.succeeded(),
+                'returncode': solver.returncode,
+                'timed_out': solver.timed_out,
+                'stalled': solver.stalled,
+                'harvested': solver.harvested,
+                'stdout': solver.stdout[-5000:],
+                'stderr': solver.stderr[-5000:],
+                'elapsed': solver.elapsed,
+                'worker': f"{host}:{os.getpid()}"
+            })
+            print(f"{'✅' if solver.succeeded() else '❌'} {os.path.basename(job_dir)} ({solver.elapsed:.1f} s)")
+
+        while len(running) < max(1, max_jobs):
+            claimed = claim_next_job(spool_dir)
+            if claimed is None:
+                break
+            job_dir, claim = claimed
+            job = _read_json(os.path.join(job_dir, JOB_FILENAME)) or {}
+            try:
+                solver = therm_solver.SolverProcess(therm_exe, os.path.join(job_dir, job['thmx']),
+                                                    job.get('timeout', therm_solver.DEFAULT_TIMEOUT),
+                                                    sandbox=False, stall_timeout=stall_timeout)
+                running[job_dir] = (solver.start(), claim)
+            except Exception as e:
+                _write_json(os.path.join(job_dir, RESULT_FILENAME), {
+                    'success': False, 'returncode': None, 'stderr': f"{e.__class__.__name__}: {e}",
+                    'worker': f"{host}:{os.getpid()}"
+                })
+
+        if running:
+            idle_since = now
+        elif idle_exit is not None and now - idle_since > idle_exit:
+            break
+
+        time.sleep(poll_interval)
+
+def start_spool_worker(spool_dir, therm_exe, max_jobs=1, idle_exit=None, stall_timeout=None, python_executable=None):
+    """Uruchamia odłączony proces roboczy folderu wymiany na tym komputerze - zwraca PID"""
+    spool_dir = os.path.abspath(spool_dir)
+    os.makedirs(spool_dir, exist_ok=True)
+    cmd = [python_executable or sys.executable, os.path.abspath(__file__),
+           '--spool-worker', spool_dir, '--exe', therm_exe, '--max-jobs', str(max(1, max_jobs))]
+    if idle_exit is not None:
+        cmd += ['--idle-exit', str(idle_exit)]
+    if stall_timeout:
+        cmd += ['--stall-timeout', str(stall_timeout)]
+    return therm_solver.spawn_detached(cmd, os.path.join(spool_dir, f"worker-{socket.gethostname()}.log"))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Proces roboczy folderu wymiany obliczeń THERM")
+    parser.add_argument('--spool-worker', required=True, help="Wspólny folder wymiany zadań")
+    parser.add_argument('--exe', required=True, help="Ścieżka do THERM7.exe")
+    parser.add_argument('--max-jobs', type=int, default=1)
+    parser.add_argument('--idle-exit', type=float, default=None)
+    parser.add_argument('--stall-timeout', type=float, default=None)
+    args = parser.parse_args(argv)
+    run_spool_worker(args.spool_worker, args.exe, args.max_jobs, args.idle_exit, stall_timeout=args.stall_timeout)
+
+if __name__ == "__main__":
+    main()
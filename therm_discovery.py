@@ -0,0 +1,133 @@
+import os
+import json
+import shutil
+import platform
+
+# Wyszukiwanie THERM7.exe z pamięcią podręczną (bez zależności od bpy)
+#
+# Kolejność: zmienna THERM_EXECUTABLE, ścieżka wskazana ręcznie, zapamiętany
+# wynik (ważny, dopóki plik ma ten sam czas modyfikacji i nie zmieniła się
+# ścieżka ręczna), typowe lokalizacje i rejestr Windows.
+
+ENV_VARIABLE = "THERM_EXECUTABLE"
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".therm_exporter")
+CACHE_FILENAME = "therm_discovery.json"
+
+_memory_cache = {}
+
+def candidate_paths():
+    """Typowe lokalizacje THERM7.exe"""
+    return [
+        r"C:\Program Files\THERM\THERM7.exe",
+        r"C:\Program Files (x86)\THERM\THERM7.exe",
+        r"C:\THERM\THERM7.exe",
+        os.path.join(os.path.expanduser("~"), "THERM", "THERM7.exe"),
+        shutil.which("THERM7.exe") or "THERM7.exe",
+    ]
+
+def find_therm_in_registry():
+    """Próbuje znaleźć THERM w rejestrze Windows (winreg importowany tylko na Windows)"""
+    if platform.system() != "Windows":
+        return None
+    try:
+        import winreg
+    except ImportError:
+        return None
+
+    registry_paths = [
+        (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\THERM"),
+        (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\WOW6432Node\THERM"),
+        (winreg.HKEY_CURRENT_USER, r"SOFTWARE\THERM"),
+    ]
+
+    for root, path in registry_paths:
+        try:
+            key = winreg.OpenKey(root, path)
+            try:
+                therm_path = winreg.QueryValueEx(key, "InstallPath")[0]
+                exe_path = os.path.join(therm_path, "THERM7.exe")
+                if os.path.exists(exe_path):
+                    return exe_path
+            finally:
+                winreg.CloseKey(key)
+        except OSError:
+            continue
+
+    return None
+
+def probe_therm_executable():
+    """Pełne wyszukiwanie: typowe lokalizacje, potem rejestr"""
+    for path in candidate_paths():
+        if path and os.path.exists(path):
+            return path
+    return find_therm_in_registry()
+
+def _cache_path(cache_dir=None):
+    return os.path.join(cache_dir or CACHE_DIR, CACHE_FILENAME)
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+def _entry_valid(entry, manual_path):
+    """Wpis ważny dla tej samej ścieżki ręcznej i niezmienionego pliku THERM"""
+    if not entry or entry.get('manual_path', '') != manual_path:
+        return False
+    path = entry.get('path')
+    return bool(path) and _mtime(path) == entry.get('mtime')
+
+def load_cached(manual_path='', cache_dir=None):
+    """Zapamiętana ścieżka THERM lub None, jeśli wpis jest nieaktualny"""
+    cache_path = _cache_path(cache_dir)
+    entry = _memory_cache.get(cache_path)
+    if entry is None:
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        _memory_cache[cache_path] = entry
+    return entry['path'] if _entry_valid(entry, manual_path) else None
+
+def store_cached(path, manual_path='', cache_dir=None):
+    cache_path = _cache_path(cache_dir)
+    entry = {'path': path, 'mtime': _mtime(path), 'manual_path': manual_path}
+    _memory_cache[cache_path] = entry
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = cache_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, indent=1)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"⚠️  Nie można zapisać pamięci podręcznej THERM: {e}")
+
+def clear_cache(cache_dir=None):
+    cache_path = _cache_path(cache_dir)
+    _memory_cache.pop(cache_path, None)
+    try:
+        os.remove(cache_path)
+    except OSError:
+        pass
+
+def find_therm_executable(manual_path='', cache_dir=None):
+    """Ścieżka do THERM7.exe lub None"""
+    override = os.environ.get(ENV_VARIABLE)
+    if override:
+        if os.path.exists(override):
+            return override
+        print(f"⚠️  {ENV_VARIABLE}={override} nie istnieje - wyszukiwanie THERM")
+
+    if manual_path and os.path.exists(manual_path):
+        return manual_path
+
+    cached = load_cached(manual_path, cache_dir)
+    if cached:
+        return cached
+
+    path = probe_therm_executable()
+    if path:
+        store_cached(path, manual_path, cache_dir)
+    return path
@@ -3,12 +3,22 @@ import os
 from datetime import datetime
 import xml.etree.ElementTree as ET
 import math
-from mathutils import Vector
+import numpy as np
+from mathutils import Matrix, Vector
+from . import therm_geometry, therm_refine
 
 def format_therm_value(value):
     """Formatuje wartość do 6 miejsc po przecinku z zerami"""
     return f"{float(value):.6f}"
 
+def mesh_control_settings(props):
+    """Ustawienia MeshControl ze sceny (słownik dla therm_refine.apply_mesh_control)"""
+    return {
+        'mesh_level': props.mesh_level,
+        'error_limit': props.mesh_error_limit,
+        'max_iterations': props.mesh_max_iterations
+    }
+
 def get_material_properties(material):
     conductivity = "0.04"
     emissivity = "0.90"
@@ -56,37 +66,157 @@ def get_all_therm_collections():
             therm_collections.append(coll)
     return therm_collections
 
-def get_all_polygons_from_mesh(obj):
-    """Pobiera WSZYSTKIE polygony z obiektu siatki"""
-    mesh = obj.data
-    world_matrix = obj.matrix_world
+def resolve_material_name(obj, material_index):
+    """Zwraca nazwę materiału dla indeksu slotu obiektu"""
+    if obj.data.materials and material_index < len(obj.data.materials):
+        material = obj.data.materials[material_index]
+        if material:
+            return material.name
+    return "DefaultMaterial"
+
+def make_polygon_data(coords, material_index=0, material_name="DefaultMaterial", object_name=""):
+    """Buduje słownik polygonu w formacie używanym przez eksport (współrzędne w mm)"""
+    points = [(str(i), format_therm_value(x), format_therm_value(y)) for i, (x, y) in enumerate(coords)]
+    return {
+        'coords': list(coords),
+        'points': points,
+        'num_sides': len(points),
+        'material_index': material_index,
+        'material': material_name,
+        'object': object_name
+    }
+
+class MeshPolygonCache:
+    """Cache polygonów w przestrzeni lokalnej - jeden wpis na datablock siatki"""
     
-    polygons_data = []
+    def __init__(self):
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get_local_arrays(self, mesh):
+        """Zwraca tablice wierzchołków i pętli siatki (liczone raz na datablock)"""
+        key = mesh.as_pointer()
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        
+        self.misses += 1
+        
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get('co', co)
+        
+        loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', loop_verts)
+        
+        poly_count = len(mesh.polygons)
+        loop_start = np.empty(poly_count, dtype=np.int32)
+        loop_total = np.empty(poly_count, dtype=np.int32)
+        material_index = np.empty(poly_count, dtype=np.int32)
+        mesh.polygons.foreach_get('loop_start', loop_start)
+        mesh.polygons.foreach_get('loop_total', loop_total)
+        mesh.polygons.foreach_get('material_index', material_index)
+        
+        entry = {
+            'co': co.reshape(-1, 3).astype(np.float64),
+            'loop_verts': loop_verts,
+            'loop_start': loop_start.tolist(),
+            'loop_total': loop_total.tolist(),
+            'material_index': material_index.tolist()
+        }
+        self._entries[key] = entry
+        return entry
     
-    for poly_index, polygon in enumerate(mesh.polygons):
-        points = []
+    def get_world_polygons(self, obj, matrix_world):
+        """Transformuje polygony siatki do przestrzeni świata jedną operacją macierzową"""
+        entry = self.get_local_arrays(obj.data)
+        
+        matrix = np.array(matrix_world, dtype=np.float64)
+        world = entry['co'] @ matrix[:3, :3].T + matrix[:3, 3]
+        
+        # Metry na milimetry, zaokrąglenie jak w pojedynczym eksporcie
+        loop_xy = np.round(world[:, :2] * 1000, 2)[entry['loop_verts']].tolist()
         
-        for loop_index in polygon.loop_indices:
-            loop = mesh.loops[loop_index]
-            vert = mesh.vertices[loop.vertex_index]
-            world_vert = world_matrix @ vert.co
+        material_names = {}
+        polygons_data = []
+        
+        for start, total, mat_index in zip(entry['loop_start'], entry['loop_total'], entry['material_index']):
+            if total < 3:
+                continue
             
-            x = round(world_vert.x * 1000, 2)
-            y = round(world_vert.y * 1000, 2)
-            points.append((str(len(points)), format_therm_value(x), format_therm_value(y)))
-        
-        if len(points) >= 3:
-            polygons_data.append({
-                'points': points,
-                'num_sides': len(points),
-                'material_index': polygon.material_index
-            })
+            if mat_index not in material_names:
+                material_names[mat_index] = resolve_material_name(obj, mat_index)
+            
+            coords = [(x, y) for x, y in loop_xy[start:start + total]]
+            polygons_data.append(make_polygon_data(coords, mat_index, material_names[mat_index], obj.name))
+        
+        return polygons_data
+
+def iter_mesh_instances(objects, max_depth=8):
+    """Zwraca pary (obiekt siatki, macierz świata) - również dla instancji kolekcji"""
+    for obj in objects:
+        if obj.type == 'MESH':
+            yield obj, obj.matrix_world
+        elif obj.instance_type == 'COLLECTION' and obj.instance_collection:
+            yield from _iter_collection_instance(obj.instance_collection, obj.matrix_world, max_depth)
+
+def _iter_collection_instance(collection, parent_matrix, depth):
+    """Rozwija instancję kolekcji z uwzględnieniem instance_offset"""
+    if depth <= 0:
+        print(f"⚠️  Przekroczono głębokość zagnieżdżenia instancji w kolekcji {collection.name}")
+        return
+    
+    base_matrix = parent_matrix @ Matrix.Translation(-collection.instance_offset)
     
-    return polygons_data
+    for child in collection.all_objects:
+        if child.type == 'MESH':
+            yield child, base_matrix @ child.matrix_world
+        elif child.instance_type == 'COLLECTION' and child.instance_collection:
+            yield from _iter_collection_instance(child.instance_collection, base_matrix @ child.matrix_world, depth - 1)
+
+def get_all_polygons_from_mesh(obj, matrix_world=None, cache=None):
+    """Pobiera WSZYSTKIE polygony z obiektu siatki"""
+    if cache is None:
+        cache = MeshPolygonCache()
+    if matrix_world is None:
+        matrix_world = obj.matrix_world
+    
+    return cache.get_world_polygons(obj, matrix_world)
+
+def get_roi_segments(roi_obj):
+    """Zwraca odcinki obszaru mostka (w mm) - punkt dla Empty, segmenty dla krzywej"""
+    if roi_obj.type == 'CURVE':
+        points = get_curve_points(roi_obj)
+        if len(points) >= 2:
+            return list(zip(points[:-1], points[1:]))
+        if points:
+            return [(points[0], points[0])]
+        return []
+    
+    location = roi_obj.matrix_world.translation
+    point = (round(location.x * 1000, 2), round(location.y * 1000, 2))
+    return [(point, point)]
+
+def get_export_polygons(objects, cache=None):
+    """Zbiera polygony wszystkich siatek i instancji kolekcji do eksportu"""
+    if cache is None:
+        cache = MeshPolygonCache()
+    
+    polygons_data = []
+    mesh_objects = []
+    
+    for obj, matrix_world in iter_mesh_instances(objects):
+        polygons_data.extend(cache.get_world_polygons(obj, matrix_world))
+        if obj not in mesh_objects:
+            mesh_objects.append(obj)
+    
+    print(f"📦 Siatki: {len(mesh_objects)} unikalnych obiektów, cache: {cache.misses} ekstrakcji / {cache.hits} ponownych użyć")
+    return polygons_data, mesh_objects
 
 class THERMExporter:
     def __init__(self):
-        pass
+        self.mesh_cache = MeshPolygonCache()
     
     def export_to_therm(self, context):
         """Główna funkcja eksportująca do formatu THERM"""
@@ -102,72 +232,190 @@ class THERMExporter:
         else:
             return {'ERROR'}, "Błąd eksportu"
     
-    def get_boundary_curves_from_collections(self):
-        """Pobiera krzywe z wszystkich kolekcji THERM i dopasowuje kolejność do polygonów"""
-        boundary_curves = []
+    def crop_export_model(self, polygons_data, raw_curves):
+        """Przycina elementy flankujące w odległości odcięcia od złącza (ISO 10211)"""
+        props = bpy.context.scene.therm_props
+        if not props.crop_enabled:
+            return polygons_data, raw_curves
         
-        polygons_data = []
-        selected_objects = [obj for obj in bpy.context.selected_objects if obj.type == 'MESH']
-        for obj in selected_objects:
-            polygons_data.extend(get_all_polygons_from_mesh(obj))
+        junction_obj = props.junction_object
+        junction_segments = get_roi_segments(junction_obj) if junction_obj else []
+        if not junction_segments:
+            print("⚠️  Przycinanie włączone, ale nie wskazano obszaru mostka - pomijam")
+            return polygons_data, raw_curves
         
-        ufactor_curves = []
-        other_curves = []
+        box = therm_geometry.expand_bounds(junction_segments, props.crop_cutoff_length)
+        
+        cropped_polygons = []
+        for poly_data in polygons_data:
+            # Polygon wklęsły przecięty kilka razy rozpada się na osobne polygony
+            for coords in therm_geometry.clip_polygon_to_box(poly_data['coords'], box):
+                cropped_polygons.append(make_polygon_data(coords, poly_data['material_index'],
+                                                          poly_data['material'], poly_data['object']))
+        
+        # Krzywa leżąca na krawędzi polygonu cięta jest w punkcie liczonym z tej krawędzi,
+        # tak jak polygony - punkty cięcia krzywych i polygonów są identyczne
+        edge_grid = therm_geometry.EdgeGrid([poly_data['coords'] for poly_data in polygons_data])
+        carrier_tolerance = max(0.1, props.bc_snap_tolerance)
+        
+        cropped_curves = []
+        for raw_curve in raw_curves:
+            start, end = raw_curve['points'][0], raw_curve['points'][1]
+            carrier = edge_grid.find_carrier(start, end, carrier_tolerance)
+            clipped = therm_geometry.clip_segment_to_box(start, end, box, carrier=carrier[1:] if carrier else None)
+            if clipped:
+                cropped_curves.append(dict(raw_curve, points=list(clipped)))
+        
+        # Każda powierzchnia cięcia dostaje warunek adiabatyczny - poza częściami pokrytymi krzywymi
+        cut_edges = therm_geometry.find_cut_edges([poly_data['coords'] for poly_data in cropped_polygons], box,
+                                                  covered=[raw_curve['points'][:2] for raw_curve in cropped_curves])
+        
+        added = 0
+        for v1, v2 in cut_edges:
+            added += 1
+            cropped_curves.append({
+                'collection': 'THERM_Adiabatic',
+                'object': f"Cut_{added}",
+                'points': [v1, v2]
+            })
+        
+        print(f"✂️  Przycięto model do {props.crop_cutoff_length:.0f} mm od złącza: "
+              f"polygony {len(polygons_data)} -> {len(cropped_polygons)}, "
+              f"krzywe {len(raw_curves)} -> {len(cropped_curves) - added}, dodano {added} krawędzi Adiabatic")
+        
+        return cropped_polygons, cropped_curves
+    
+    def simplify_export_polygons(self, polygons_data, raw_curves):
+        """Upraszcza geometrię poza obszarem mostka (nie zmienia sceny)"""
+        props = bpy.context.scene.therm_props
+        if not props.simplify_enabled:
+            return polygons_data
+        
+        roi_obj = props.junction_object
+        if roi_obj is None:
+            print("⚠️  Upraszczanie włączone, ale nie wskazano obszaru mostka - pomijam")
+            return polygons_data
+        
+        roi_segments = get_roi_segments(roi_obj)
+        if not roi_segments:
+            print(f"⚠️  Obiekt {roi_obj.name} nie definiuje obszaru mostka - pomijam upraszczanie")
+            return polygons_data
+        
+        # Końce krzywych warunków brzegowych muszą pozostać wierzchołkami polygonów -
+        # chronione są wierzchołki, do których krzywe zostaną dopasowane przy eksporcie
+        edge_grid = therm_geometry.EdgeGrid([poly_data['coords'] for poly_data in polygons_data])
+        snap_tolerance = props.bc_snap_tolerance
+        protected_points = set()
+        for raw_curve in raw_curves:
+            v1, v2, matched_edge, _ = self.match_curve_to_edge(edge_grid, raw_curve['points'], snap_tolerance)
+            protected_points.update(matched_edge or (v1, v2))
+        
+        simplified_coords, removed = therm_geometry.simplify_polygons(
+            [poly_data['coords'] for poly_data in polygons_data],
+            roi_segments,
+            props.simplify_roi_radius,
+            props.simplify_base_tolerance,
+            props.simplify_growth,
+            props.simplify_max_tolerance,
+            protected_points
+        )
+        
+        points_before = sum(poly_data['num_sides'] for poly_data in polygons_data)
+        print(f"✂️  Uproszczenie geometrii: usunięto {removed} z {points_before} wierzchołków (obszar: {roi_obj.name})")
+        
+        return [
+            make_polygon_data(coords, poly_data['material_index'], poly_data['material'], poly_data['object'])
+            for coords, poly_data in zip(simplified_coords, polygons_data)
+        ]
+    
+    def collect_boundary_curve_points(self):
+        """Zbiera surowe punkty krzywych z kolekcji THERM (przed dopasowaniem do polygonów)"""
+        raw_curves = []
         
         for coll in get_all_therm_collections():
             for obj in coll.objects:
                 if obj.type == 'CURVE':
                     points = get_curve_points(obj)
                     if len(points) >= 2:
-                        matched_polygon = self.find_matching_polygon(points, polygons_data)
-                        
-                        if matched_polygon:
-                            v1, v2 = self.get_edge_points_in_polygon_order(points, matched_polygon)
-                        else:
-                            v1 = (points[0][0], points[0][1])
-                            v2 = (points[1][0], points[1][1])
-                        
-                        curve_data = {
+                        raw_curves.append({
                             'collection': coll.name,
                             'object': obj.name,
-                            'v1': v1,
-                            'v2': v2,
-                            'length': math.sqrt((v2[0]-v1[0])**2 + (v2[1]-v1[1])**2)
-                        }
-                        
-                        if coll.name.startswith('THERM_Ti='):
-                            curve_data['type'] = 'Ti'
-                            try:
-                                parts = coll.name.replace('THERM_Ti=', '').split('_Rsi=')
-                                curve_data['ti_temperature'] = float(parts[0])
-                                curve_data['ti_rsi'] = float(parts[1])
-                            except:
-                                curve_data['ti_temperature'] = bpy.context.scene.therm_edge_props.ti_temperature
-                                curve_data['ti_rsi'] = bpy.context.scene.therm_edge_props.ti_rsi
-                                
-                        elif coll.name.startswith('THERM_Te='):
-                            curve_data['type'] = 'Te'
-                            try:
-                                parts = coll.name.replace('THERM_Te=', '').split('_Rse=')
-                                curve_data['te_temperature'] = float(parts[0])
-                                curve_data['te_rse'] = float(parts[1])
-                            except:
-                                curve_data['te_temperature'] = bpy.context.scene.therm_edge_props.te_temperature
-                                curve_data['te_rse'] = bpy.context.scene.therm_edge_props.te_rse
-                                
-                        elif coll.name.startswith('THERM_UFactor_'):
-                            curve_data['type'] = 'UFactor'
-                            curve_data['ufactor_name'] = coll.name.replace('THERM_UFactor_', '')
-                            ufactor_curves.append(curve_data)
-                            continue
-                                
-                        elif coll.name == 'THERM_Adiabatic':
-                            curve_data['type'] = 'Adiabatic'
-                            
-                        else:
-                            curve_data['type'] = 'Unknown'
-                        
-                        other_curves.append(curve_data)
+                            'points': points
+                        })
+        
+        return raw_curves
+    
+    def get_boundary_curves_from_collections(self, polygons_data=None, raw_curves=None):
+        """Pobiera krzywe z wszystkich kolekcji THERM i dopasowuje kolejność do polygonów"""
+        if polygons_data is None:
+            polygons_data, _ = get_export_polygons(bpy.context.selected_objects, self.mesh_cache)
+        if raw_curves is None:
+            raw_curves = self.collect_boundary_curve_points()
+        
+        ufactor_curves = []
+        other_curves = []
+        
+        # Indeks krawędzi budowany raz na eksport zamiast przeszukiwania wszystkich polygonów
+        edge_grid = therm_geometry.EdgeGrid([poly_data['coords'] for poly_data in polygons_data])
+        snap_tolerance = bpy.context.scene.therm_props.bc_snap_tolerance
+        snapped_count = 0
+        
+        for raw_curve in raw_curves:
+            coll_name = raw_curve['collection']
+            v1, v2, matched_edge, deviation = self.match_curve_to_edge(edge_grid, raw_curve['points'], snap_tolerance)
+            
+            if deviation is not None:
+                snapped_count += 1
+                print(f"🧲 Przyciągnięto krzywą {raw_curve['object']} ({coll_name}) do krawędzi "
+                      f"{v1} -> {v2} (odchyłka {deviation:.3f} mm)")
+            elif not matched_edge:
+                print(f"⚠️  Krzywa {raw_curve['object']} ({coll_name}) nie leży na żadnej krawędzi polygonu "
+                      f"(tolerancja przyciągania {snap_tolerance:.2f} mm) - używam surowych punktów")
+            
+            curve_data = {
+                'collection': coll_name,
+                'object': raw_curve['object'],
+                'v1': v1,
+                'v2': v2,
+                'length': math.sqrt((v2[0]-v1[0])**2 + (v2[1]-v1[1])**2)
+            }
+            
+            if coll_name.startswith('THERM_Ti='):
+                curve_data['type'] = 'Ti'
+                try:
+                    parts = coll_name.replace('THERM_Ti=', '').split('_Rsi=')
+                    curve_data['ti_temperature'] = float(parts[0])
+                    curve_data['ti_rsi'] = float(parts[1])
+                except:
+                    curve_data['ti_temperature'] = bpy.context.scene.therm_edge_props.ti_temperature
+                    curve_data['ti_rsi'] = bpy.context.scene.therm_edge_props.ti_rsi
+                    
+            elif coll_name.startswith('THERM_Te='):
+                curve_data['type'] = 'Te'
+                try:
+                    parts = coll_name.replace('THERM_Te=', '').split('_Rse=')
+                    curve_data['te_temperature'] = float(parts[0])
+                    curve_data['te_rse'] = float(parts[1])
+                except:
+                    curve_data['te_temperature'] = bpy.context.scene.therm_edge_props.te_temperature
+                    curve_data['te_rse'] = bpy.context.scene.therm_edge_props.te_rse
+                    
+            elif coll_name.startswith('THERM_UFactor_'):
+                curve_data['type'] = 'UFactor'
+                curve_data['ufactor_name'] = coll_name.replace('THERM_UFactor_', '')
+                ufactor_curves.append(curve_data)
+                continue
+                    
+            elif coll_name == 'THERM_Adiabatic':
+                curve_data['type'] = 'Adiabatic'
+                
+            else:
+                curve_data['type'] = 'Unknown'
+            
+            other_curves.append(curve_data)
+        
+        if snapped_count:
+            print(f"🧲 Przyciągnięto {snapped_count} krzywych warunków brzegowych do krawędzi polygonów")
         
         for ufactor_curve in ufactor_curves:
             matching_curve = self.find_matching_curve(ufactor_curve, other_curves)
@@ -180,6 +428,28 @@ class THERMExporter:
         
         return other_curves
 
+    def match_curve_to_edge(self, edge_grid, points, snap_tolerance):
+        """Dopasowuje odcinek krzywej do krawędzi polygonu (therm_geometry.EdgeGrid)
+        
+        Zwraca (v1, v2, krawędź, odchyłka): punkty w kolejności krawędzi polygonu, końce
+        pasującej krawędzi (None bez dopasowania) i odchyłkę przyciągnięcia (None bez przyciągania).
+        """
+        curve_start = (points[0][0], points[0][1])
+        curve_end = (points[1][0], points[1][1])
+        matched_edge = edge_grid.find_edge(curve_start, curve_end)
+        
+        if matched_edge:
+            if self.points_match(curve_start, matched_edge[0]):
+                return curve_start, curve_end, matched_edge, None
+            return curve_end, curve_start, matched_edge, None
+        
+        snapped = edge_grid.snap_segment(curve_start, curve_end, snap_tolerance) if snap_tolerance > 0 else None
+        if snapped:
+            v1, v2, deviation = snapped
+            return v1, v2, (v1, v2), deviation
+        
+        return curve_start, curve_end, None, None
+    
     def find_matching_curve(self, ufactor_curve, other_curves):
         """Znajduje krzywą która pasuje do krzywej U-Factor"""
         tolerance = 0.1
@@ -194,45 +464,10 @@ class THERMExporter:
         
         return None
 
-    def find_matching_polygon(self, curve_points, polygons_data):
-        """Znajduje polygon który pasuje do krzywej"""
-        for polygon in polygons_data:
-            poly_points = [(float(x), float(y)) for _, x, y in polygon['points']]
-            
-            curve_start = (curve_points[0][0], curve_points[0][1])
-            curve_end = (curve_points[1][0], curve_points[1][1])
-            
-            for i in range(len(poly_points)):
-                poly_point1 = poly_points[i]
-                poly_point2 = poly_points[(i + 1) % len(poly_points)]
-                
-                if (self.points_match(curve_start, poly_point1) and self.points_match(curve_end, poly_point2)) or \
-                   (self.points_match(curve_start, poly_point2) and self.points_match(curve_end, poly_point1)):
-                    return polygon
-        
-        return None
-
     def points_match(self, point1, point2, tolerance=0.1):
         """Sprawdza czy dwa punkty są takie same z tolerancją"""
         return abs(point1[0] - point2[0]) < tolerance and abs(point1[1] - point2[1]) < tolerance
 
-    def get_edge_points_in_polygon_order(self, curve_points, polygon):
-        """Zwraca punkty krzywej w kolejności zgodnej z polygonem"""
-        poly_points = [(float(x), float(y)) for _, x, y in polygon['points']]
-        curve_start = (curve_points[0][0], curve_points[0][1])
-        curve_end = (curve_points[1][0], curve_points[1][1])
-        
-        for i in range(len(poly_points)):
-            poly_point1 = poly_points[i]
-            poly_point2 = poly_points[(i + 1) % len(poly_points)]
-            
-            if self.points_match(curve_start, poly_point1) and self.points_match(curve_end, poly_point2):
-                return (curve_start, curve_end)
-            elif self.points_match(curve_start, poly_point2) and self.points_match(curve_end, poly_point1):
-                return (curve_end, curve_start)
-        
-        return ((curve_points[0][0], curve_points[0][1]), (curve_points[1][0], curve_points[1][1]))
-    
     def create_therm_file(self, filepath):
         try:
             therm_xml = ET.Element("THERM-XML")
@@ -250,17 +485,13 @@ class THERMExporter:
             ET.SubElement(therm_xml, "Units").text = "SI"
             
             mesh_control = ET.SubElement(therm_xml, "MeshControl")
-            mesh_control.set("MeshLevel", "8")
-            mesh_control.set("ErrorCheckFlag", "1")
-            mesh_control.set("ErrorLimit", "10.00")
-            mesh_control.set("MaxIterations", "10")
-            mesh_control.set("CMAflag", "0")
+            therm_refine.apply_mesh_control(mesh_control, mesh_control_settings(bpy.context.scene.therm_props))
             
             materials = ET.SubElement(therm_xml, "Materials")
-            selected_objects = [obj for obj in bpy.context.selected_objects if obj.type == 'MESH']
+            polygons_data, mesh_objects = get_export_polygons(bpy.context.selected_objects, self.mesh_cache)
             
             all_materials = set()
-            for obj in selected_objects:
+            for obj in mesh_objects:
                 if obj.data.materials:
                     for mat in obj.data.materials:
                         if mat and mat.name not in ['RED', 'BLUE', 'GREY', 'GREEN']:
@@ -299,7 +530,10 @@ class THERMExporter:
             boundary_conditions = ET.SubElement(therm_xml, "BoundaryConditions")
             
             unique_conditions = set()
-            boundary_curves = self.get_boundary_curves_from_collections()
+            raw_curves = self.collect_boundary_curve_points()
+            polygons_data, raw_curves = self.crop_export_model(polygons_data, raw_curves)
+            polygons_data = self.simplify_export_polygons(polygons_data, raw_curves)
+            boundary_curves = self.get_boundary_curves_from_collections(polygons_data, raw_curves)
             
             for curve in boundary_curves:
                 if curve['type'] == 'Ti':
@@ -336,27 +570,18 @@ class THERMExporter:
             polygons = ET.SubElement(therm_xml, "Polygons")
             polygon_id = 1
             
-            for obj in selected_objects:
-                polygons_data = get_all_polygons_from_mesh(obj)
+            for poly_data in polygons_data:
+                polygon = ET.SubElement(polygons, "Polygon",
+                                      ID=str(polygon_id), 
+                                      Material=poly_data['material'],
+                                      NSides=str(poly_data['num_sides']),
+                                      Type="1", 
+                                      units="mm")
                 
-                for poly_data in polygons_data:
-                    material_name = "DefaultMaterial"
-                    if obj.data.materials and poly_data['material_index'] < len(obj.data.materials):
-                        material = obj.data.materials[poly_data['material_index']]
-                        if material:
-                            material_name = material.name
-                    
-                    polygon = ET.SubElement(polygons, "Polygon",
-                                          ID=str(polygon_id), 
-                                          Material=material_name,
-                                          NSides=str(poly_data['num_sides']),
-                                          Type="1", 
-                                          units="mm")
-                    
-                    for index, x, y in poly_data['points']:
-                        ET.SubElement(polygon, "Point", index=index, x=x, y=y)
-                    
-                    polygon_id += 1
+                for index, x, y in poly_data['points']:
+                    ET.SubElement(polygon, "Point", index=index, x=x, y=y)
+                
+                polygon_id += 1
             
             boundaries = ET.SubElement(therm_xml, "Boundaries")
             boundary_id = polygon_id
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+from contextlib import contextmanager
+
+# Pliki blokad wspólne dla procesów, także na innych komputerach (bez zależności od bpy)
+#
+# Blokada to plik tworzony z O_EXCL, zawierający unikalny token właściciela i licznik
+# odświeżeń. Właściciel odświeża go co pewien czas (nowa zawartość i czas modyfikacji).
+# Porzuconą blokadę rozpoznaje się po tym, że jej zawartość nie zmieniła się przez
+# stale_age według zegara obserwatora, więc różnica zegarów komputerów nie ma znaczenia.
+# Czas modyfikacji pliku jest brany pod uwagę tylko dla blokad jednego komputera.
+#
+# Porzucona blokada jest odbierana zmianą nazwy na unikalną - dany plik może przenieść
+# tylko jeden proces. Po utworzeniu nowej blokady właściciel sprawdza w niej swój token.
+
+_observations = {}
+_observations_lock = threading.Lock()
+
+def read_lock(path):
+    """Zawartość pliku blokady (słownik) lub None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _read_raw(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _forget(path):
+    with _observations_lock:
+        _observations.pop(path, None)
+
+def _unchanged_for(path, content, stale_age):
+    """Jak długo (według tego procesu) zawartość blokady się nie zmienia [s]"""
+    now = time.monotonic()
+    with _observations_lock:
+        seen = _observations.get(path)
+        if seen is None or seen[0] != content:
+            _observations[path] = (content, now)
+            # Obserwacje porzuconych ścieżek (np. zakończonych zadań) nie rosną bez końca
+            for other, (_, since) in list(_observations.items()):
+                if now - since > 10 * stale_age:
+                    del _observations[other]
+            return 0.0
+        return now - seen[1]
+
+class LockFile:
+    """Blokada plikowa z tokenem właściciela i odświeżaniem
+
+    trust_mtime=True: blokada używana tylko przez procesy tego komputera - stara blokada
+    (według czasu modyfikacji) odbierana jest od razu, bez obserwacji jej zawartości.
+    """
+
+    def __init__(self, path, stale_age, info=None, trust_mtime=False):
+        self.path = path
+        self.stale_age = stale_age
+        self.info = dict(info or {})
+        self.trust_mtime = trust_mtime
+        self.token = uuid.uuid4().hex
+        self.beat = 0
+        self._last_refresh = None
+
+    def _content(self):
+        data = dict(self.info, token=self.token, host=socket.gethostname(), pid=os.getpid(), beat=self.beat)
+        return json.dumps(data)
+
+    def is_stale(self, content):
+        if _unchanged_for(self.path, content, self.stale_age) >= self.stale_age:
+            return True
+        if self.trust_mtime:
+            try:
+                return time.time() - os.path.getmtime(self.path) > self.stale_age
+            except OSError:
+                return False
+        return False
+
+    def _break(self, content):
+        """Odbiera porzuconą blokadę - True, jeśli przeniesiony plik był tą porzuconą blokadą"""
+        grave = f"{self.path}.stale-{uuid.uuid4().hex}"
+        try:
+            os.rename(self.path, grave)
+        except OSError:
+            return False
+        moved = _read_raw(grave)
+        if moved != content:
+            # Między odczytem a zmianą nazwy powstała nowa blokada - zostaje przywrócona
+            try:
+                os.link(grave, self.path)
+            except OSError:
+                pass
+            try:
+                os.remove(grave)
+            except OSError:
+                pass
+            return False
+        try:
+            os.remove(grave)
+        except OSError:
+            pass
+        _forget(self.path)
+        return True
+
+    def acquire(self):
+        """Jedna próba przejęcia blokady (bez czekania) - porzucone blokady są odbierane"""
+        for _ in range(3):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                content = _read_raw(self.path)
+                if content is None:
+                    continue
+                if not self.is_stale(content) or not self._break(content):
+                    return False
+                continue
+            except OSError:
+                return False
+            self.beat = 0
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self._content())
+            self._last_refresh = time.monotonic()
+            return self.owned()
+        return False
+
+    def owned(self):
+        lock = read_lock(self.path)
+        return bool(lock) and lock.get('token') == self.token
+
+    def refresh(self, force=False):
+        """Odświeża blokadę (najczęściej co stale_age / 6) - False, gdy blokada nie należy już do tego procesu"""
+        now = time.monotonic()
+        if not force and self._last_refresh is not None and now - self._last_refresh < self.stale_age / 6:
+            return True
+        if not self.owned():
+            return False
+        self.beat += 1
+        temp_path = f"{self.path}.{self.token}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(self._content())
+            os.replace(temp_path, self.path)
+        except OSError:
+            return False
+        self._last_refresh = now
+        return True
+
+    def release(self):
+        """Usuwa blokadę, jeśli nadal należy do tego procesu"""
+        if self.owned():
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        _forget(self.path)
+
+    @contextmanager
+    def kept_alive(self):
+        """Odświeża blokadę w tle przez czas trwania bloku with"""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.stale_age / 6):
+                if not self.refresh(force=True):
+                    print(f"⚠️  Utracono blokadę {self.path}")
+                    return
+
+        thread = threading.Thread(target=beat, name="lock-refresh", daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+            thread.join()
@@ -0,0 +1,326 @@
+import copy
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+try:
+    from . import therm_results
+except ImportError:
+    import therm_results
+
+# Odcisk geometrii modelu THERM niezależny od położenia i obrotu (bez zależności od bpy)
+#
+# Odcisk nie zależy od układu współrzędnych: wielokąty opisane są wielkościami
+# niezmienniczymi względem przesunięcia i obrotu - długościami krawędzi, kątami skrętu
+# w wierzchołkach, odległościami wierzchołków od środka modelu i odległościami między
+# środkami wielokątów. Wielkości zaokrąglane są przed porównaniem, a sekwencje
+# wierzchołków sprowadzane do postaci kanonicznej (kierunek i punkt początkowy cyklu).
+#
+# Warunki brzegowe zapisywane są we współrzędnych układu kanonicznego: początek w środku
+# modelu, oś x w stronę wierzchołka początkowego kanonicznego cyklu pierwszego wielokąta.
+# Dla wielokąta symetrycznego (kilka równoważnych punktów początkowych) brany jest
+# najmniejszy zapis spośród wszystkich takich układów.
+
+THERM_NAMESPACE = "http://windows.lbl.gov"
+INDEX_FILENAME = "therm_results_index.json"
+QUANTUM_MM = 0.1
+QUANTUM_DEG = 0.01
+
+def _local_tag(elem):
+    return elem.tag.rsplit('}', 1)[-1]
+
+def _children(elem, name):
+    return [child for child in elem if _local_tag(child) == name]
+
+def _find_section(root, name):
+    for child in root:
+        if _local_tag(child) == name:
+            return child
+    return None
+
+def _number(value, digits=4):
+    try:
+        return round(float(value), digits)
+    except (TypeError, ValueError):
+        return value or ""
+
+def _points(elem):
+    return [(float(point.get('x')), float(point.get('y'))) for point in _children(elem, 'Point')]
+
+def read_model(thmx_filepath):
+    """Wczytuje z pliku .thmx dane wejściowe modelu potrzebne do odcisku (bez sekcji wyników)"""
+    root = therm_results.read_model_input(thmx_filepath)
+    if root is None:
+        raise ET.ParseError(f"Pusty plik {thmx_filepath}")
+
+    materials = {}
+    materials_elem = _find_section(root, 'Materials')
+    if materials_elem is not None:
+        for material in _children(materials_elem, 'Material'):
+            materials[material.get('Name')] = (
+                _number(material.get('Conductivity')),
+                _number(material.get('EmissivityFront')),
+                _number(material.get('EmissivityBack'))
+            )
+
+    conditions = {}
+    conditions_elem = _find_section(root, 'BoundaryConditions')
+    if conditions_elem is not None:
+        for condition in _children(conditions_elem, 'BoundaryCondition'):
+            conditions[condition.get('Name')] = (
+                condition.get('Type', ''),
+                _number(condition.get('H')),
+                _number(condition.get('HeatFLux')),
+                _number(condition.get('Temperature'))
+            )
+
+    polygons = []
+    polygons_elem = _find_section(root, 'Polygons')
+    if polygons_elem is not None:
+        for polygon in _children(polygons_elem, 'Polygon'):
+            polygons.append((materials.get(polygon.get('Material'), polygon.get('Material')), _points(polygon)))
+
+    boundaries = []
+    boundaries_elem = _find_section(root, 'Boundaries')
+    if boundaries_elem is not None:
+        for bc_polygon in _children(boundaries_elem, 'BCPolygon'):
+            bc_name = bc_polygon.get('BC')
+            boundaries.append((conditions.get(bc_name, bc_name), bc_polygon.get('UFactorTag', ''), _points(bc_polygon)))
+
+    mesh_control = _find_section(root, 'MeshControl')
+    mesh_settings = sorted(mesh_control.attrib.items()) if mesh_control is not None else []
+
+    return {
+        'polygons': polygons,
+        'boundaries': boundaries,
+        'mesh_control': mesh_settings
+    }
+
+def _quantize(value, quantum):
+    return int(round(value / quantum))
+
+def _distinct(points, closed):
+    """Punkty bez powtórzeń kolejnych wierzchołków (krawędzie zerowej długości)"""
+    result = []
+    for point in points:
+        if not result or math.hypot(point[0] - result[-1][0], point[1] - result[-1][1]) >= QUANTUM_MM / 100:
+            result.append(point)
+    if closed and len(result) > 1 and math.hypot(result[0][0] - result[-1][0], result[0][1] - result[-1][1]) < QUANTUM_MM / 100:
+        result.pop()
+    return result
+
+def _turn(previous, point, following):
+    """Kąt skrętu w wierzchołku [stopnie], dodatni w lewo"""
+    angle = (math.atan2(following[1] - point[1], following[0] - point[0])
+             - math.atan2(point[1] - previous[1], point[0] - previous[0]))
+    return math.degrees(math.atan2(math.sin(angle), math.cos(angle)))
+
+def _vertex_invariants(points, center, closed):
+    """Dla każdego wierzchołka: długość krawędzi do następnego, kąt skrętu i odległość od środka modelu"""
+    count = len(points)
+    invariants = []
+    for i, point in enumerate(points):
+        if closed or i + 1 < count:
+            following = points[(i + 1) % count]
+            length = _quantize(math.hypot(following[0] - point[0], following[1] - point[1]), QUANTUM_MM)
+        else:
+            length = None
+        if closed or 0 < i < count - 1:
+            turn = _quantize(_turn(points[i - 1], point, points[(i + 1) % count]), QUANTUM_DEG)
+        else:
+            turn = None
+        radius = _quantize(math.hypot(point[0] - center[0], point[1] - center[1]), QUANTUM_MM)
+        invariants.append((length, turn, radius))
+    return invariants
+
+def _signed_area(points):
+    return sum(points[i - 1][0] * point[1] - point[0] * points[i - 1][1] for i, point in enumerate(points)) / 2.0
+
+def _canonical_cycle(points, center):
+    """Najmniejsza leksykograficznie rotacja cyklu niezmienników (wielokąt zawsze przeciwnie do zegara)
+
+    Zwraca postać kanoniczną i wierzchołki w kolejności każdej rotacji, która ją daje.
+    """
+    if _signed_area(points) < 0:
+        points = points[::-1]
+    invariants = _vertex_invariants(points, center, closed=True)
+    rotations = [tuple(invariants[i:] + invariants[:i]) for i in range(len(invariants))]
+    form = min(rotations)
+    return form, [points[i:] + points[:i] for i, rotation in enumerate(rotations) if rotation == form]
+
+def _frame_angle(cycle, center):
+    """Kierunek osi x układu kanonicznego - do pierwszego wierzchołka cyklu odległego od środka"""
+    for point in cycle:
+        if math.hypot(point[0] - center[0], point[1] - center[1]) >= QUANTUM_MM:
+            return math.atan2(point[1] - center[1], point[0] - center[0])
+    return 0.0
+
+def _canonical_path(points, center, angle):
+    """Linia warunku brzegowego w układzie kanonicznym - mniejszy z dwóch kierunków przejścia"""
+    cos_a = math.cos(angle)
+    sin_a = math.sin(angle)
+    posed = tuple(
+        (_quantize((x - center[0]) * cos_a + (y - center[1]) * sin_a, QUANTUM_MM),
+         _quantize((y - center[1]) * cos_a - (x - center[0]) * sin_a, QUANTUM_MM))
+        for x, y in points
+    )
+    return min(posed, posed[::-1])
+
+def _centroid(points):
+    return (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points))
+
+def _canonical_form(model):
+    polygons = [(material, _distinct(points, closed=True)) for material, points in model['polygons']]
+    polygons = [(material, points) for material, points in polygons if points]
+    vertices = {point for _, points in polygons for point in points}
+    center = _centroid(list(vertices)) if vertices else (0.0, 0.0)
+
+    # Wzajemne położenie wielokątów - odległości między ich środkami
+    centroids = [_centroid(points) for _, points in polygons]
+    described = []
+    for (material, points), centroid in zip(polygons, centroids):
+        form, cycles = _canonical_cycle(points, center)
+        distances = sorted(_quantize(math.hypot(centroid[0] - other[0], centroid[1] - other[1]), QUANTUM_MM)
+                           for other in centroids)
+        described.append(((repr(material), form, distances), cycles))
+    canonical_polygons = sorted(description for description, _ in described)
+
+    # Układy kanoniczne wyznaczone przez pierwszy wielokąt (wszystkie jego równoważne punkty początkowe)
+    angles = [_frame_angle(cycle, center)
+              for description, cycles in described if canonical_polygons and description == canonical_polygons[0]
+              for cycle in cycles] or [0.0]
+
+    boundaries = [(condition, tag, _distinct(points, closed=False)) for condition, tag, points in model['boundaries']]
+    canonical_boundaries = min(
+        sorted((repr(condition), tag, _canonical_path(points, center, angle))
+               for condition, tag, points in boundaries if points)
+        for angle in angles
+    )
+    return json.dumps([canonical_polygons, canonical_boundaries, model['mesh_control']], separators=(',', ':'))
+
+def fingerprint_model(model):
+    """Odcisk SHA-256 modelu - ten sam dla modelu przesuniętego i obróconego o dowolny kąt"""
+    return hashlib.sha256(_canonical_form(model).encode('utf-8')).hexdigest()
+
+def fingerprint_thmx(thmx_filepath):
+    """Odcisk modelu zapisanego w pliku .thmx"""
+    return fingerprint_model(read_model(thmx_filepath))
+
+def has_ufactor_results(thmx_filepath):
+    """Sprawdza czy plik .thmx zawiera wyniki U-factors"""
+    try:
+        for _ in therm_results.iter_ufactor_projections(thmx_filepath):
+            return True
+    except (ET.ParseError, OSError):
+        return False
+    return False
+
+def apply_cached_result(source_thmx, target_thmx):
+    """Kopiuje bloki U-factors z rozwiązanego modelu do pliku docelowego
+
+    Oba pliki czytane są strumieniowo - z modelu źródłowego tylko bloki U-factors,
+    plik docelowy przepisywany jest bez poprzednich wyników przez plik tymczasowy.
+    """
+    temp_path = None
+    try:
+        ufactors = [copy.deepcopy(block) for block in therm_results.iter_ufactor_blocks(source_thmx)]
+        if not ufactors:
+            return False
+
+        tag = ufactors[0].tag
+        namespace = tag[:tag.index('}') + 1] if tag.startswith('{') else ''
+        results = ET.Element(f"{namespace}Results")
+        case = ET.SubElement(results, f"{namespace}Case")
+        case.extend(ufactors)
+        ET.register_namespace('', THERM_NAMESPACE)
+
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(target_thmx) + '.',
+                                         dir=os.path.dirname(os.path.abspath(target_thmx)))
+        os.close(fd)
+        therm_results.write_model_input(target_thmx, temp_path,
+                                        append=ET.tostring(results, encoding='unicode') + '\n')
+        os.replace(temp_path, target_thmx)
+        temp_path = None
+        return True
+
+    except Exception as e:
+        print(f"❌ Błąd kopiowania wyników z {source_thmx}: {e}")
+        return False
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def file_stamp(path):
+    """Czas modyfikacji i rozmiar pliku (None, gdy brak pliku)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+# Wątki obliczeń (therm_scheduler) zapisują indeks jednocześnie - odczyt, zmiana i zapis pod blokadą
+_index_lock = threading.Lock()
+
+class ResultIndex:
+    """Indeks odcisk modelu -> rozwiązany plik .thmx (JSON w folderze projektu)"""
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.entries = {}
+        self.load()
+
+    @classmethod
+    def for_directory(cls, directory):
+        return cls(os.path.join(directory, INDEX_FILENAME))
+
+    def load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        # Nazwa tymczasowa unikalna dla procesu i wątku (proces roboczy kolejki zapisuje ten sam indeks)
+        temp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(temp_path, self.index_path)
+
+    def lookup(self, fingerprint, exclude_path=None):
+        """Zwraca wpis z rozwiązanym modelem o tym samym odcisku (jeśli plik nadal ma wyniki)"""
+        entry = self.entries.get(fingerprint)
+        if not entry:
+            return None
+
+        source = entry.get('thmx')
+        if exclude_path and source and os.path.normcase(os.path.abspath(source)) == os.path.normcase(os.path.abspath(exclude_path)):
+            return None
+
+        if not source or not os.path.exists(source) or not has_ufactor_results(source):
+            return None
+
+        # Plik źródłowy zmieniony od zapisu wpisu (np. ponowny eksport innego modelu pod tą nazwą)
+        if file_stamp(source) != entry.get('stamp'):
+            try:
+                if fingerprint_thmx(source) != fingerprint:
+                    return None
+            except (ET.ParseError, OSError, ValueError, TypeError):
+                return None
+
+        return entry
+
+    def store(self, fingerprint, thmx_filepath):
+        with _index_lock:
+            self.load()
+            self.entries[fingerprint] = {
+                'thmx': os.path.abspath(thmx_filepath),
+                'stamp': file_stamp(thmx_filepath),
+                'saved': datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+            }
+            self.save()
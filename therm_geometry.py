@@ -0,0 +1,652 @@
+import heapq
+import math
+
+# Operacje 2D na geometrii eksportu (współrzędne w mm, bez zależności od bpy)
+
+def point_segment_distance(point, seg_start, seg_end):
+    """Odległość punktu od odcinka"""
+    px, py = point
+    ax, ay = seg_start
+    bx, by = seg_end
+    dx = bx - ax
+    dy = by - ay
+    length_sq = dx * dx + dy * dy
+
+    if length_sq == 0.0:
+        return math.hypot(px - ax, py - ay)
+
+    t = ((px - ax) * dx + (py - ay) * dy) / length_sq
+    t = max(0.0, min(1.0, t))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+def distance_to_segments(point, segments):
+    """Najmniejsza odległość punktu od listy odcinków (punkt = odcinek zdegenerowany)"""
+    if not segments:
+        return 0.0
+    return min(point_segment_distance(point, a, b) for a, b in segments)
+
+def segments_intersect(p1, p2, q1, q2):
+    """Sprawdza czy odcinki p1-p2 i q1-q2 przecinają się właściwie (bez wspólnych końców)"""
+    def orient(a, b, c):
+        return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+    d1 = orient(q1, q2, p1)
+    d2 = orient(q1, q2, p2)
+    d3 = orient(p1, p2, q1)
+    d4 = orient(p1, p2, q2)
+
+    return ((d1 > 0 > d2) or (d1 < 0 < d2)) and ((d3 > 0 > d4) or (d3 < 0 < d4))
+
+def point_in_triangle(point, a, b, c):
+    """Sprawdza czy punkt leży wewnątrz trójkąta lub na jego brzegu"""
+    if not (min(a[0], b[0], c[0]) <= point[0] <= max(a[0], b[0], c[0]) and
+            min(a[1], b[1], c[1]) <= point[1] <= max(a[1], b[1], c[1])):
+        return False
+
+    def orient(p, q, r):
+        return (q[0] - p[0]) * (r[1] - p[1]) - (q[1] - p[1]) * (r[0] - p[0])
+
+    d1 = orient(a, b, point)
+    d2 = orient(b, c, point)
+    d3 = orient(c, a, point)
+    return (d1 >= 0 and d2 >= 0 and d3 >= 0) or (d1 <= 0 and d2 <= 0 and d3 <= 0)
+
+def distance_tolerance(distance, roi_radius, base_tolerance, growth, max_tolerance):
+    """Tolerancja upraszczania rosnąca z odległością od obszaru mostka"""
+    if distance <= roi_radius:
+        return 0.0
+    return min(max_tolerance, base_tolerance + growth * (distance - roi_radius))
+
+def simplify_polygons(polygons, roi_segments, roi_radius, base_tolerance, growth, max_tolerance,
+                      protected_points=()):
+    """Usuwa drobne detale poza obszarem mostka zachowując zgodność sąsiednich polygonów
+
+    Wierzchołek jest usuwany tylko wtedy, gdy ma dokładnie dwóch sąsiadów we wszystkich
+    polygonach, które go używają - dzięki temu wspólne krawędzie są upraszczane identycznie
+    po obu stronach i siatka pozostaje zgodna. Skrót nie może przeciąć żadnej krawędzi
+    ani objąć cudzego wierzchołka (sprawdzane są krawędzie wszystkich polygonów w pobliżu).
+    """
+    polygons = [list(coords) for coords in polygons]
+    protected = set(protected_points)
+    # Krawędzie usunięte przy upraszczaniu zostają w siatce - pomijane, gdy końce nie są już sąsiadami
+    edge_grid = EdgeGrid(polygons)
+
+    usage = {}
+    neighbours = {}
+    for poly_index, coords in enumerate(polygons):
+        count = len(coords)
+        for i, vertex in enumerate(coords):
+            usage.setdefault(vertex, set()).add(poly_index)
+            neighbours.setdefault(vertex, set()).update((coords[i - 1], coords[(i + 1) % count]))
+
+    tolerances = {}
+
+    def tolerance_for(vertex):
+        if vertex not in tolerances:
+            distance = distance_to_segments(vertex, roi_segments)
+            tolerances[vertex] = distance_tolerance(distance, roi_radius, base_tolerance, growth, max_tolerance)
+        return tolerances[vertex]
+
+    def removal_cost(vertex):
+        """Zwraca odchyłkę usunięcia wierzchołka lub None jeśli usunięcie jest niedozwolone"""
+        if vertex in protected or vertex not in usage:
+            return None
+
+        adjacent = neighbours.get(vertex, ())
+        if len(adjacent) != 2:
+            return None
+
+        first, second = sorted(adjacent)
+        if second in neighbours.get(first, ()):
+            return None
+
+        deviation = point_segment_distance(vertex, first, second)
+        if deviation > tolerance_for(vertex):
+            return None
+
+        for poly_index in usage[vertex]:
+            coords = polygons[poly_index]
+            if len(coords) <= 3 or coords.count(vertex) != 1:
+                return None
+
+        for edge_index in edge_grid.query_box(min(first[0], second[0], vertex[0]), min(first[1], second[1], vertex[1]),
+                                              max(first[0], second[0], vertex[0]), max(first[1], second[1], vertex[1])):
+            edge_start, edge_end = edge_grid.edges[edge_index]
+            if vertex in (edge_start, edge_end) or edge_end not in neighbours.get(edge_start, ()):
+                continue
+            if segments_intersect(first, second, edge_start, edge_end):
+                return None
+            for point in (edge_start, edge_end):
+                if point not in (first, second) and point_in_triangle(point, first, vertex, second):
+                    return None
+
+        return deviation
+
+    heap = []
+    for vertex in usage:
+        cost = removal_cost(vertex)
+        if cost is not None:
+            heapq.heappush(heap, (cost, vertex))
+
+    removed = 0
+    while heap:
+        cost, vertex = heapq.heappop(heap)
+        current = removal_cost(vertex)
+        if current is None or current != cost:
+            continue
+
+        first, second = sorted(neighbours[vertex])
+        for poly_index in usage[vertex]:
+            polygons[poly_index].remove(vertex)
+
+        neighbours[first].discard(vertex)
+        neighbours[first].add(second)
+        neighbours[second].discard(vertex)
+        neighbours[second].add(first)
+        del neighbours[vertex]
+        del usage[vertex]
+        edge_grid.add_edge(first, second)
+        removed += 1
+
+        for affected in (first, second):
+            affected_cost = removal_cost(affected)
+            if affected_cost is not None:
+                heapq.heappush(heap, (affected_cost, affected))
+
+    return polygons, removed
+
+def expand_bounds(segments, margin):
+    """Prostokąt obejmujący odcinki, powiększony o margines (xmin, ymin, xmax, ymax)"""
+    xs = [p[0] for segment in segments for p in segment]
+    ys = [p[1] for segment in segments for p in segment]
+    return (min(xs) - margin, min(ys) - margin, max(xs) + margin, max(ys) + margin)
+
+def _inside_box_edge(point, side, value):
+    """Sprawdza czy punkt leży po wewnętrznej stronie jednej krawędzi prostokąta"""
+    if side == 'xmin':
+        return point[0] >= value
+    if side == 'xmax':
+        return point[0] <= value
+    if side == 'ymin':
+        return point[1] >= value
+    return point[1] <= value
+
+def _intersect_box_edge(start, end, side, value, precision=2):
+    """Punkt przecięcia krawędzi z linią cięcia - liczony niezależnie od kierunku krawędzi"""
+    # Kanoniczna kolejność końców gwarantuje identyczny punkt dla wspólnej krawędzi sąsiadów
+    a, b = sorted((start, end))
+    if side in ('xmin', 'xmax'):
+        t = (value - a[0]) / (b[0] - a[0])
+        return (round(value, precision), round(a[1] + t * (b[1] - a[1]), precision))
+    t = (value - a[1]) / (b[1] - a[1])
+    return (round(a[0] + t * (b[0] - a[0]), precision), round(value, precision))
+
+def _box_sides(box):
+    xmin, ymin, xmax, ymax = box
+    return (('xmin', xmin), ('xmax', xmax), ('ymin', ymin), ('ymax', ymax))
+
+def _cut_carrier(carrier, side, value, precision=2):
+    """Punkt cięcia odcinka leżącego na pierwotnej krawędzi polygonu albo na innej linii cięcia"""
+    if isinstance(carrier[0], str):
+        # Odcinek wzdłuż innej linii cięcia - narożnik prostokąta
+        carrier_value = carrier[1]
+        if side in ('xmin', 'xmax'):
+            return (round(value, precision), round(carrier_value, precision))
+        return (round(carrier_value, precision), round(value, precision))
+    return _intersect_box_edge(carrier[0], carrier[1], side, value, precision)
+
+def _clip_rings(rings, side, cut, along, line_carrier):
+    """Przycina pierścienie półpłaszczyzną side(punkt) >= 0 - wynik może mieć kilka pierścieni
+
+    Pierścień to lista (wierzchołek, krawędź nośna odcinka do następnego wierzchołka).
+    Części brzegu wewnątrz półpłaszczyzny (od wejścia do wyjścia) łączone są wzdłuż linii
+    cięcia z wejściem sąsiednim na tej linii - punkty przecięcia posortowane wzdłuż linii
+    tworzą pary (wyjście, wejście) ograniczające odcinki linii leżące wewnątrz polygonu.
+    Polygon wklęsły przecinający linię kilka razy daje osobne pierścienie zamiast jednego
+    połączonego mostkiem zerowej szerokości.
+    """
+    result = []
+    for ring in rings:
+        sides = [side(point) for point, _ in ring]
+        if all(value >= 0 for value in sides):
+            result.append(ring)
+            continue
+        if not any(value > 0 for value in sides):
+            continue
+
+        # Obchód od wierzchołka na zewnątrz - każdy łańcuch ma wejście i wyjście
+        count = len(ring)
+        first = next(i for i, value in enumerate(sides) if value < 0)
+        chains = []
+        chain = None
+        for step in range(1, count + 1):
+            i = (first + step) % count
+            previous, carrier = ring[i - 1]
+            current, current_carrier = ring[i]
+            if sides[i] >= 0:
+                if sides[i - 1] < 0:
+                    chain = ([(cut(previous, current, carrier), carrier)], [False])
+                chain[0].append((current, current_carrier))
+                if sides[i] > 0:
+                    chain[1][0] = True
+            elif sides[i - 1] >= 0:
+                chain[0].append((cut(previous, current, carrier), line_carrier))
+                chains.append(chain)
+
+        # Łańcuchy bez wierzchołka wewnątrz tylko dotykają linii cięcia
+        chains = [points for points, strict in chains if strict[0]]
+        if len(chains) <= 1:
+            result.extend(chains)
+            continue
+
+        events = sorted([(along(points[-1][0]), 0, index) for index, points in enumerate(chains)] +
+                        [(along(points[0][0]), 1, index) for index, points in enumerate(chains)])
+        following = {}
+        for exit_event, entry_event in zip(events[0::2], events[1::2]):
+            if exit_event[1] == entry_event[1]:
+                following = None
+                break
+            if exit_event[1] == 1:
+                exit_event, entry_event = entry_event, exit_event
+            following[exit_event[2]] = entry_event[2]
+
+        if following is None:
+            # Przypadek zdegenerowany - łańcuchy w kolejności obchodu
+            result.append([point for points in chains for point in points])
+            continue
+
+        visited = set()
+        for index in range(len(chains)):
+            joined = []
+            while index not in visited:
+                visited.add(index)
+                joined.extend(chains[index])
+                index = following[index]
+            if joined:
+                result.append(joined)
+
+    return result
+
+def _clean_ring(points):
+    """Pierścień bez powtórzonych kolejnych wierzchołków (pusty, gdy ma mniej niż 3)"""
+    cleaned = []
+    for point in points:
+        if not cleaned or cleaned[-1] != point:
+            cleaned.append(point)
+    if len(cleaned) > 1 and cleaned[0] == cleaned[-1]:
+        cleaned.pop()
+    return cleaned if len(cleaned) >= 3 else []
+
+def clip_polygon_to_box(coords, box, precision=2):
+    """Przycina polygon do prostokąta - zwraca listę polygonów (wklęsły może się rozpaść na kilka)
+
+    Punkty cięcia liczone są zawsze z pierwotnej krawędzi polygonu (także gdy krawędź
+    przecina dwie linie cięcia), więc sąsiednie polygony i krzywe leżące na tej krawędzi
+    (clip_segment_to_box z carrier) dostają identyczne punkty.
+    """
+    count = len(coords)
+    # Wierzchołek i krawędź, na której leży odcinek do następnego wierzchołka
+    rings = [[(coords[i], (coords[i], coords[(i + 1) % count])) for i in range(count)]]
+
+    for side, value in _box_sides(box):
+        axis = 0 if side in ('xmin', 'xmax') else 1
+        sign = 1.0 if side in ('xmin', 'ymin') else -1.0
+        rings = _clip_rings(
+            rings,
+            lambda point, axis=axis, sign=sign, value=value: sign * (point[axis] - value),
+            lambda previous, current, carrier, side=side, value=value: _cut_carrier(carrier, side, value, precision),
+            lambda point, axis=axis: point[1 - axis],
+            (side, value)
+        )
+
+    polygons = [_clean_ring([point for point, _ in ring]) for ring in rings]
+    return [polygon for polygon in polygons if polygon]
+
+def clip_segment_to_box(start, end, box, precision=2, carrier=None):
+    """Przycina odcinek do prostokąta (Liang-Barsky) z zachowaniem kierunku
+
+    carrier - krawędź polygonu, na której leży odcinek (EdgeGrid.find_carrier). Punkty
+    cięcia liczone są wtedy z tej krawędzi, tak samo jak w clip_polygon_to_box.
+    """
+    xmin, ymin, xmax, ymax = box
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    t0, t1 = 0.0, 1.0
+    side0 = side1 = None
+
+    for (p, q), box_side in zip(((-dx, start[0] - xmin), (dx, xmax - start[0]),
+                                 (-dy, start[1] - ymin), (dy, ymax - start[1])), _box_sides(box)):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        t = q / p
+        if p < 0:
+            if t > t0:
+                t0, side0 = t, box_side
+        elif t < t1:
+            t1, side1 = t, box_side
+        if t0 > t1:
+            return None
+
+    if t0 == t1:
+        return None
+
+    def cut(t, box_side):
+        side, value = box_side
+        axis = 0 if side in ('xmin', 'xmax') else 1
+        if carrier is not None and carrier[0][axis] != carrier[1][axis]:
+            return _intersect_box_edge(carrier[0], carrier[1], side, value, precision)
+        return (round(start[0] + t * dx, precision), round(start[1] + t * dy, precision))
+
+    clipped_start = start if side0 is None else cut(t0, side0)
+    clipped_end = end if side1 is None else cut(t1, side1)
+    return clipped_start, clipped_end
+
+def _halfplane_side(point, halfplane):
+    """Odległość ze znakiem od prostej cięcia (dodatnia po stronie zachowywanej)"""
+    origin, normal = halfplane
+    return (point[0] - origin[0]) * normal[0] + (point[1] - origin[1]) * normal[1]
+
+def _intersect_halfplane(start, end, halfplane, precision=2):
+    """Punkt przecięcia krawędzi z prostą cięcia - liczony niezależnie od kierunku krawędzi"""
+    a, b = sorted((start, end))
+    side_a = _halfplane_side(a, halfplane)
+    side_b = _halfplane_side(b, halfplane)
+    t = side_a / (side_a - side_b)
+    return (round(a[0] + t * (b[0] - a[0]), precision), round(a[1] + t * (b[1] - a[1]), precision))
+
+def strip_halfplanes(start, end, half_width, depth_range=None):
+    """Półpłaszczyzny pasa prostopadłego do odcinka start-end
+
+    Pas ma szerokość 2 * half_width wzdłuż kierunku odcinka (środek w połowie odcinka).
+    Opcjonalny depth_range (min, max) ogranicza pas w kierunku normalnej odcinka,
+    mierzony od prostej przechodzącej przez start.
+    """
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    length = math.hypot(dx, dy)
+    if length == 0:
+        return []
+
+    direction = (dx / length, dy / length)
+    normal = (-direction[1], direction[0])
+    center = ((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+
+    halfplanes = [
+        ((center[0] - direction[0] * half_width, center[1] - direction[1] * half_width), direction),
+        ((center[0] + direction[0] * half_width, center[1] + direction[1] * half_width), (-direction[0], -direction[1]))
+    ]
+
+    if depth_range is not None:
+        low, high = depth_range
+        halfplanes.append(((start[0] + normal[0] * low, start[1] + normal[1] * low), normal))
+        halfplanes.append(((start[0] + normal[0] * high, start[1] + normal[1] * high), (-normal[0], -normal[1])))
+
+    return halfplanes
+
+def clip_polygon_to_halfplanes(coords, halfplanes, precision=2):
+    """Przycina polygon do części wspólnej półpłaszczyzn - zwraca listę polygonów"""
+    rings = [[(point, None) for point in coords]]
+
+    for halfplane in halfplanes:
+        normal = halfplane[1]
+        rings = _clip_rings(
+            rings,
+            lambda point, halfplane=halfplane: _halfplane_side(point, halfplane),
+            lambda previous, current, carrier, halfplane=halfplane: _intersect_halfplane(previous, current, halfplane, precision),
+            lambda point, normal=normal: point[1] * normal[0] - point[0] * normal[1],
+            None
+        )
+
+    polygons = [_clean_ring([point for point, _ in ring]) for ring in rings]
+    return [polygon for polygon in polygons if polygon]
+
+def clip_segment_to_halfplanes(start, end, halfplanes, precision=2):
+    """Przycina odcinek do części wspólnej półpłaszczyzn z zachowaniem kierunku"""
+    t0, t1 = 0.0, 1.0
+
+    for halfplane in halfplanes:
+        side_start = _halfplane_side(start, halfplane)
+        side_end = _halfplane_side(end, halfplane)
+        if side_start < 0 and side_end < 0:
+            return None
+        if side_start < 0 or side_end < 0:
+            t = side_start / (side_start - side_end)
+            if side_start < 0:
+                t0 = max(t0, t)
+            else:
+                t1 = min(t1, t)
+        if t0 >= t1:
+            return None
+
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    clipped_start = start if t0 == 0.0 else (round(start[0] + t0 * dx, precision), round(start[1] + t0 * dy, precision))
+    clipped_end = end if t1 == 1.0 else (round(start[0] + t1 * dx, precision), round(start[1] + t1 * dy, precision))
+    return clipped_start, clipped_end
+
+def uncovered_parts(start, end, segments, tolerance):
+    """Części odcinka start-end, których nie pokrywają odcinki leżące na jego prostej
+
+    Końce części to końce pokrywających odcinków, kierunek jak start-end.
+    """
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    length = math.hypot(dx, dy)
+    if length == 0.0:
+        return []
+
+    def along(point):
+        return ((point[0] - start[0]) * dx + (point[1] - start[1]) * dy) / (length * length)
+
+    def off_line(point):
+        return abs((point[0] - start[0]) * dy - (point[1] - start[1]) * dx) / length
+
+    intervals = []
+    for a, b in segments:
+        if off_line(a) > tolerance or off_line(b) > tolerance:
+            continue
+        ta, tb = along(a), along(b)
+        if ta > tb:
+            ta, tb, a, b = tb, ta, b, a
+        if tb > 0.0 and ta < 1.0:
+            intervals.append((ta, tb, a, b))
+
+    parts = []
+    cursor_t, cursor = 0.0, start
+    for ta, tb, a, b in sorted(intervals):
+        if (ta - cursor_t) * length > tolerance:
+            parts.append((cursor, a))
+        if tb > cursor_t:
+            cursor_t, cursor = tb, b
+    if (1.0 - cursor_t) * length > tolerance:
+        parts.append((cursor, end))
+
+    return parts
+
+def find_cut_edges(polygons, box, tolerance=0.01, covered=(), cover_tolerance=0.1):
+    """Zwraca krawędzie leżące na linii cięcia, których nie dzieli żaden inny polygon
+
+    Części krawędzi pokryte odcinkami z covered (np. krzywymi Ti/Te) są pomijane -
+    krawędź pokryta częściowo zwracana jest jako niepokryte odcinki.
+    """
+    edge_count = {}
+    candidates = []
+
+    for coords in polygons:
+        count = len(coords)
+        for i in range(count):
+            start = coords[i]
+            end = coords[(i + 1) % count]
+            key = (start, end) if start <= end else (end, start)
+            edge_count[key] = edge_count.get(key, 0) + 1
+
+            for side, value in _box_sides(box):
+                axis = 0 if side in ('xmin', 'xmax') else 1
+                if abs(start[axis] - value) <= tolerance and abs(end[axis] - value) <= tolerance:
+                    candidates.append((key, start, end))
+                    break
+
+    cut_edges = []
+    for key, start, end in candidates:
+        if edge_count[key] == 1:
+            cut_edges.extend(uncovered_parts(start, end, covered, cover_tolerance))
+    return cut_edges
+
+def find_external_edges(polygons):
+    """Krawędzie zewnętrzne (należące do jednego polygonu) w kolejności polygonów
+
+    Zwraca listy (indeks polygonu, początek, koniec) - jeden przebieg po krawędziach (słownik).
+    """
+    edge_count = {}
+    edges = []
+
+    for poly_index, coords in enumerate(polygons):
+        count = len(coords)
+        for i in range(count):
+            start = coords[i]
+            end = coords[(i + 1) % count]
+            if start == end:
+                continue
+            key = (start, end) if start <= end else (end, start)
+            edge_count[key] = edge_count.get(key, 0) + 1
+            edges.append((key, poly_index, start, end))
+
+    return [(poly_index, start, end) for key, poly_index, start, end in edges if edge_count[key] == 1]
+
+def segment_covers_edge(segment, start, end, tolerance):
+    """Sprawdza czy krawędź leży na odcinku (oba końce w zadanej odległości od odcinka)"""
+    return (point_segment_distance(start, segment[0], segment[1]) <= tolerance and
+            point_segment_distance(end, segment[0], segment[1]) <= tolerance)
+
+class EdgeGrid:
+    """Siatka kubełkowa krawędzi polygonów do szybkiego wyszukiwania najbliższej krawędzi"""
+
+    def __init__(self, polygons, cell_size=None):
+        self.edges = []
+        for coords in polygons:
+            count = len(coords)
+            for i in range(count):
+                start = coords[i]
+                end = coords[(i + 1) % count]
+                if start != end:
+                    self.edges.append((start, end))
+
+        if cell_size is None:
+            lengths = sorted(math.hypot(e[0] - s[0], e[1] - s[1]) for s, e in self.edges)
+            cell_size = lengths[len(lengths) // 2] if lengths else 1.0
+        self.cell_size = max(cell_size, 1.0)
+
+        self.cells = {}
+        for edge_index, (start, end) in enumerate(self.edges):
+            self._insert(edge_index, start, end)
+
+    def _insert(self, edge_index, start, end):
+        for cell in self._cells_for_box(min(start[0], end[0]), min(start[1], end[1]),
+                                        max(start[0], end[0]), max(start[1], end[1])):
+            self.cells.setdefault(cell, []).append(edge_index)
+
+    def add_edge(self, start, end):
+        """Dodaje krawędź (np. skrót po usunięciu wierzchołka przy upraszczaniu)"""
+        if start != end:
+            self.edges.append((start, end))
+            self._insert(len(self.edges) - 1, start, end)
+
+    def _cells_for_box(self, xmin, ymin, xmax, ymax):
+        size = self.cell_size
+        for ix in range(int(math.floor(xmin / size)), int(math.floor(xmax / size)) + 1):
+            for iy in range(int(math.floor(ymin / size)), int(math.floor(ymax / size)) + 1):
+                yield (ix, iy)
+
+    def query(self, point, radius):
+        """Indeksy krawędzi z komórek w promieniu od punktu"""
+        return self.query_box(point[0] - radius, point[1] - radius, point[0] + radius, point[1] + radius)
+
+    def query_box(self, xmin, ymin, xmax, ymax):
+        """Indeksy krawędzi z komórek pokrywających prostokąt"""
+        found = set()
+        for cell in self._cells_for_box(xmin, ymin, xmax, ymax):
+            found.update(self.cells.get(cell, ()))
+        return found
+
+    def find_edge(self, start, end, tolerance=0.1):
+        """Krawędź o końcach zgodnych z odcinkiem (w kolejności polygonu) albo None"""
+        for edge_index in self.query(start, tolerance):
+            edge_start, edge_end = self.edges[edge_index]
+            if _points_close(start, edge_start, tolerance) and _points_close(end, edge_end, tolerance):
+                return edge_start, edge_end
+            if _points_close(start, edge_end, tolerance) and _points_close(end, edge_start, tolerance):
+                return edge_start, edge_end
+        return None
+
+    def find_carrier(self, start, end, tolerance, max_angle_deg=1.0):
+        """Najbliższa współliniowa krawędź, na której leży odcinek (w tolerancji)
+
+        Zwraca (odchyłka, początek krawędzi, koniec krawędzi) albo None.
+        """
+        seg_dx = end[0] - start[0]
+        seg_dy = end[1] - start[1]
+        seg_length = math.hypot(seg_dx, seg_dy)
+        if seg_length == 0.0:
+            return None
+
+        max_sin = math.sin(math.radians(max_angle_deg))
+        candidates = self.query(start, tolerance) & self.query(end, tolerance)
+
+        best = None
+        for edge_index in candidates:
+            edge_start, edge_end = self.edges[edge_index]
+            edge_dx = edge_end[0] - edge_start[0]
+            edge_dy = edge_end[1] - edge_start[1]
+            edge_length = math.hypot(edge_dx, edge_dy)
+
+            cross = abs(seg_dx * edge_dy - seg_dy * edge_dx) / (seg_length * edge_length)
+            if cross > max_sin:
+                continue
+
+            deviation = max(point_segment_distance(start, edge_start, edge_end),
+                            point_segment_distance(end, edge_start, edge_end))
+            if deviation > tolerance:
+                continue
+
+            if best is None or deviation < best[0]:
+                best = (deviation, edge_start, edge_end)
+
+        return best
+
+    def snap_segment(self, start, end, tolerance, max_angle_deg=1.0):
+        """Przyciąga odcinek do najbliższej współliniowej krawędzi w tolerancji
+
+        Zwraca (punkt1, punkt2, odchyłka) w kolejności krawędzi polygonu albo None.
+        """
+        best = self.find_carrier(start, end, tolerance, max_angle_deg)
+        if best is None:
+            return None
+
+        deviation, edge_start, edge_end = best
+        snapped_start = _snap_to_edge(start, edge_start, edge_end, tolerance)
+        snapped_end = _snap_to_edge(end, edge_start, edge_end, tolerance)
+
+        # Kierunek jak w polygonie (geometria po lewej stronie)
+        edge_dot = (snapped_end[0] - snapped_start[0]) * (edge_end[0] - edge_start[0]) + \
+                   (snapped_end[1] - snapped_start[1]) * (edge_end[1] - edge_start[1])
+        if edge_dot < 0:
+            snapped_start, snapped_end = snapped_end, snapped_start
+
+        return snapped_start, snapped_end, deviation
+
+def _points_close(point1, point2, tolerance):
+    return abs(point1[0] - point2[0]) < tolerance and abs(point1[1] - point2[1]) < tolerance
+
+def _snap_to_edge(point, edge_start, edge_end, tolerance, precision=2):
+    """Rzut punktu na krawędź - z przyciągnięciem do wierzchołka jeśli jest w tolerancji"""
+    for vertex in (edge_start, edge_end):
+        if math.hypot(point[0] - vertex[0], point[1] - vertex[1]) <= tolerance:
+            return vertex
+
+    dx = edge_end[0] - edge_start[0]
+    dy = edge_end[1] - edge_start[1]
+    t = ((point[0] - edge_start[0]) * dx + (point[1] - edge_start[1]) * dy) / (dx * dx + dy * dy)
+    t = max(0.0, min(1.0, t))
+    return (round(edge_start[0] + t * dx, precision), round(edge_start[1] + t * dy, precision))
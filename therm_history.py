@@ -0,0 +1,296 @@
+import os
+import time
+import socket
+import sqlite3
+import hashlib
+import xml.etree.ElementTree as ET
+
+try:
+    from . import therm_results
+except ImportError:
+    import therm_results
+
+# Historia obliczeń THERM w lokalnej bazie SQLite (bez zależności od bpy)
+#
+# Każde zakończone zadanie zapisuje: skrót danych wejściowych, rozmiar modelu
+# (wielokąty, punkty, warunki brzegowe, MeshControl), czas, kod wyjścia, stan,
+# rozmiar plików wynikowych i odczytane U-factors. Baza jest wspólna dla
+# projektów - służy do planowania obliczeń i wyszukiwania wolnych modeli.
+
+HISTORY_DIR = os.path.join(os.path.expanduser("~"), ".therm_exporter")
+HISTORY_FILENAME = "therm_runs.sqlite"
+CONNECT_TIMEOUT = 10.0
+
+STATUS_OK = 'ok'
+STATUS_FAILED = 'failed'
+STATUS_TIMEOUT = 'timeout'
+STATUS_STALLED = 'stalled'
+STATUS_CANCELLED = 'cancelled'
+STATUS_INPUT_CHANGED = 'input_changed'
+
+# Elementy pomijane w skrócie danych wejściowych (data zapisu zmienia się przy każdym eksporcie)
+VOLATILE_ELEMENTS = ('SaveDate',)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    thmx TEXT NOT NULL,
+    input_hash TEXT,
+    started REAL,
+    finished REAL NOT NULL,
+    wall_time REAL,
+    exit_code INTEGER,
+    status TEXT NOT NULL,
+    backend TEXT,
+    host TEXT,
+    polygons INTEGER,
+    points INTEGER,
+    bc_polygons INTEGER,
+    boundary_conditions INTEGER,
+    mesh_level INTEGER,
+    error_limit REAL,
+    max_iterations INTEGER,
+    iterations INTEGER,
+    error_percent REAL,
+    converged INTEGER,
+    timeout REAL,
+    output_bytes INTEGER
+);
+CREATE TABLE IF NOT EXISTS ufactors (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    ufactor REAL
+);
+CREATE INDEX IF NOT EXISTS runs_input_hash ON runs(input_hash);
+CREATE INDEX IF NOT EXISTS runs_thmx ON runs(thmx);
+CREATE INDEX IF NOT EXISTS runs_finished ON runs(finished);
+CREATE INDEX IF NOT EXISTS runs_wall_time ON runs(wall_time);
+CREATE INDEX IF NOT EXISTS runs_size ON runs(mesh_level, points);
+CREATE INDEX IF NOT EXISTS ufactors_run ON ufactors(run_id);
+"""
+
+def input_hash(thmx_filepath):
+    """SHA-256 danych wejściowych .thmx (bez daty zapisu i wyników) - ten sam model daje ten sam skrót
+
+    Skrót liczony jest z kanonicznej postaci elementów (nazwa, posortowane atrybuty, tekst),
+    więc nie zależy od podziału na wiersze, wcięć ani kolejności atrybutów.
+    Parsowanie kończy się na pierwszej sekcji wyników (MeshInput, Results).
+    """
+    digest = hashlib.sha256()
+    skipped = 0
+    stack = []
+    context = ET.iterparse(thmx_filepath, events=('start', 'end'))
+    try:
+        for event, elem in context:
+            name = elem.tag.rsplit('}', 1)[-1]
+            if event == 'start':
+                if name in therm_results.RESULT_SECTIONS:
+                    break
+                stack.append(elem)
+                if skipped or name in VOLATILE_ELEMENTS:
+                    skipped += 1
+                    continue
+                attributes = ''.join(f' {key}="{value}"' for key, value in sorted(elem.attrib.items()))
+                digest.update(f'<{name}{attributes}>'.encode('utf-8'))
+                continue
+
+            stack.pop()
+            if not stack:
+                # Koniec elementu głównego - jak przy pliku przerwanym na sekcji wyników
+                break
+            if skipped:
+                skipped -= 1
+            else:
+                digest.update(f'{(elem.text or "").strip()}</{name}>'.encode('utf-8'))
+            # Element dodany do skrótu - zwolnij go i odłącz od rodzica
+            elem.clear()
+            if stack and len(stack[-1]) and stack[-1][-1] is elem:
+                del stack[-1][-1]
+    finally:
+        del context
+    return digest.hexdigest()
+
+BACKEND_NAMES = {'SolverProcess': 'local', 'SpoolJob': 'spool', 'FakeJob': 'fake'}
+
+def handle_status(handle):
+    """Stan zakończonego zadania backendu"""
+    if handle.cancelled:
+        return STATUS_CANCELLED
+    if handle.input_changed:
+        return STATUS_INPUT_CHANGED
+    if handle.succeeded():
+        return STATUS_OK
+    if getattr(handle, 'stalled', False):
+        return STATUS_STALLED
+    if handle.timed_out:
+        return STATUS_TIMEOUT
+    return STATUS_FAILED
+
+def _int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class RunHistory:
+    """Baza historii obliczeń - połączenie otwierane na czas operacji (wątki i procesy robocze)"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(HISTORY_DIR, HISTORY_FILENAME)
+        self._initialized = False
+
+    def connect(self):
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=CONNECT_TIMEOUT)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA foreign_keys = ON")
+        if not self._initialized:
+            # WAL - odczyt z panelu nie blokuje zapisu przez proces roboczy
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.executescript(SCHEMA)
+            self._initialized = True
+        return connection
+
+    def _query(self, sql, params=()):
+        connection = self.connect()
+        try:
+            return [dict(row) for row in connection.execute(sql, params)]
+        finally:
+            connection.close()
+
+    def record(self, run, ufactors=None):
+        """Zapisuje przebieg (słownik kolumn tabeli runs) i jego U-factors - zwraca id"""
+        columns = list(run)
+        connection = self.connect()
+        try:
+            with connection:
+                cursor = connection.execute(
+                    f"INSERT INTO runs ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                    [run[column] for column in columns])
+                run_id = cursor.lastrowid
+                connection.executemany("INSERT INTO ufactors (run_id, tag, ufactor) VALUES (?, ?, ?)",
+                                       [(run_id, tag, value) for tag, value in (ufactors or {}).items()
+                                        if isinstance(value, float)])
+            return run_id
+        finally:
+            connection.close()
+
+    def record_handle(self, handle, backend=None):
+        """Zapisuje zakończone zadanie backendu (SolverProcess, SpoolJob, FakeJob)"""
+        if backend is None:
+            backend = BACKEND_NAMES.get(type(handle).__name__, type(handle).__name__)
+        thmx_filepath = os.path.abspath(handle.thmx_filepath)
+        status = handle_status(handle)
+        run = {
+            'thmx': thmx_filepath,
+            'started': getattr(handle, 'started', None),
+            'finished': getattr(handle, 'finished', None) or time.time(),
+            'wall_time': getattr(handle, 'solve_elapsed', None) or handle.elapsed,
+            'exit_code': handle.returncode,
+            'status': status,
+            'backend': backend,
+            'host': getattr(handle, 'worker', '') or socket.gethostname(),
+            'timeout': handle.timeout,
+            'output_bytes': sum(os.path.getsize(path) for path in handle.created_outputs() if os.path.exists(path))
+        }
+
+        try:
+            run['input_hash'] = input_hash(thmx_filepath)
+            stats = therm_results.read_model_stats(thmx_filepath)
+        except (OSError, SyntaxError) as e:
+            print(f"⚠️  Historia obliczeń: nie można odczytać modelu {os.path.basename(thmx_filepath)}: {e}")
+            stats = None
+        if stats:
+            mesh_control = stats['mesh_control']
+            run.update(polygons=stats['polygons'], points=stats['points'], bc_polygons=stats['bc_polygons'],
+                       boundary_conditions=stats['boundary_conditions'],
+                       mesh_level=_int(mesh_control.get('MeshLevel')),
+                       error_limit=_float(mesh_control.get('ErrorLimit')),
+                       max_iterations=_int(mesh_control.get('MaxIterations')))
+
+        progress = getattr(handle, 'progress', None)
+        if progress is not None:
+            run.update(iterations=progress.iteration, error_percent=progress.error_percent)
+            if progress.error_percent is not None and run.get('error_limit') is not None:
+                run['converged'] = int(progress.error_percent <= run['error_limit'])
+
+        ufactors = {}
+        if status == STATUS_OK:
+            try:
+                ufactors = therm_results.read_ufactors(thmx_filepath)
+                run['output_bytes'] += os.path.getsize(thmx_filepath)
+            except Exception as e:
+                print(f"⚠️  Historia obliczeń: nie można odczytać U-factors: {e}")
+
+        return self.record(run, ufactors)
+
+    def ufactors(self, run_id):
+        return {row['tag']: row['ufactor'] for row in
+                self._query("SELECT tag, ufactor FROM ufactors WHERE run_id = ?", (run_id,))}
+
+    def recent(self, limit=20):
+        return self._query("SELECT * FROM runs ORDER BY finished DESC LIMIT ?", (limit,))
+
+    def runs_for(self, thmx_filepath, limit=20):
+        return self._query("SELECT * FROM runs WHERE thmx = ? ORDER BY finished DESC LIMIT ?",
+                           (os.path.abspath(thmx_filepath), limit))
+
+    def runs_for_input(self, input_digest, limit=20):
+        """Przebiegi tego samego modelu (także pod inną nazwą pliku)"""
+        return self._query("SELECT * FROM runs WHERE input_hash = ? ORDER BY finished DESC LIMIT ?",
+                           (input_digest, limit))
+
+    def slowest(self, limit=5, since=None):
+        """Najwolniejsze udane obliczenia - kandydaci do uproszczenia modelu"""
+        return self._query("SELECT * FROM runs WHERE status = ? AND finished >= ? ORDER BY wall_time DESC LIMIT ?",
+                           (STATUS_OK, since or 0, limit))
+
+    def summary(self, since=None):
+        """Liczba przebiegów, udane, błędy, łączny i średni czas od chwili since"""
+        rows = self._query("""
+            SELECT COUNT(*) AS runs,
+                   SUM(status = 'ok') AS succeeded,
+                   SUM(status IN ('failed', 'timeout', 'stalled')) AS failed,
+                   SUM(status = 'timeout') AS timed_out,
+                   SUM(wall_time) AS total_time,
+                   AVG(CASE WHEN status = 'ok' THEN wall_time END) AS mean_time,
+                   MAX(CASE WHEN status = 'ok' THEN wall_time END) AS max_time
+            FROM runs WHERE finished >= ?""", (since or 0,))
+        summary = rows[0]
+        return {key: value or 0 for key, value in summary.items()}
+
+    def time_by_mesh_level(self, since=None):
+        """Średni czas i liczba punktów udanych obliczeń dla każdego MeshLevel"""
+        return self._query("""
+            SELECT mesh_level, COUNT(*) AS runs, AVG(wall_time) AS mean_time, AVG(points) AS mean_points
+            FROM runs WHERE status = 'ok' AND finished >= ? AND mesh_level IS NOT NULL
+            GROUP BY mesh_level ORDER BY mesh_level""", (since or 0,))
+
+    def daily_load(self, days=30):
+        """Łączny czas obliczeń w kolejnych dniach (planowanie mocy obliczeniowej)"""
+        return self._query("""
+            SELECT date(finished, 'unixepoch', 'localtime') AS day, COUNT(*) AS runs, SUM(wall_time) AS total_time
+            FROM runs WHERE finished >= ? GROUP BY day ORDER BY day""", (time.time() - days * 86400,))
+
+    def overview(self, days=30, slowest=3):
+        """Podsumowanie do panelu: statystyki z ostatnich dni i najwolniejsze modele"""
+        since = time.time() - days * 86400
+        return {'days': days, 'summary': self.summary(since), 'slowest': self.slowest(slowest, since)}
+
+    def prune(self, older_than_days):
+        """Usuwa przebiegi starsze niż podana liczba dni - zwraca ich liczbę"""
+        connection = self.connect()
+        try:
+            with connection:
+                cursor = connection.execute("DELETE FROM runs WHERE finished < ?",
+                                            (time.time() - older_than_days * 86400,))
+            return cursor.rowcount
+        finally:
+            connection.close()
@@ -0,0 +1,230 @@
+import math
+import numpy as np
+
+# Analiza układu warstw wzdłuż krzywych Ti i Te (bez zależności od bpy, współrzędne w mm)
+
+MAX_PROBE_DEPTH = 5000.0
+GAP_TOLERANCE = 0.5
+THICKNESS_QUANTUM = 1.0
+
+class LayerProbe:
+    """Sonda układu warstw - krawędzie wszystkich polygonów w tablicach numpy
+
+    Jeden promień przecinany jest ze wszystkimi krawędziami jednocześnie (bez pętli po obiektach).
+    """
+
+    def __init__(self, polygons):
+        self.polygons = list(polygons)
+        starts = []
+        ends = []
+        owners = []
+        for index, poly_data in enumerate(self.polygons):
+            coords = poly_data['coords']
+            if len(coords) < 3:
+                continue
+            starts.extend(coords)
+            ends.extend(coords[1:] + coords[:1])
+            owners.extend([index] * len(coords))
+
+        self.starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+        self.ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+        self.owners = np.asarray(owners, dtype=np.int64)
+
+    def intervals(self, origin, direction, max_depth=MAX_PROBE_DEPTH):
+        """Przedziały (t0, t1, indeks polygonu) wnętrz polygonów na promieniu, posortowane po t0"""
+        if not len(self.owners):
+            return []
+
+        ox, oy = origin
+        dx, dy = direction
+        side_a = (self.starts[:, 0] - ox) * dy - (self.starts[:, 1] - oy) * dx
+        side_b = (self.ends[:, 0] - ox) * dy - (self.ends[:, 1] - oy) * dx
+
+        # Krawędzie przecinające prostą promienia (reguła parzystości)
+        crossing = (side_a > 0) != (side_b > 0)
+        if not crossing.any():
+            return []
+
+        side_a = side_a[crossing]
+        side_b = side_b[crossing]
+        starts = self.starts[crossing]
+        ends = self.ends[crossing]
+        owners = self.owners[crossing]
+
+        s = side_a / (side_a - side_b)
+        points = starts + (ends - starts) * s[:, None]
+        t = (points[:, 0] - ox) * dx + (points[:, 1] - oy) * dy
+
+        # Kolejne przecięcia tego samego polygonu tworzą pary wejście/wyjście
+        order = np.lexsort((t, owners))
+        owners = owners[order]
+        t = t[order]
+        group_starts = np.searchsorted(owners, owners, side='left')
+        rank = np.arange(len(owners)) - group_starts
+        entry = np.nonzero(rank % 2 == 0)[0]
+        entry = entry[(entry + 1 < len(owners))]
+        entry = entry[owners[entry] == owners[np.minimum(entry + 1, len(owners) - 1)]]
+
+        t0 = np.maximum(t[entry], 0.0)
+        t1 = np.minimum(t[entry + 1], max_depth)
+        valid = t1 - t0 > 1e-9
+        t0, t1, poly_index = t0[valid], t1[valid], owners[entry][valid]
+
+        by_start = np.argsort(t0, kind='stable')
+        return list(zip(t0[by_start].tolist(), t1[by_start].tolist(), poly_index[by_start].tolist()))
+
+    def probe(self, origin, direction, max_depth=MAX_PROBE_DEPTH, gap_tolerance=GAP_TOLERANCE):
+        """Uporządkowane warstwy od origin do pierwszej przerwy
+
+        Zwraca listę {'object', 'material', 'start', 'end', 'thickness'} [mm] - sąsiednie odcinki
+        tego samego obiektu i materiału są łączone.
+        """
+        layers = []
+        position = 0.0
+        for start, end, poly_index in self.intervals(origin, direction, max_depth):
+            if end <= position + 1e-9:
+                continue
+            if start > position + gap_tolerance:
+                break
+            poly_data = self.polygons[poly_index]
+            start = max(start, position)
+            key = (poly_data.get('object', ''), poly_data['material'])
+            if layers and (layers[-1]['object'], layers[-1]['material']) == key:
+                layers[-1]['end'] = end
+            else:
+                layers.append({'object': key[0], 'material': key[1], 'start': start, 'end': end})
+            position = end
+
+        for layer in layers:
+            layer['thickness'] = layer['end'] - layer['start']
+
+        return layers
+
+def probe_layer_stack(polygons, origin, direction, max_depth=MAX_PROBE_DEPTH, gap_tolerance=GAP_TOLERANCE):
+    """Warstwy przecięte przez promień od origin w kierunku direction (do pierwszej przerwy)
+
+    polygons: słowniki eksportu ('coords', 'material', 'object') lub gotowa LayerProbe.
+    """
+    probe = polygons if isinstance(polygons, LayerProbe) else LayerProbe(polygons)
+    return probe.probe(origin, direction, max_depth, gap_tolerance)
+
+def stack_signature(layers, quantum=THICKNESS_QUANTUM):
+    """Klucz układu warstw: obiekty, materiały i grubości zaokrąglone do kwantu"""
+    return tuple((layer['object'], layer['material'], int(round(layer['thickness'] / quantum)))
+                 for layer in layers)
+
+def segment_frame(start, end):
+    """Długość, kierunek jednostkowy i normalna odcinka"""
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    length = math.hypot(dx, dy)
+    if length == 0:
+        return 0.0, None, None
+    direction = (dx / length, dy / length)
+    return length, direction, (-direction[1], direction[0])
+
+def inward_normal(polygons, start, end, probe_offset=GAP_TOLERANCE):
+    """Normalna odcinka Ti skierowana w głąb przegrody (strona z dłuższym układem warstw)"""
+    length, direction, normal = segment_frame(start, end)
+    if not length:
+        return None
+
+    probe = polygons if isinstance(polygons, LayerProbe) else LayerProbe(polygons)
+    middle = ((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+    best = None
+    best_depth = 0.0
+    for candidate in (normal, (-normal[0], -normal[1])):
+        layers = probe.probe(middle, candidate)
+        if layers and layers[0]['start'] <= probe_offset:
+            depth = layers[-1]['end']
+            if depth > best_depth:
+                best, best_depth = candidate, depth
+
+    return best
+
+def flip_region(region):
+    """Region zmierzony od strony Te opisany od przeciwnej strony układu warstw
+
+    Początek i koniec regionu przesuwane są na koniec układu warstw, normalna odwracana,
+    a warstwy podawane w kolejności od tej strony - jak w regionach zmierzonych od Ti.
+    """
+    layers = region['layers']
+    depth = layers[-1]['end']
+    nx, ny = region['normal']
+    flipped = [dict(layer, start=depth - layer['end'], end=depth - layer['start']) for layer in reversed(layers)]
+    return dict(region,
+                start=(region['start'][0] + nx * depth, region['start'][1] + ny * depth),
+                end=(region['start'][0] + nx * depth + region['end'][0] - region['start'][0],
+                     region['start'][1] + ny * depth + region['end'][1] - region['start'][1]),
+                normal=(-nx, -ny),
+                layers=flipped,
+                signature=stack_signature(flipped))
+
+def find_uniform_regions(polygons, segments, step=10.0, min_length=100.0, side='Ti'):
+    """Odcinki krzywych Ti lub Te, wzdłuż których układ warstw jest stały na długości >= min_length
+
+    polygons: słowniki eksportu lub gotowa LayerProbe, segments: lista (klucz źródła, początek, koniec).
+    Zwraca regiony {'source', 'side', 'start', 'end', 'length', 'normal', 'layers', 'signature'}.
+    Regiony krzywych Te (side='Te') opisane są od drugiej strony układu warstw (flip_region),
+    więc ten sam układ znaleziony od strony Ti i Te ma ten sam podpis.
+    """
+    regions = []
+    probe = polygons if isinstance(polygons, LayerProbe) else LayerProbe(polygons)
+
+    for source, seg_start, seg_end in segments:
+        length, direction, _ = segment_frame(seg_start, seg_end)
+        if length < min_length:
+            continue
+        normal = inward_normal(probe, seg_start, seg_end)
+        if normal is None:
+            continue
+
+        samples = max(1, int(length // step))
+        sample_step = length / samples
+        run = None
+
+        def close_run(run):
+            run_length = run['to'] - run['from']
+            if run['signature'] and run_length >= min_length - 1e-6:
+                region = {
+                    'source': source,
+                    'side': side,
+                    'start': (seg_start[0] + direction[0] * run['from'], seg_start[1] + direction[1] * run['from']),
+                    'end': (seg_start[0] + direction[0] * run['to'], seg_start[1] + direction[1] * run['to']),
+                    'length': run_length,
+                    'normal': normal,
+                    'layers': run['layers'],
+                    'signature': run['signature']
+                }
+                regions.append(flip_region(region) if side == 'Te' else region)
+
+        for i in range(samples):
+            distance = (i + 0.5) * sample_step
+            origin = (seg_start[0] + direction[0] * distance, seg_start[1] + direction[1] * distance)
+            layers = probe.probe(origin, normal)
+            signature = stack_signature(layers)
+
+            if run and run['signature'] == signature:
+                run['to'] = (i + 1) * sample_step
+                continue
+            if run:
+                close_run(run)
+            run = {'signature': signature, 'layers': layers, 'from': i * sample_step, 'to': (i + 1) * sample_step}
+
+        if run:
+            close_run(run)
+
+    return regions
+
+def distinct_stacks(regions):
+    """Jeden region (najdłuższy) dla każdego odrębnego układu warstw, w kolejności wystąpienia"""
+    best = {}
+    order = []
+    for region in regions:
+        signature = region['signature']
+        if signature not in best:
+            order.append(signature)
+            best[signature] = region
+        elif region['length'] > best[signature]['length']:
+            best[signature] = region
+    return [best[signature] for signature in order]
@@ -0,0 +1,211 @@
+import os
+import re
+import time
+import threading
+from collections import deque
+
+# Postęp obliczeń THERM odczytywany na bieżąco z wyjścia solvera (bez zależności od bpy)
+#
+# Wiersze stdout/stderr trafiają do rotowanego dziennika zadania i do modelu
+# postępu, który rozpoznaje etapy (siatka, iteracje, zapis wyników) i wykrywa
+# przestoje - brak wyjścia przez zadany czas.
+
+LOG_DIRNAME = ".therm_logs"
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+TAIL_LINES = 200
+
+PHASE_STARTING = "uruchamianie"
+PHASE_MESHING = "siatka"
+PHASE_SOLVING = "obliczenia"
+PHASE_SAVING = "zapis wyników"
+PHASE_DONE = "zakończono"
+
+# Znaczniki w wyjściu THERM (wielkość liter bez znaczenia)
+ITERATION_PATTERN = re.compile(r'iteration\s*[:#]?\s*(\d+)(?:\s*(?:of|/)\s*(\d+))?', re.IGNORECASE)
+ERROR_PATTERN = re.compile(r'error(?:\s+(?:estimate|norm|energy))?\s*[:=]?\s*([\d.]+)\s*%', re.IGNORECASE)
+NODES_PATTERN = re.compile(r'(\d+)\s+(?:mesh\s+)?nodes', re.IGNORECASE)
+ELEMENTS_PATTERN = re.compile(r'(\d+)\s+(?:mesh\s+)?elements', re.IGNORECASE)
+PHASE_PATTERNS = [
+    (re.compile(r'\bmesh(?:ing)?\b', re.IGNORECASE), PHASE_MESHING),
+    (re.compile(r'\bsolv(?:e|ing|er)\b|\bcalculat', re.IGNORECASE), PHASE_SOLVING),
+    (re.compile(r'\bsav(?:e|ing)\b|\bwrit(?:e|ing)\b|\bresults?\b', re.IGNORECASE), PHASE_SAVING),
+    (re.compile(r'\b(?:done|finished|complete[d]?)\b', re.IGNORECASE), PHASE_DONE),
+]
+
+PHASE_ORDER = [PHASE_STARTING, PHASE_MESHING, PHASE_SOLVING, PHASE_SAVING, PHASE_DONE]
+
+def log_path_for(thmx_filepath):
+    """Dziennik zadania w folderze .therm_logs projektu"""
+    directory = os.path.dirname(os.path.abspath(thmx_filepath))
+    basename = os.path.splitext(os.path.basename(thmx_filepath))[0]
+    return os.path.join(directory, LOG_DIRNAME, f"{basename}.log")
+
+class RotatingLog:
+    """Dziennik wierszy z rotacją po przekroczeniu rozmiaru (bezpieczny dla wielu wątków)"""
+
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write_line(self, stream, line):
+        entry = f"{time.strftime('%H:%M:%S')} [{stream}] {line}\n"
+        with self._lock:
+            if self._file is None:
+                return
+            if self._file.tell() + len(entry) > self.max_bytes:
+                self._rotate()
+            self._file.write(entry)
+            self._file.flush()
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, 'w', encoding='utf-8')
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+class SolverProgress:
+    """Model postępu zadania: etap, iteracja, rozmiar siatki, błąd i czas ostatniego wyjścia"""
+
+    def __init__(self, max_iterations=None):
+        self.phase = PHASE_STARTING
+        self.iteration = None
+        self.max_iterations = max_iterations
+        self.mesh_nodes = None
+        self.mesh_elements = None
+        self.error_percent = None
+        self.lines = 0
+        self.last_output = time.time()
+        self._lock = threading.Lock()
+
+    def _advance(self, phase):
+        # Etap tylko rośnie - np. "results" w nagłówku nie cofa obliczeń
+        if PHASE_ORDER.index(phase) > PHASE_ORDER.index(self.phase):
+            self.phase = phase
+
+    def feed(self, line):
+        """Aktualizuje postęp na podstawie wiersza wyjścia THERM"""
+        with self._lock:
+            self.lines += 1
+            self.last_output = time.time()
+
+            match = ITERATION_PATTERN.search(line)
+            if match:
+                self.iteration = int(match.group(1))
+                if match.group(2):
+                    self.max_iterations = int(match.group(2))
+                self._advance(PHASE_SOLVING)
+
+            match = ERROR_PATTERN.search(line)
+            if match:
+                self.error_percent = float(match.group(1))
+
+            match = NODES_PATTERN.search(line)
+            if match:
+                self.mesh_nodes = int(match.group(1))
+            match = ELEMENTS_PATTERN.search(line)
+            if match:
+                self.mesh_elements = int(match.group(1))
+
+            for pattern, phase in PHASE_PATTERNS:
+                if pattern.search(line):
+                    self._advance(phase)
+
+    def mark_done(self):
+        with self._lock:
+            self.phase = PHASE_DONE
+
+    def silent_for(self):
+        return time.time() - self.last_output
+
+    def fraction(self):
+        """Szacowany ułamek postępu (None gdy nieznany)"""
+        if self.phase == PHASE_DONE:
+            return 1.0
+        if self.iteration and self.max_iterations:
+            return min(self.iteration / self.max_iterations, 0.99)
+        return None
+
+    def describe(self):
+        parts = [self.phase]
+        if self.iteration:
+            parts.append(f"iteracja {self.iteration}" + (f"/{self.max_iterations}" if self.max_iterations else ""))
+        if self.error_percent is not None:
+            parts.append(f"błąd {self.error_percent:.2f}%")
+        if self.mesh_elements:
+            parts.append(f"{self.mesh_elements} elementów")
+        elif self.mesh_nodes:
+            parts.append(f"{self.mesh_nodes} węzłów")
+        return ", ".join(parts)
+
+    def to_dict(self):
+        return {
+            'phase': self.phase,
+            'iteration': self.iteration,
+            'max_iterations': self.max_iterations,
+            'mesh_nodes': self.mesh_nodes,
+            'mesh_elements': self.mesh_elements,
+            'error_percent': self.error_percent,
+            'lines': self.lines,
+            'last_output': self.last_output,
+            'fraction': self.fraction()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        progress = cls(data.get('max_iterations'))
+        for key in ('phase', 'iteration', 'mesh_nodes', 'mesh_elements', 'error_percent', 'lines', 'last_output'):
+            if data.get(key) is not None:
+                setattr(progress, key, data[key])
+        return progress
+
+class OutputPump:
+    """Wątki czytające stdout i stderr wiersz po wierszu do dziennika, postępu i ogona w pamięci"""
+
+    def __init__(self, process, progress, log=None, tail_lines=TAIL_LINES):
+        self.progress = progress
+        self.log = log
+        self.tails = {'stdout': deque(maxlen=tail_lines), 'stderr': deque(maxlen=tail_lines)}
+        self.threads = []
+        for name, stream in (('stdout', process.stdout), ('stderr', process.stderr)):
+            if stream is None:
+                continue
+            thread = threading.Thread(target=self._pump, args=(name, stream), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _pump(self, name, stream):
+        try:
+            for raw in iter(stream.readline, ''):
+                line = raw.rstrip('\r\n')
+                self.tails[name].append(line)
+                self.progress.feed(line)
+                if self.log is not None:
+                    self.log.write_line(name, line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            stream.close()
+
+    def join(self, timeout=5.0):
+        for thread in self.threads:
+            thread.join(timeout)
+        if self.log is not None:
+            self.log.close()
+
+    def text(self, name):
+        return "\n".join(self.tails[name])
@@ -0,0 +1,358 @@
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+from contextlib import contextmanager
+
+try:
+    from . import therm_solver, therm_backends, therm_timeout, therm_history, therm_filelock
+except ImportError:
+    import therm_solver
+    import therm_backends
+    import therm_timeout
+    import therm_history
+    import therm_filelock
+
+# Trwała kolejka obliczeń THERM projektu (bez zależności od bpy)
+#
+# Stan kolejki leży w pliku JSON obok plików .thmx. Zadania wykonuje odłączony
+# proces roboczy (python therm_queue.py --worker <folder>), więc Blender można
+# zamknąć w trakcie obliczeń - po ponownym otwarciu panel czyta stan z pliku.
+
+QUEUE_FILENAME = "therm_queue.json"
+LOCK_TIMEOUT = 10.0
+STALE_LOCK_AGE = 30.0
+HEARTBEAT_INTERVAL = 2.0
+WORKER_STALE_AGE = 15.0
+POLL_INTERVAL = 0.5
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+class QueueLockError(RuntimeError):
+    pass
+
+class JobQueue:
+    """Kolejka zadań z priorytetami zapisywana w pliku JSON (dostęp chroniony plikiem blokady)"""
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        self.path = os.path.join(self.directory, QUEUE_FILENAME)
+        self.lock_path = self.path + ".lock"
+
+    @classmethod
+    def for_directory(cls, directory):
+        return cls(directory)
+
+    @contextmanager
+    def locked(self, timeout=LOCK_TIMEOUT):
+        """Wyłączny dostęp do pliku kolejki (Blender i proces roboczy)
+
+        Blokada jest odświeżana w tle, dopóki jest trzymana - porzucona (np. po zabitym
+        procesie) jest odbierana po STALE_LOCK_AGE.
+        """
+        # Kolejkę obsługują procesy tego komputera - wiek blokady można ocenić z czasu modyfikacji
+        lock = therm_filelock.LockFile(self.lock_path, STALE_LOCK_AGE, trust_mtime=True)
+        deadline = time.time() + timeout
+        while not lock.acquire():
+            if time.time() > deadline:
+                raise QueueLockError(f"Kolejka {self.path} jest zablokowana")
+            time.sleep(0.05)
+        try:
+            with lock.kept_alive():
+                yield
+        finally:
+            lock.release()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault('jobs', [])
+        state.setdefault('worker', {})
+        return state
+
+    def _save(self, state):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=1)
+        os.replace(temp_path, self.path)
+
+    @contextmanager
+    def transaction(self):
+        """Odczyt, modyfikacja i atomowy zapis stanu pod blokadą"""
+        with self.locked():
+            state = self._load()
+            yield state
+            self._save(state)
+
+    def snapshot(self):
+        """Stan kolejki do wyświetlenia (bez blokady - zapis jest atomowy)"""
+        return self._load()
+
+    def jobs(self):
+        return self.snapshot()['jobs']
+
+    def _find(self, state, job_id):
+        for job in state['jobs']:
+            if job['id'] == job_id:
+                return job
+        return None
+
+    def enqueue(self, thmx_filepath, priority=0, timeout=therm_solver.DEFAULT_TIMEOUT, retries=0, adaptive=False,
+                safety_factor=therm_timeout.DEFAULT_SAFETY_FACTOR):
+        """Dodaje plik .thmx do kolejki - zwraca id zadania (istniejącego, jeśli plik już czeka)
+
+        adaptive=True: limit czasu przewidywany przez proces roboczy, timeout tylko gdy brak historii.
+        """
+        thmx_filepath = os.path.abspath(thmx_filepath)
+        with self.transaction() as state:
+            for job in state['jobs']:
+                if job['thmx'] == thmx_filepath and job['state'] in ACTIVE_STATES:
+                    job['priority'] = max(job['priority'], priority)
+                    return job['id']
+
+            job = {
+                'id': uuid.uuid4().hex[:8],
+                'thmx': thmx_filepath,
+                'priority': priority,
+                'state': QUEUED,
+                'timeout': timeout,
+                'adaptive': adaptive,
+                'safety_factor': safety_factor,
+                'retries': retries,
+                'attempts': 0,
+                'enqueued': time.time(),
+                'started': None,
+                'finished': None,
+                'elapsed': None,
+                'error': '',
+                'cancel_requested': False
+            }
+            state['jobs'].append(job)
+            return job['id']
+
+    def dequeue(self, job_id):
+        """Usuwa zadanie, które nie jest w trakcie obliczeń"""
+        with self.transaction() as state:
+            job = self._find(state, job_id)
+            if job is None or job['state'] == RUNNING:
+                return False
+            state['jobs'].remove(job)
+            return True
+
+    def reprioritize(self, job_id, priority):
+        with self.transaction() as state:
+            job = self._find(state, job_id)
+            if job is None or job['state'] != QUEUED:
+                return False
+            job['priority'] = priority
+            return True
+
+    def cancel(self, job_id):
+        """Anuluje oczekujące zadanie, a dla trwającego zleca przerwanie procesowi roboczemu"""
+        with self.transaction() as state:
+            job = self._find(state, job_id)
+            if job is None:
+                return False
+            if job['state'] == QUEUED:
+                job['state'] = CANCELLED
+                job['finished'] = time.time()
+                return True
+            if job['state'] == RUNNING:
+                job['cancel_requested'] = True
+                return True
+            return False
+
+    def retry(self, job_id):
+        """Ponownie kolejkuje zakończone zadanie"""
+        with self.transaction() as state:
+            job = self._find(state, job_id)
+            if job is None or job['state'] not in FINISHED_STATES:
+                return False
+            job.update(state=QUEUED, attempts=0, started=None, finished=None, elapsed=None,
+                       error='', cancel_requested=False, enqueued=time.time())
+            return True
+
+    def clear_finished(self):
+        with self.transaction() as state:
+            before = len(state['jobs'])
+            state['jobs'] = [job for job in state['jobs'] if job['state'] not in FINISHED_STATES]
+            return before - len(state['jobs'])
+
+    def claim_next(self, state):
+        """Najwyższy priorytet, potem najstarsze - oznacza zadanie jako trwające"""
+        queued = [job for job in state['jobs'] if job['state'] == QUEUED]
+        if not queued:
+            return None
+        job = min(queued, key=lambda job: (-job['priority'], job['enqueued']))
+        job['state'] = RUNNING
+        job['attempts'] += 1
+        job['started'] = time.time()
+        job['error'] = ''
+        return job
+
+    def complete(self, state, job_id, success, elapsed, error='', cancelled=False):
+        """Zapisuje wynik próby - nieudane zadania wracają do kolejki do wyczerpania ponowień"""
+        job = self._find(state, job_id)
+        if job is None:
+            return None
+        job['elapsed'] = elapsed
+        job['error'] = error
+        job['cancel_requested'] = False
+        if cancelled:
+            job['state'] = CANCELLED
+        elif success:
+            job['state'] = DONE
+        elif job['attempts'] <= job['retries']:
+            job['state'] = QUEUED
+        else:
+            job['state'] = FAILED
+        job['finished'] = time.time() if job['state'] != QUEUED else None
+        return job
+
+    def worker_alive(self, state=None):
+        worker = (state or self.snapshot())['worker']
+        return bool(worker.get('heartbeat')) and time.time() - worker['heartbeat'] < WORKER_STALE_AGE
+
+    def has_pending(self, state=None):
+        return any(job['state'] in ACTIVE_STATES for job in (state or self.snapshot())['jobs'])
+
+def run_worker(directory, therm_exe, max_workers=1, spool_dir=None, stall_timeout=None):
+    """Pętla procesu roboczego - do max_workers procesów THERM naraz, koniec gdy kolejka jest pusta
+
+    Z spool_dir zadania trafiają do folderu wymiany i liczą je procesy robocze innych komputerów.
+    """
+    queue = JobQueue.for_directory(directory)
+    if spool_dir:
+        backend = therm_backends.SpoolBackend(spool_dir)
+    else:
+        backend = therm_backends.LocalBackend(therm_exe, stall_timeout)
+    timeout_policy = therm_timeout.TimeoutPolicy()
+    history = therm_history.RunHistory()
+    max_workers = max(1, max_workers)
+    running = {}
+    last_heartbeat = 0.0
+
+    with queue.transaction() as state:
+        if queue.worker_alive(state) and state['worker'].get('pid') != os.getpid():
+            print("Proces roboczy kolejki już działa")
+            return
+        # Zadania po przerwanym procesie roboczym wracają do kolejki
+        for job in state['jobs']:
+            if job['state'] == RUNNING:
+                job['state'] = QUEUED
+        state['worker'] = {'pid': os.getpid(), 'heartbeat': time.time(), 'max_workers': max_workers}
+
+    while True:
+        # Odpytywanie i kończenie zadań (przeniesienie wyników, historia) bez blokady kolejki
+        cancel_requested = {job['id'] for job in queue.snapshot()['jobs'] if job.get('cancel_requested')}
+        progress = {}
+        finished = []
+        for job_id, solver in list(running.items()):
+            if job_id in cancel_requested:
+                solver.cancel()
+            if solver.poll() is None and solver.running:
+                progress[job_id] = solver.progress.to_dict()
+                continue
+            del running[job_id]
+            error = '' if solver.succeeded() else (solver.stderr.strip()[-500:] or f"kod wyjścia {solver.returncode}")
+            if solver.timed_out:
+                error = f"przekroczono limit {solver.timeout:.0f} s"
+            elif solver.stalled:
+                error = "brak wyjścia THERM - przerwano zawieszone obliczenia"
+            elif solver.input_changed:
+                error = "plik .thmx zmienił się w trakcie obliczeń"
+            try:
+                timeout_policy.record(solver)
+            except Exception as e:
+                print(f"⚠️  Nie można zapisać czasu obliczeń: {e}")
+            try:
+                history.record_handle(solver)
+            except Exception as e:
+                print(f"⚠️  Nie można zapisać historii obliczeń: {e}")
+            finished.append((job_id, solver, error))
+
+        # Pod blokadą tylko odczyt, zapis wyników prób i przejęcie kolejnych zadań
+        claimed = []
+        with queue.transaction() as state:
+            now = time.time()
+            for job_id, solver_progress in progress.items():
+                job = queue._find(state, job_id)
+                if job is not None:
+                    job['progress'] = solver_progress
+            for job_id, solver, error in finished:
+                job = queue.complete(state, job_id, solver.succeeded(), solver.elapsed, error, solver.cancelled)
+                if job:
+                    print(f"[{job['state']}] {os.path.basename(job['thmx'])} ({solver.elapsed:.1f} s)")
+
+            while len(running) + len(claimed) < max_workers:
+                job = queue.claim_next(state)
+                if job is None:
+                    break
+                claimed.append(dict(job))
+
+            if now - last_heartbeat >= HEARTBEAT_INTERVAL or not running:
+                state['worker']['heartbeat'] = now
+                last_heartbeat = now
+
+            idle = not running and not claimed and not queue.has_pending(state)
+            if idle:
+                state['worker'] = {}
+        if idle:
+            break
+
+        # Uruchamianie (kopia pliku, przewidywanie limitu czasu) także bez blokady
+        failed = []
+        for job in claimed:
+            try:
+                timeout = job['timeout']
+                if job.get('adaptive'):
+                    timeout = timeout_policy.timeout_for(job['thmx'], job['timeout'], job.get('safety_factor'))
+                running[job['id']] = backend.submit(job['thmx'], timeout)
+            except Exception as e:
+                failed.append((job['id'], str(e)))
+        if failed:
+            with queue.transaction() as state:
+                for job_id, error in failed:
+                    queue.complete(state, job_id, False, 0.0, error)
+
+        time.sleep(POLL_INTERVAL)
+
+def start_worker(directory, therm_exe, max_workers=1, spool_dir=None, stall_timeout=None, python_executable=None):
+    """Uruchamia odłączony proces roboczy (działa dalej po zamknięciu Blendera)"""
+    queue = JobQueue.for_directory(directory)
+    if queue.worker_alive():
+        return None
+
+    cmd = [python_executable or sys.executable, os.path.abspath(__file__),
+           '--worker', queue.directory, '--exe', therm_exe or '', '--max-workers', str(max(1, max_workers))]
+    if spool_dir:
+        cmd += ['--spool', os.path.abspath(spool_dir)]
+    if stall_timeout:
+        cmd += ['--stall-timeout', str(stall_timeout)]
+
+    return therm_solver.spawn_detached(cmd, os.path.join(queue.directory, "therm_queue.log"))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Proces roboczy kolejki obliczeń THERM")
+    parser.add_argument('--worker', required=True, help="Folder projektu z plikiem kolejki")
+    parser.add_argument('--exe', default='', help="Ścieżka do THERM7.exe")
+    parser.add_argument('--max-workers', type=int, default=1)
+    parser.add_argument('--spool', default=None, help="Folder wymiany zamiast lokalnego THERM")
+    parser.add_argument('--stall-timeout', type=float, default=None)
+    args = parser.parse_args(argv)
+    run_worker(args.worker, args.exe, args.max_workers, args.spool, args.stall_timeout)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+
+try:
+    from . import therm_results, therm_solver
+except ImportError:
+    import therm_results
+    import therm_solver
+
+# Ustawienia siatki THERM (MeshControl) i zagęszczanie siatki do zbieżności (bez zależności od bpy)
+#
+# Zagęszczanie liczy model kolejno na coraz wyższych poziomach MeshLevel, zaczynając
+# od zgrubnej siatki, i kończy, gdy U-factors dwóch kolejnych poziomów różnią się
+# mniej niż zadana tolerancja. Pliki każdego poziomu zostają w folderze <nazwa>_mesh
+# razem z historią zbieżności, a wyniki ostatniego poziomu trafiają do pliku projektu.
+
+DEFAULT_MESH_LEVEL = 8
+DEFAULT_ERROR_LIMIT = 10.0
+DEFAULT_MAX_ITERATIONS = 10
+
+REFINE_DIR_SUFFIX = "_mesh"
+HISTORY_FILENAME = "refinement.json"
+
+def mesh_control_attributes(mesh_level=DEFAULT_MESH_LEVEL, error_limit=DEFAULT_ERROR_LIMIT,
+                            max_iterations=DEFAULT_MAX_ITERATIONS):
+    """Atrybuty elementu MeshControl w kolejności zapisu THERM"""
+    return [
+        ("MeshLevel", str(int(mesh_level))),
+        ("ErrorCheckFlag", "1"),
+        ("ErrorLimit", f"{float(error_limit):.2f}"),
+        ("MaxIterations", str(int(max_iterations))),
+        ("CMAflag", "0"),
+    ]
+
+def apply_mesh_control(elem, settings=None):
+    """Ustawia atrybuty MeshControl ze słownika (mesh_level, error_limit, max_iterations)"""
+    for name, value in mesh_control_attributes(**(settings or {})):
+        elem.set(name, value)
+
+def write_mesh_level(source_thmx, target_thmx, mesh_level):
+    """Kopia danych wejściowych pliku .thmx z innym MeshLevel - wyniki poprzednich obliczeń są pomijane"""
+    if not therm_results.write_model_input(source_thmx, target_thmx, {'MeshLevel': int(mesh_level)}):
+        os.remove(target_thmx)
+        raise ValueError(f"Brak MeshControl w pliku {source_thmx}")
+
+def max_relative_change(previous, current):
+    """Największa względna zmiana U-factors wspólnych tagów [%] (None gdy brak wspólnych wartości)"""
+    changes = []
+    for tag, value in current.items():
+        before = previous.get(tag)
+        if isinstance(value, float) and isinstance(before, float) and before:
+            changes.append(abs(value - before) / abs(before) * 100.0)
+    return max(changes) if changes else None
+
+class MeshRefinement:
+    """Kolejne poziomy MeshLevel dla jednego pliku .thmx
+
+    next_input() zwraca plik kolejnego poziomu do policzenia (None po zakończeniu),
+    record() zapisuje wynik poziomu, finalize() przenosi wyniki do pliku projektu.
+    """
+
+    def __init__(self, thmx_filepath, start_level=5, max_level=DEFAULT_MESH_LEVEL, tolerance=1.0, step=1):
+        self.thmx_filepath = os.path.abspath(thmx_filepath)
+        self.start_level = min(start_level, max_level)
+        self.max_level = max_level
+        self.tolerance = tolerance
+        self.step = max(1, step)
+        basename = os.path.splitext(os.path.basename(self.thmx_filepath))[0]
+        self.basename = basename
+        self.directory = os.path.join(os.path.dirname(self.thmx_filepath), f"{basename}{REFINE_DIR_SUFFIX}")
+        self.history = []
+        self.level = None
+        self.converged = False
+        self.failed = False
+        self._input_stamp = therm_solver.file_stamp(self.thmx_filepath)
+
+    @property
+    def finished(self):
+        if self.converged or self.failed:
+            return True
+        return self.level is not None and self.level + self.step > self.max_level
+
+    @property
+    def final_entry(self):
+        """Ostatni poprawnie policzony poziom"""
+        for entry in reversed(self.history):
+            if entry['success']:
+                return entry
+        return None
+
+    def level_path(self, level):
+        return os.path.join(self.directory, f"{self.basename}_L{level:02d}.thmx")
+
+    def next_input(self):
+        """Przygotowuje plik kolejnego poziomu siatki - None, gdy zagęszczanie jest zakończone"""
+        if self.finished:
+            return None
+        self.level = self.start_level if self.level is None else self.level + self.step
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.level_path(self.level)
+        for stale in therm_solver.expected_output_files(path):
+            if os.path.exists(stale):
+                os.remove(stale)
+        write_mesh_level(self.thmx_filepath, path, self.level)
+        return path
+
+    def record(self, level_thmx, success, elapsed):
+        """Zapisuje wynik poziomu i sprawdza zbieżność względem poprzedniego"""
+        ufactors = {}
+        if success:
+            try:
+                ufactors = therm_results.read_ufactors(level_thmx)
+            except Exception as e:
+                print(f"⚠️  Nie można odczytać U-factors poziomu {self.level}: {e}")
+
+        previous = self.final_entry
+        change = max_relative_change(previous['ufactors'], ufactors) if previous and ufactors else None
+        entry = {
+            'level': self.level,
+            'thmx': level_thmx,
+            'success': bool(success),
+            'elapsed': elapsed,
+            'ufactors': ufactors,
+            'change': change
+        }
+        self.history.append(entry)
+
+        if not success:
+            # Bez wyniku tego poziomu wyższe też się nie policzą (np. limit czasu) - zostaje poprzedni
+            self.failed = True
+        elif change is not None and change < self.tolerance:
+            self.converged = True
+
+        change_text = f", zmiana {change:.3f}%" if change is not None else ""
+        print(f"🔬 MeshLevel {self.level}: {'OK' if success else 'błąd'} ({elapsed:.1f} s{change_text})")
+        self.save_history()
+        return entry
+
+    def save_history(self):
+        history = {
+            'thmx': self.thmx_filepath,
+            'tolerance': self.tolerance,
+            'converged': self.converged,
+            'updated': time.time(),
+            'levels': self.history
+        }
+        try:
+            temp_path = os.path.join(self.directory, f"{HISTORY_FILENAME}.tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(history, f, indent=1)
+            os.replace(temp_path, os.path.join(self.directory, HISTORY_FILENAME))
+        except OSError as e:
+            print(f"⚠️  Nie można zapisać historii zagęszczania: {e}")
+
+    def finalize(self):
+        """Kopiuje wyniki ostatniego policzonego poziomu do pliku projektu - zwraca ten wpis lub None"""
+        entry = self.final_entry
+        if entry is None:
+            return None
+        promoted = therm_solver.promote_results(entry['thmx'], self.thmx_filepath, self._input_stamp, copy=True)
+        if promoted is None:
+            print(f"⚠️  {os.path.basename(self.thmx_filepath)} zmienił się w trakcie zagęszczania - wyniki pozostają w {self.directory}")
+            return None
+        return entry
+
+    def summary(self):
+        """Opis zbieżności do raportu operatora"""
+        entry = self.final_entry
+        if entry is None:
+            return "brak wyników"
+        state = "zbieżne" if self.converged else ("przerwane" if self.failed else "osiągnięto maksymalny MeshLevel")
+        return f"MeshLevel {entry['level']} ({state}, {len(self.history)} poziomów)"
+
+def load_history(thmx_filepath):
+    """Historia zbieżności zapisana przy ostatnim zagęszczaniu (None gdy brak)"""
+    directory = os.path.dirname(os.path.abspath(thmx_filepath))
+    basename = os.path.splitext(os.path.basename(thmx_filepath))[0]
+    try:
+        with open(os.path.join(directory, f"{basename}{REFINE_DIR_SUFFIX}", HISTORY_FILENAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
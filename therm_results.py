@@ -0,0 +1,273 @@
+import re
+import xml.etree.ElementTree as ET
+
+# Strumieniowy odczyt wyników U-factors z plików .thmx (bez zależności od bpy)
+#
+# Po obliczeniach plik zawiera tablice MeshInput i wyników węzłowych o rozmiarze
+# setek MB - odczyt przez iterparse zwalnia elementy na bieżąco i kończy się
+# zaraz po ostatnim bloku U-factors.
+
+TOTAL_LENGTH = 'Total length'
+
+# Sekcje zapisywane przez THERM po obliczeniach - nie należą do danych wejściowych modelu
+RESULT_SECTIONS = ('MeshInput', 'Results')
+COPY_CHUNK = 1024 * 1024
+TAIL_CHARS = 256
+_INPUT_TAG_PATTERN = re.compile(r'<(MeshInput|Results|MeshControl)(?=[\s/>])')
+
+def _local_tag(elem):
+    return elem.tag.rsplit('}', 1)[-1]
+
+def _value(elem):
+    """Wartość z atrybutu 'value' lub z treści elementu (None dla braku i "NA")"""
+    if elem is None:
+        return None
+    raw = elem.get('value')
+    if raw is None and elem.text:
+        raw = elem.text.strip()
+    if not raw or raw == 'NA':
+        return None
+    try:
+        return float(raw)
+    except ValueError:
+        return raw
+
+def _text(elem):
+    if elem is None or not elem.text:
+        return ''
+    return elem.text.strip()
+
+def iter_ufactor_blocks(thmx_filepath):
+    """Zwraca kolejno kompletne elementy U-factors (zwalniane po przejściu do następnego)
+
+    Pamięć stała niezależnie od rozmiaru pliku, parsowanie kończy się po bloku z U-factors.
+    """
+    stack = []
+    ufactors_elem = None
+    stop_depth = None
+
+    context = ET.iterparse(thmx_filepath, events=('start', 'end'))
+    try:
+        for event, elem in context:
+            if event == 'start':
+                stack.append(elem)
+                if ufactors_elem is None and _local_tag(elem) == 'U-factors':
+                    ufactors_elem = elem
+                    if stop_depth is None:
+                        # Bloki U-factors leżą w Results (wszystkie przypadki) - po jego końcu parsowanie zbędne
+                        results_depths = [i for i, parent in enumerate(stack) if _local_tag(parent) == 'Results']
+                        stop_depth = results_depths[0] if results_depths else len(stack) - 2
+                continue
+
+            stack.pop()
+            if elem is ufactors_elem:
+                yield elem
+                ufactors_elem = None
+            elif ufactors_elem is not None:
+                # Zawartość bloku zostaje do jego końca
+                continue
+
+            # Element przetworzony - zwolnij go i odłącz od rodzica (jest jego ostatnim dzieckiem)
+            elem.clear()
+            if stack and len(stack[-1]) and stack[-1][-1] is elem:
+                del stack[-1][-1]
+
+            # Koniec kontenera bloków U-factors - reszta pliku nie jest potrzebna
+            if stop_depth is not None and len(stack) == stop_depth:
+                break
+    finally:
+        del context
+
+def iter_ufactor_projections(thmx_filepath):
+    """Zwraca kolejno projekcje U-factors: tag, delta_t, length_type, length, ufactor"""
+    for block in iter_ufactor_blocks(thmx_filepath):
+        fields = set(block)
+        tag = ''
+        delta_t = None
+        for elem in block.iter():
+            name = _local_tag(elem)
+            if name == 'Tag' and elem in fields:
+                tag = _text(elem)
+            elif name == 'DeltaT' and elem in fields:
+                delta_t = _value(elem)
+            elif name == 'Projection':
+                projection = {_local_tag(child): child for child in elem}
+                yield {
+                    'tag': tag,
+                    'delta_t': delta_t,
+                    'length_type': _text(projection.get('Length-type')),
+                    'length': _value(projection.get('Length')),
+                    'ufactor': _value(projection.get('U-factor'))
+                }
+
+def read_ufactors(thmx_filepath, length_type=TOTAL_LENGTH):
+    """Zwraca {tag: U-factor} dla projekcji danego typu długości (pomija wartości "NA")"""
+    ufactors = {}
+    for projection in iter_ufactor_projections(thmx_filepath):
+        if projection['tag'] in ufactors or projection['ufactor'] is None:
+            continue
+        if length_type in projection['length_type']:
+            ufactors[projection['tag']] = projection['ufactor']
+    return ufactors
+
+def find_projection(thmx_filepath, tag_name, length_type=TOTAL_LENGTH):
+    """Zwraca pierwszą projekcję danego tagu i typu długości z wartością U-factor"""
+    for projection in iter_ufactor_projections(thmx_filepath):
+        if (projection['tag'] == tag_name and projection['ufactor'] is not None
+                and length_type in projection['length_type']):
+            return projection
+    return None
+
+def read_mesh_control(thmx_filepath):
+    """Atrybuty MeshControl (MeshLevel, ErrorLimit, MaxIterations...) - parsowanie kończy się na tym elemencie"""
+    context = ET.iterparse(thmx_filepath, events=('start',))
+    try:
+        for _, elem in context:
+            if _local_tag(elem) == 'MeshControl':
+                return dict(elem.attrib)
+    finally:
+        del context
+    return {}
+
+def read_model_stats(thmx_filepath):
+    """Rozmiar modelu: wielokąty, punkty, krawędzie i warunki brzegowe oraz MeshControl
+
+    Parsowanie kończy się przed wynikami (MeshInput, Results), więc czas nie zależy od tego,
+    czy model był już liczony.
+    """
+    stats = {'polygons': 0, 'points': 0, 'bc_polygons': 0, 'boundary_conditions': 0, 'mesh_control': {}}
+    stack = []
+    context = ET.iterparse(thmx_filepath, events=('start', 'end'))
+    try:
+        for event, elem in context:
+            name = _local_tag(elem)
+            if event == 'start':
+                if name in ('MeshInput', 'Results'):
+                    break
+                if name == 'MeshControl':
+                    stats['mesh_control'] = dict(elem.attrib)
+                elif name == 'Polygon':
+                    stats['polygons'] += 1
+                elif name == 'BCPolygon':
+                    stats['bc_polygons'] += 1
+                elif name == 'BoundaryCondition':
+                    stats['boundary_conditions'] += 1
+                elif name == 'Point' and stack and stack[-1] == 'Polygon':
+                    stats['points'] += 1
+                stack.append(name)
+                continue
+
+            stack.pop()
+            # Liczniki wystarczą - elementy zwalniane na bieżąco
+            if name in ('Polygon', 'BCPolygon', 'BoundaryCondition', 'Material'):
+                elem.clear()
+    finally:
+        del context
+    return stats
+
+def read_model_input(thmx_filepath):
+    """Element główny pliku .thmx z samymi danymi wejściowymi - parsowanie kończy się przed wynikami"""
+    stack = []
+    root = None
+    context = ET.iterparse(thmx_filepath, events=('start', 'end'))
+    try:
+        for event, elem in context:
+            if event == 'end':
+                stack.pop()
+                continue
+            if root is None:
+                root = elem
+            if _local_tag(elem) in RESULT_SECTIONS:
+                # Parser buduje drzewo fragmentami - odetnij sekcję wyników i wszystko za nią
+                path = stack + [elem]
+                for depth, parent in enumerate(stack):
+                    children = list(parent)
+                    index = children.index(path[depth + 1])
+                    keep = index if parent is stack[-1] else index + 1
+                    for child in children[keep:]:
+                        parent.remove(child)
+                break
+            stack.append(elem)
+    finally:
+        del context
+    return root
+
+def _set_attribute(tag_text, name, value):
+    """Ustawia atrybut w tekście znacznika otwierającego (dopisuje go, gdy brak)"""
+    pattern = re.compile(rf'(\s{name}\s*=\s*)(["\'])[^"\']*\2')
+    if pattern.search(tag_text):
+        return pattern.sub(lambda match: f'{match.group(1)}"{value}"', tag_text, count=1)
+    end = len(tag_text) - (2 if tag_text.endswith('/>') else 1)
+    return f'{tag_text[:end].rstrip()} {name}="{value}" {tag_text[end:]}'
+
+def write_model_input(source_thmx, target_thmx, mesh_control=None, append=None):
+    """Kopia pliku .thmx bez wyników (MeshInput, Results), opcjonalnie ze zmienionymi atrybutami MeshControl
+
+    Plik kopiowany jest strumieniowo fragmentami, niezależnie od podziału na wiersze.
+    append: tekst XML wstawiany przed znacznikiem zamykającym element główny.
+    Zwraca True, jeśli plik zawierał element MeshControl.
+    """
+    found_mesh_control = False
+    with open(source_thmx, 'r', encoding='utf-8') as source, open(target_thmx, 'w', encoding='utf-8') as target:
+        buffer = ''
+        eof = False
+        skip_until = None
+
+        def read_more():
+            nonlocal buffer, eof
+            chunk = source.read(COPY_CHUNK)
+            if chunk:
+                buffer += chunk
+            else:
+                eof = True
+
+        while True:
+            if skip_until is not None:
+                # Pomijanie sekcji wyników do jej znacznika zamykającego
+                end = buffer.find(skip_until)
+                if end < 0:
+                    buffer = buffer[max(0, len(buffer) - len(skip_until)):]
+                    if eof:
+                        break
+                    read_more()
+                    continue
+                buffer = buffer[end + len(skip_until):]
+                skip_until = None
+                continue
+
+            match = _INPUT_TAG_PATTERN.search(buffer)
+            if match is None:
+                # Znacznik może być przecięty granicą fragmentu - koniec bufora zostaje
+                # (z zapasem na znacznik zamykający element główny)
+                split = len(buffer) if eof else max(0, len(buffer) - TAIL_CHARS)
+                if eof and append is not None:
+                    root_end = buffer.rfind('</')
+                    if root_end < 0:
+                        raise ValueError(f"Brak znacznika zamykającego w pliku {source_thmx}")
+                    target.write(buffer[:root_end] + append)
+                    buffer = buffer[root_end:]
+                target.write(buffer[:split])
+                buffer = buffer[split:]
+                if eof:
+                    break
+                read_more()
+                continue
+
+            tag_end = buffer.find('>', match.end())
+            if tag_end < 0 and not eof:
+                read_more()
+                continue
+            target.write(buffer[:match.start()])
+            tag_end = len(buffer) - 1 if tag_end < 0 else tag_end
+            tag_text = buffer[match.start():tag_end + 1]
+            buffer = buffer[tag_end + 1:]
+            name = match.group(1)
+
+            if name == 'MeshControl':
+                found_mesh_control = True
+                for attribute, value in (mesh_control or {}).items():
+                    tag_text = _set_attribute(tag_text, attribute, value)
+                target.write(tag_text)
+            elif not tag_text.endswith('/>'):
+                skip_until = f'</{name}>'
+    return found_mesh_control
@@ -0,0 +1,281 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    from . import therm_backends, therm_fingerprint, therm_history, therm_refine, therm_solver, therm_timeout
+except ImportError:
+    import therm_backends
+    import therm_fingerprint
+    import therm_history
+    import therm_refine
+    import therm_solver
+    import therm_timeout
+
+# Uruchamianie obliczeń THERM dla plików .thmx (bez zależności od bpy)
+#
+# JobRunner łączy backend obliczeń, dobór limitu czasu, zagęszczanie siatki,
+# ponowne użycie wyników identycznych modeli i historię obliczeń. run_jobs()
+# liczy listę plików w puli wątków, które dzielą jeden JobRunner - wspólne
+# zasoby (indeks wyników, dobór limitu czasu) mają własne blokady.
+# therm_runner.THERMRunner dziedziczy po nim i czyta ustawienia ze sceny Blendera.
+
+class JobRunner:
+    def __init__(self, backend=None, timeout_policy=None, refinement=None, history=None):
+        # Backend obliczeń (therm_backends) - None oznacza create_backend()
+        self.backend = backend
+        # Dobór limitu czasu (therm_timeout) - None oznacza create_timeout_policy()
+        self.timeout_policy = timeout_policy
+        # Zagęszczanie siatki (argumenty therm_refine.MeshRefinement) - None oznacza jedno obliczenie
+        self.refinement = refinement
+        # Historia obliczeń (therm_history) - None oznacza wspólną bazę w katalogu domowym
+        self.history = history
+
+    def create_backend(self):
+        """Backend, gdy nie podano go w konstruktorze ani ścieżki THERM - bez ustawień brak"""
+        return None
+
+    def create_timeout_policy(self):
+        return therm_timeout.TimeoutPolicy(fallback=therm_solver.DEFAULT_TIMEOUT)
+
+    def reuse_results_enabled(self):
+        """Domyślne ponowne użycie wyników identycznych modeli"""
+        return False
+
+    def get_backend(self, therm_exe=None):
+        """Backend dla obliczeń - podany w konstruktorze, lokalny dla therm_exe lub z create_backend()"""
+        if self.backend is not None:
+            return self.backend
+        if therm_exe:
+            return therm_backends.LocalBackend(therm_exe)
+        return self.create_backend()
+
+    def get_timeout_policy(self):
+        if self.timeout_policy is None:
+            self.timeout_policy = self.create_timeout_policy()
+        return self.timeout_policy
+
+    def reuse_cached_result(self, thmx_filepath):
+        """Próbuje użyć wyników identycznego złącza zamiast uruchamiać THERM
+
+        Zwraca odcisk modelu (do zapisania po obliczeniach) oraz informację czy wynik użyto ponownie.
+        """
+        try:
+            fingerprint = therm_fingerprint.fingerprint_thmx(thmx_filepath)
+        except Exception as e:
+            print(f"⚠️  Nie można obliczyć odcisku modelu {os.path.basename(thmx_filepath)}: {e}")
+            return None, False
+
+        index = therm_fingerprint.ResultIndex.for_directory(os.path.dirname(os.path.abspath(thmx_filepath)))
+        entry = index.lookup(fingerprint, exclude_path=thmx_filepath)
+
+        if entry and therm_fingerprint.apply_cached_result(entry['thmx'], thmx_filepath):
+            print(f"♻️  Model identyczny z {os.path.basename(entry['thmx'])} (odcisk {fingerprint[:12]}) - użyto zapisanych wyników")
+            return fingerprint, True
+
+        return fingerprint, False
+
+    def store_result_fingerprint(self, fingerprint, thmx_filepath):
+        """Zapisuje rozwiązany model w indeksie wyników projektu"""
+        if not fingerprint or not therm_fingerprint.has_ufactor_results(thmx_filepath):
+            return
+        try:
+            index = therm_fingerprint.ResultIndex.for_directory(os.path.dirname(os.path.abspath(thmx_filepath)))
+            index.store(fingerprint, thmx_filepath)
+        except Exception as e:
+            print(f"⚠️  Nie można zapisać indeksu wyników: {e}")
+
+    def _run_therm_calculation_thmx(self, thmx_filepath, reuse_results=None, therm_exe=None):
+        """Uruchamia obliczenia THERM dla pliku .thmx i czeka na wynik
+
+        Przy wywołaniu z wątku roboczego podaj reuse_results (i therm_exe albo backend) -
+        wtedy ustawienia nie są odczytywane.
+        """
+        if reuse_results is None:
+            reuse_results = self.reuse_results_enabled()
+
+        fingerprint = None
+        if reuse_results:
+            fingerprint, reused = self.reuse_cached_result(thmx_filepath)
+            if reused:
+                return True
+
+        if self.refinement:
+            success = self.run_refinement_thmx(thmx_filepath, therm_exe) is not None
+        else:
+            success = self._run_therm_process_thmx(thmx_filepath, therm_exe)
+
+        if success and fingerprint:
+            self.store_result_fingerprint(fingerprint, thmx_filepath)
+
+        return success
+
+    def start_therm_process_thmx(self, thmx_filepath, therm_exe=None, timeout=None):
+        """Uruchamia THERM bez czekania na wynik - zwraca uchwyt zadania backendu lub None
+
+        Bez podanego timeout limit czasu przewidywany jest z rozmiaru modelu i historii obliczeń.
+        """
+        backend = self.get_backend(therm_exe)
+        if backend is None:
+            return None
+
+        if timeout is None:
+            timeout = self.get_timeout_policy().timeout_for(thmx_filepath)
+
+        print(f"Obliczenia THERM: {backend.describe()}")
+
+        try:
+            return backend.submit(thmx_filepath, timeout)
+        except Exception as e:
+            print(f"❌ Błąd uruchamiania THERM: {e}")
+            return None
+
+    def finish_therm_process(self, solver):
+        """Wypisuje wynik zakończonego procesu THERM i zwraca informację o sukcesie"""
+        print(f"THERM stdout: {solver.stdout}")
+        print(f"THERM stderr: {solver.stderr}")
+        print(f"THERM return code: {solver.returncode}")
+
+        if solver.cancelled:
+            print(f"⏹️  Obliczenia THERM przerwane po {solver.elapsed:.1f} s")
+            return False
+
+        if solver.input_changed:
+            print("❌ Plik .thmx zmienił się w trakcie obliczeń - uruchom obliczenia ponownie")
+            return False
+
+        output_files_created = solver.created_outputs()
+        for file_path in output_files_created:
+            print(f"✓ Utworzono plik: {os.path.basename(file_path)}")
+
+        if getattr(solver, 'log_path', None):
+            print(f"Dziennik THERM: {solver.log_path}")
+
+        if getattr(solver, 'harvested', False):
+            print(f"⏩ Wyniki odebrane przed zakończeniem procesu THERM ({solver.elapsed:.1f} s)")
+
+        if solver.stalled:
+            print(f"❌ THERM przestał wypisywać postęp ({solver.progress.describe()}) - obliczenia przerwane")
+        elif solver.timed_out:
+            print(f"❌ Przekroczono czas oczekiwania na THERM ({solver.timeout:.0f} s)")
+            if output_files_created:
+                print("✅ Mimo timeoutu, obliczenia zostały wykonane!")
+        elif output_files_created:
+            print("✅ OBLICZENIA THERM ZAKOŃCZONE SUKCESEM!")
+        elif solver.returncode == 0:
+            print("✅ THERM zakończony kodem 0 (sukces)")
+        else:
+            print(f"❌ THERM zakończony kodem {solver.returncode} i brak plików wynikowych")
+
+        if output_files_created:
+            print(f"Utworzone pliki: {[os.path.basename(f) for f in output_files_created]}")
+
+        if self.timeout_policy is not None:
+            try:
+                self.timeout_policy.record(solver)
+            except Exception as e:
+                print(f"⚠️  Nie można zapisać czasu obliczeń: {e}")
+
+        try:
+            (self.history or therm_history.RunHistory()).record_handle(solver)
+        except Exception as e:
+            print(f"⚠️  Nie można zapisać historii obliczeń: {e}")
+
+        return solver.succeeded()
+
+    def run_refinement_thmx(self, thmx_filepath, therm_exe=None):
+        """Liczy model na kolejnych poziomach MeshLevel do zbieżności U-factors
+
+        Zwraca wpis historii poziomu, którego wyniki trafiły do pliku projektu, lub None.
+        """
+        refinement = therm_refine.MeshRefinement(thmx_filepath, **self.refinement)
+        level_thmx = refinement.next_input()
+        while level_thmx:
+            solver = self.start_therm_process_thmx(level_thmx, therm_exe)
+            if solver is None:
+                return None
+            solver.wait()
+            success = self.finish_therm_process(solver)
+            refinement.record(level_thmx, success, solver.elapsed)
+            level_thmx = refinement.next_input()
+
+        entry = refinement.finalize()
+        print(f"🔬 {os.path.basename(thmx_filepath)}: {refinement.summary()}")
+        return entry
+
+    def _run_therm_process_thmx(self, thmx_filepath, therm_exe=None):
+        """Uruchamia proces THERM dla pliku .thmx i czeka na jego zakończenie"""
+        try:
+            solver = self.start_therm_process_thmx(thmx_filepath, therm_exe)
+            if solver is None:
+                return False
+
+            solver.wait()
+            return self.finish_therm_process(solver)
+
+        except Exception as e:
+            print(f"❌ Krytyczny błąd: {e}")
+            return False
+
+    def run_jobs(self, filepaths, therm_exe=None, reuse_results=False, max_workers=0, read_results=None):
+        """Rozwiązuje pliki .thmx równolegle - lista wyników w kolejności plików wejściowych
+
+        read_results(thmx) odczytuje wyniki (np. strumienie ciepła) zaraz po obliczeniach każdego pliku.
+        Backend i dobór limitu czasu ustalane są przed startem wątków, w wątku wywołującym.
+        """
+        if not filepaths:
+            return []
+
+        if self.backend is None:
+            self.backend = self.get_backend(therm_exe)
+        self.get_timeout_policy()
+
+        total = len(filepaths)
+        max_workers = min(total, max_workers or os.cpu_count() or 1)
+        started = time.perf_counter()
+
+        def solve(filepath):
+            result = {'thmx': filepath, 'success': False, 'heat_flows': {},
+                      'error': None, 'solve_time': 0.0, 'elapsed': 0.0}
+            job_started = time.perf_counter()
+            try:
+                print(f"🔄 Uruchamianie obliczeń dla: {os.path.basename(filepath)}")
+                if self.backend is None:
+                    raise RuntimeError("Nie znaleziono THERM.exe")
+                result['success'] = self._run_therm_calculation_thmx(filepath, reuse_results=reuse_results,
+                                                                     therm_exe=therm_exe)
+                result['solve_time'] = time.perf_counter() - job_started
+
+                if not result['success']:
+                    result['error'] = "THERM zakończony błędem"
+                elif read_results is not None:
+                    # Wyniki zbierane w pamięci - zapis zbiorczy po zakończeniu wszystkich plików
+                    result['heat_flows'] = read_results(filepath)
+            except Exception as e:
+                result['error'] = f"{e.__class__.__name__}: {e}"
+
+            result['elapsed'] = time.perf_counter() - job_started
+            return result
+
+        print(f"⚙️  Obliczenia THERM: {total} plików, {max_workers} równolegle")
+        results = []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(solve, filepath) for filepath in filepaths]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                name = os.path.basename(result['thmx'])
+                if result['success']:
+                    print(f"   [{len(results)}/{total}] ✅ Ukończono obliczenia: {name} "
+                          f"(THERM {result['solve_time']:.1f} s, razem {result['elapsed']:.1f} s)")
+                else:
+                    print(f"   [{len(results)}/{total}] ❌ Błąd obliczeń: {name} - {result['error']}")
+
+        # Wyniki w kolejności plików wejściowych
+        order = {filepath: i for i, filepath in enumerate(filepaths)}
+        results.sort(key=lambda result: order[result['thmx']])
+
+        success_count = sum(1 for result in results if result['success'])
+        print(f"🎯 Ukończono {success_count}/{total} obliczeń w {time.perf_counter() - started:.1f} s")
+        return results
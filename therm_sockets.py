@@ -0,0 +1,153 @@
+import bpy
+import json
+import re
+from bpy.app.handlers import persistent
+
+# Mapowanie wejść grupy "THERM U-Section" po nazwach socketów interfejsu.
+# Mapa jest liczona raz na grupę węzłów i unieważniana przy zmianie drzewa węzłów.
+
+USECTION_NODE_GROUP = "THERM U-Section"
+
+# Stare identyfikatory Socket_NN - używane tylko gdy grupa nie ma socketu o danej nazwie
+LEGACY_SOCKET_MAP = {
+    'u1': 'Socket_25',
+    'usection': 'Socket_2',
+    'y': 'Socket_24',
+    'u-value': 'Socket_26',
+    'r01': 'Socket_28', 'r02': 'Socket_29', 'r03': 'Socket_30', 'r04': 'Socket_31',
+    'r05': 'Socket_32', 'r06': 'Socket_33', 'r07': 'Socket_34', 'r08': 'Socket_35',
+    'r09': 'Socket_36', 'r10': 'Socket_37',
+    'ti': 'Socket_22', 'te': 'Socket_23',
+    'm01': 'Socket_8', 'm02': 'Socket_14', 'm03': 'Socket_15', 'm04': 'Socket_16',
+    'm05': 'Socket_17', 'm06': 'Socket_18', 'm07': 'Socket_19', 'm08': 'Socket_20',
+    'm09': 'Socket_13', 'm10': 'Socket_12',
+    't01': 'Socket_3', 't02': 'Socket_4', 't03': 'Socket_5', 't04': 'Socket_6',
+    't05': 'Socket_7', 't06': 'Socket_9', 't07': 'Socket_10', 't08': 'Socket_11',
+}
+
+# Pełny układ warstw sekcji U (bez limitu socketów M/R/T grupy) - JSON we właściwości krzywej
+LAYER_STACK_PROPERTY = "therm_layers"
+
+_socket_map_cache = {}
+
+def socket_key(name):
+    """Normalizuje nazwę socketu: 'U-Value' -> 'uvalue', 'M01' / 'M 1' -> 'm1'"""
+    key = re.sub(r'[^a-z0-9]', '', name.lower())
+    return re.sub(r'(?<=[a-z])0+(?=\d)', '', key)
+
+def _interface_inputs(node_group):
+    """Zwraca (nazwa, identyfikator) wejść grupy - Blender 4.x (interface) i starsze (inputs)"""
+    interface = getattr(node_group, 'interface', None)
+    if interface is not None:
+        return [(item.name, item.identifier) for item in interface.items_tree
+                if item.item_type == 'SOCKET' and item.in_out == 'INPUT']
+    return [(socket.name, socket.identifier) for socket in node_group.inputs]
+
+def build_socket_map(node_group):
+    """Buduje mapę klucz -> identyfikator socketu na podstawie nazw w interfejsie grupy"""
+    mapping = {}
+    identifiers = set()
+
+    for name, identifier in _interface_inputs(node_group):
+        identifiers.add(identifier)
+        mapping.setdefault(socket_key(name), identifier)
+
+    claimed = set(mapping.values())
+    for key, identifier in LEGACY_SOCKET_MAP.items():
+        key = socket_key(key)
+        if key not in mapping and identifier in identifiers and identifier not in claimed:
+            mapping[key] = identifier
+            claimed.add(identifier)
+
+    return mapping
+
+def get_socket_map(node_group):
+    """Mapa socketów grupy węzłów (z pamięci podręcznej)"""
+    pointer = node_group.as_pointer()
+    mapping = _socket_map_cache.get(pointer)
+    if mapping is None:
+        mapping = build_socket_map(node_group)
+        _socket_map_cache[pointer] = mapping
+    return mapping
+
+def get_socket_identifier(modifier, key):
+    """Identyfikator socketu modyfikatora dla klucza (None jeśli grupa go nie ma)"""
+    if not modifier.node_group:
+        return None
+    identifier = get_socket_map(modifier.node_group).get(socket_key(key))
+    if identifier is None or identifier not in modifier:
+        return None
+    return identifier
+
+def get_modifier_input(modifier, key, default=None):
+    """Wartość wejścia modyfikatora Geometry Nodes po nazwie socketu"""
+    identifier = get_socket_identifier(modifier, key)
+    if identifier is None:
+        return default
+    return modifier[identifier]
+
+def set_modifier_input(modifier, key, value):
+    """Ustawia wejście modyfikatora po nazwie socketu - zwraca identyfikator lub None"""
+    identifier = get_socket_identifier(modifier, key)
+    if identifier is not None:
+        modifier[identifier] = value
+    return identifier
+
+def numbered_keys(modifier, prefix):
+    """Klucze numerowanych socketów grupy (np. m1, m2, ...) w kolejności numerów"""
+    if not modifier.node_group:
+        return []
+    pattern = re.compile(rf'^{prefix}(\d+)$')
+    numbered = []
+    for key in get_socket_map(modifier.node_group):
+        match = pattern.match(key)
+        if match:
+            numbered.append((int(match.group(1)), key))
+    return [key for _, key in sorted(numbered)]
+
+def store_layer_stack(curve_obj, mesh_objects, thicknesses, conductivities):
+    """Zapisuje układ warstw (obiekt, grubość [m], conductivity) we właściwości krzywej sekcji U"""
+    layers = [{'object': mesh_obj.name if mesh_obj else '', 'thickness': thickness, 'conductivity': conductivity}
+              for mesh_obj, thickness, conductivity in zip(mesh_objects, thicknesses, conductivities)]
+    curve_obj[LAYER_STACK_PROPERTY] = json.dumps(layers)
+    return layers
+
+def read_layer_stack(curve_obj):
+    """Układ warstw zapisany przez store_layer_stack (pusta lista gdy brak lub uszkodzony)"""
+    raw = curve_obj.get(LAYER_STACK_PROPERTY)
+    if not raw:
+        return []
+    try:
+        layers = json.loads(raw)
+    except (TypeError, ValueError):
+        return []
+    return layers if isinstance(layers, list) else []
+
+def clear_socket_map_cache():
+    _socket_map_cache.clear()
+
+@persistent
+def _invalidate_socket_maps(scene, depsgraph):
+    """Unieważnia mapy socketów zmienionych grup węzłów"""
+    if not _socket_map_cache:
+        return
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.NodeTree):
+            _socket_map_cache.pop(update.id.original.as_pointer(), None)
+
+@persistent
+def _clear_on_load(*args):
+    clear_socket_map_cache()
+
+def register():
+    if _invalidate_socket_maps not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(_invalidate_socket_maps)
+    if _clear_on_load not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(_clear_on_load)
+
+def unregister():
+    if _invalidate_socket_maps in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_invalidate_socket_maps)
+    if _clear_on_load in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_clear_on_load)
+    clear_socket_map_cache()
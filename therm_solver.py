@@ -0,0 +1,347 @@
+import os
+import shutil
+import subprocess
+import platform
+import tempfile
+import time
+
+try:
+    from . import therm_progress, therm_results, therm_watch
+except ImportError:
+    import therm_progress
+    import therm_results
+    import therm_watch
+
+# Proces solvera THERM uruchamiany przez Popen (bez zależności od bpy)
+#
+# Proces nie blokuje wywołującego - stan sprawdzany jest przez poll(), więc
+# operator modalny może odpytywać go z timera, a wątek roboczy czekać przez wait().
+#
+# Każde uruchomienie pracuje w osobnym folderze roboczym (.therm_jobs w folderze
+# projektu) na kopii pliku .thmx. Wyniki trafiają do projektu przez os.replace
+# dopiero po udanych obliczeniach, więc równoległe uruchomienia tego samego pliku
+# i ponowny eksport w trakcie obliczeń nie nadpisują sobie plików.
+#
+# Folder roboczy jest obserwowany (therm_watch) - gdy THERM zapisze wyniki, a jego
+# proces jeszcze trwa, wyniki są odbierane od razu i proces kończony.
+
+DEFAULT_TIMEOUT = 300.0
+
+# Po tylu sekundach bez wyjścia zadanie jest oznaczane jako podejrzane o zawieszenie
+STALL_WARNING = 60.0
+
+OUTPUT_EXTENSIONS = ('.thm', '.o', '.tdf')
+
+SANDBOX_DIRNAME = ".therm_jobs"
+
+def build_command(therm_exe, thmx_filepath):
+    """Komenda THERM w trybie CLI dla pliku .thmx"""
+    return [therm_exe, '-pw', 'thmCLA', '-thmx', thmx_filepath, '-calc', '-exit']
+
+def expected_output_files(thmx_filepath):
+    """Pliki wynikowe, które THERM zapisuje obok pliku .thmx"""
+    directory = os.path.dirname(thmx_filepath)
+    basename = os.path.splitext(os.path.basename(thmx_filepath))[0]
+    return [os.path.join(directory, f"{basename}{ext}") for ext in OUTPUT_EXTENSIONS]
+
+def file_stamp(path):
+    """Czas modyfikacji i rozmiar pliku - wykrywa ponowny eksport w trakcie obliczeń"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def promote_results(work_thmx, target_thmx, input_stamp, copy=False):
+    """Przenosi wyniki obliczeń do folderu projektu - plik .thmx na końcu
+
+    Zwraca listę przeniesionych plików wynikowych albo None, jeśli plik docelowy
+    zmienił się od rozpoczęcia obliczeń. copy=True kopiuje przez plik tymczasowy
+    (źródło na innym dysku, np. folder wymiany).
+    """
+    try:
+        if file_stamp(target_thmx) != input_stamp:
+            return None
+    except OSError:
+        return None
+
+    def place(source, target):
+        if copy:
+            temp_path = target + ".part"
+            shutil.copy2(source, temp_path)
+            os.replace(temp_path, target)
+        else:
+            os.replace(source, target)
+
+    promoted = []
+    for work_path, target_path in zip(expected_output_files(work_thmx), expected_output_files(target_thmx)):
+        if os.path.exists(work_path):
+            place(work_path, target_path)
+            promoted.append(target_path)
+        elif os.path.exists(target_path):
+            # Wynik poprzednich obliczeń, którego te obliczenia nie odtworzyły
+            os.remove(target_path)
+
+    place(work_thmx, target_thmx)
+    return promoted
+
+def spawn_detached(cmd, log_path):
+    """Uruchamia proces niezależny od Blendera (działa dalej po jego zamknięciu) - zwraca PID"""
+    log = open(log_path, 'a', encoding='utf-8')
+    kwargs = {'stdin': subprocess.DEVNULL, 'stdout': log, 'stderr': subprocess.STDOUT, 'close_fds': True}
+    if platform.system() == "Windows":
+        kwargs['creationflags'] = (subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+                                   | subprocess.CREATE_NO_WINDOW)
+    else:
+        kwargs['start_new_session'] = True
+
+    try:
+        process = subprocess.Popen(cmd, **kwargs)
+    finally:
+        log.close()
+    return process.pid
+
+class SolverProcess:
+    """Pojedyncze uruchomienie THERM: start, nieblokujące poll(), wait() i cancel()"""
+
+    def __init__(self, therm_exe, thmx_filepath, timeout=DEFAULT_TIMEOUT, sandbox=True, stall_timeout=None,
+                 harvest=True):
+        self.therm_exe = therm_exe
+        self.thmx_filepath = os.path.normpath(thmx_filepath)
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self.sandbox = sandbox
+        self.harvest = harvest
+        self.work_dir = None
+        self.work_thmx = self.thmx_filepath
+        self.log_path = therm_progress.log_path_for(self.thmx_filepath)
+        self.process = None
+        self.started = None
+        self.finished = None
+        self.returncode = None
+        self.cancelled = False
+        self.timed_out = False
+        self.stalled = False
+        self.harvested = False
+        self.input_changed = False
+        self.outputs = []
+        self.stdout = ''
+        self.stderr = ''
+        self.progress = therm_progress.SolverProgress()
+        self._solved = False
+        self._input_stamp = None
+        self._pump = None
+        self._harvester = None
+
+    @property
+    def command(self):
+        return build_command(self.therm_exe, self.work_thmx)
+
+    @property
+    def output_files(self):
+        return expected_output_files(self.thmx_filepath)
+
+    @property
+    def work_output_files(self):
+        return expected_output_files(self.work_thmx)
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def running(self):
+        return self.process is not None and self.finished is None
+
+    def remove_stale_outputs(self):
+        """Usuwa wyniki poprzednich obliczeń, aby nie pomylić ich z nowymi"""
+        for file_path in self.output_files:
+            if os.path.exists(file_path):
+                try:
+                    os.remove(file_path)
+                    print(f"Usunięto stary plik: {file_path}")
+                except OSError:
+                    pass
+
+    def prepare_sandbox(self):
+        """Folder roboczy z kopią pliku .thmx (ten sam dysk co projekt - przeniesienie wyników jest atomowe)"""
+        directory = os.path.dirname(self.thmx_filepath)
+        basename = os.path.splitext(os.path.basename(self.thmx_filepath))[0]
+        root = os.path.join(directory, SANDBOX_DIRNAME)
+        os.makedirs(root, exist_ok=True)
+
+        self.work_dir = tempfile.mkdtemp(prefix=f"{basename}-", dir=root)
+        self.work_thmx = os.path.join(self.work_dir, os.path.basename(self.thmx_filepath))
+        self._input_stamp = file_stamp(self.thmx_filepath)
+        # Kopia, nie dowiązanie - THERM zapisuje wyniki do samego pliku .thmx. Wyniki poprzednich
+        # obliczeń (MeshInput, Results) są pomijane, aby nie zostały odebrane jako nowe.
+        therm_results.write_model_input(self.thmx_filepath, self.work_thmx)
+
+    def promote_outputs(self):
+        """Przenosi wyniki z folderu roboczego do projektu (os.replace)"""
+        promoted = promote_results(self.work_thmx, self.thmx_filepath, self._input_stamp)
+        if promoted is None:
+            # Model wyeksportowano ponownie w trakcie obliczeń - wyniki dotyczą starej wersji
+            self.input_changed = True
+            print(f"⚠️  {os.path.basename(self.thmx_filepath)} zmienił się w trakcie obliczeń - wyniki odrzucone")
+            return False
+
+        self.outputs = promoted
+        return True
+
+    def cleanup_sandbox(self):
+        if not self.work_dir:
+            return
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(self.work_dir))
+        except OSError:
+            pass
+        self.work_dir = None
+
+    def start(self):
+        """Uruchamia THERM i wraca natychmiast"""
+        if self.sandbox:
+            self.prepare_sandbox()
+        else:
+            self.remove_stale_outputs()
+
+        try:
+            max_iterations = therm_results.read_mesh_control(self.work_thmx).get('MaxIterations')
+            self.progress.max_iterations = int(max_iterations) if max_iterations else None
+        except (OSError, ValueError, SyntaxError):
+            pass
+
+        kwargs = {}
+        if platform.system() == "Windows":
+            kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+
+        print(f"Uruchamianie THERM: {' '.join(self.command)}")
+        self.started = time.time()
+        self.progress.last_output = self.started
+        try:
+            # Wyjście czytane na bieżąco przez wątki - wiersze trafiają do dziennika i modelu postępu
+            self.process = subprocess.Popen(self.command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                            text=True, encoding='utf-8', errors='replace', bufsize=1, **kwargs)
+        except Exception:
+            self.cleanup_sandbox()
+            self.finished = time.time()
+            raise
+
+        try:
+            log = therm_progress.RotatingLog(self.log_path)
+            log.write_line('info', ' '.join(self.command))
+        except OSError as e:
+            print(f"⚠️  Nie można otworzyć dziennika {self.log_path}: {e}")
+            log = None
+        self._pump = therm_progress.OutputPump(self.process, self.progress, log)
+        
+        if self.harvest:
+            try:
+                self._harvester = therm_watch.ResultHarvester(self.work_thmx, self.work_output_files)
+            except OSError as e:
+                print(f"⚠️  Nie można obserwować plików wynikowych: {e}")
+        return self
+
+    def poll(self):
+        """Zwraca None dopóki THERM pracuje, potem kod wyjścia (po przekroczeniu limitu proces jest zabijany)"""
+        if self.process is None or self.finished is not None:
+            return self.returncode
+
+        returncode = self.process.poll()
+        if returncode is None:
+            if self._harvester is not None and self._harvester.ready():
+                # Wyniki zapisane i stabilne, a proces jeszcze trwa - następne zadanie nie musi czekać
+                self.harvested = True
+                print(f"⏩ {os.path.basename(self.thmx_filepath)}: wyniki zapisane po {self.elapsed:.1f} s - kończę proces THERM")
+                self._kill()
+                self._finish()
+            elif self.timeout and self.elapsed > self.timeout:
+                self.timed_out = True
+                self._kill()
+                self._finish()
+            elif self.stall_timeout and self.progress.silent_for() > self.stall_timeout:
+                # Brak wyjścia przez stall_timeout - zawieszony solver przerywany przed limitem czasu
+                self.stalled = True
+                print(f"⚠️  THERM bez wyjścia od {self.progress.silent_for():.0f} s - przerywam")
+                self._kill()
+                self._finish()
+            return self.returncode
+
+        self._finish()
+        return self.returncode
+
+    def wait(self, interval=0.2):
+        """Czeka na zakończenie (dla wątków roboczych) i zwraca kod wyjścia"""
+        while self.poll() is None and self.running:
+            time.sleep(interval)
+        return self.returncode
+
+    def cancel(self):
+        """Przerywa obliczenia - zabija proces THERM"""
+        if not self.running:
+            return
+        self.cancelled = True
+        self._kill()
+        self._finish()
+
+    def phase(self):
+        """Etap obliczeń z wyjścia THERM (lub z plików wynikowych, gdy THERM nic nie wypisał)"""
+        if not self.running:
+            return "zakończono"
+        if self.progress.lines:
+            description = self.progress.describe()
+        elif any(os.path.exists(path) for path in self.work_output_files):
+            description = "zapis wyników"
+        else:
+            description = "obliczenia"
+        silent = self.progress.silent_for()
+        if silent > STALL_WARNING:
+            description += f" - brak wyjścia od {silent:.0f} s"
+        return description
+
+    def created_outputs(self):
+        return list(self.outputs)
+
+    def succeeded(self):
+        """Sukces gdy powstały pliki wynikowe lub THERM zakończył się kodem 0"""
+        return self._solved
+
+    def _kill(self):
+        try:
+            self.process.kill()
+            self.process.wait(timeout=10)
+        except Exception as e:
+            print(f"⚠️  Nie można zatrzymać procesu THERM: {e}")
+
+    def _finish(self):
+        self.finished = time.time()
+        self.returncode = self.process.returncode
+        if self._harvester is not None:
+            self._harvester.close()
+            self._harvester = None
+        if self._pump is not None:
+            self._pump.join()
+            self.stdout = self._pump.text('stdout')
+            self.stderr = self._pump.text('stderr')
+
+        work_outputs = [path for path in self.work_output_files if os.path.exists(path)]
+        interrupted = self.timed_out or self.stalled
+        # Przerwany proces mógł zostawić same pliki siatki - liczy się wtedy tylko zapisana sekcja Results
+        complete = bool(work_outputs) and (not interrupted or therm_watch.results_written(self.work_thmx))
+        solved = not self.cancelled and (self.harvested or complete
+                                         or (not interrupted and self.returncode == 0))
+        if solved:
+            self.progress.mark_done()
+
+        if not self.sandbox:
+            self.outputs = work_outputs
+            self._solved = solved
+            return
+
+        try:
+            self._solved = solved and self.promote_outputs()
+        except OSError as e:
+            print(f"❌ Nie można przenieść wyników do folderu projektu: {e}")
+            self._solved = False
+        finally:
+            self.cleanup_sandbox()
@@ -0,0 +1,207 @@
+import os
+import json
+import math
+import time
+import threading
+
+try:
+    from . import therm_results
+except ImportError:
+    import therm_results
+
+# Limit czasu obliczeń THERM dopasowany do modelu (bez zależności od bpy)
+#
+# Czas obliczeń przewidywany jest z liczby wielokątów, punktów i MeshLevel
+# regresją log(czas) = w0 + w1*log(punkty) + w2*log(wielokąty) + w3*MeshLevel
+# dopasowaną do zapisanej historii, poprawioną o odchyłkę najbardziej podobnych
+# wcześniejszych zadań. Limit = przewidywanie * współczynnik bezpieczeństwa + zapas.
+# Historia jest wspólna dla projektów - odzwierciedla szybkość tego komputera.
+
+MODEL_DIR = os.path.join(os.path.expanduser("~"), ".therm_exporter")
+MODEL_FILENAME = "therm_runtime_model.json"
+MAX_SAMPLES = 500
+MIN_SAMPLES = 5
+NEIGHBOURS = 3
+RIDGE = 0.01
+
+DEFAULT_SAFETY_FACTOR = 3.0
+TIMEOUT_MARGIN = 30.0
+MIN_TIMEOUT = 30.0
+MAX_TIMEOUT = 4 * 3600.0
+
+# Przerwane zadanie liczyłoby się dłużej - do historii trafia czas z zapasem
+CENSORED_GROWTH = 2.0
+
+def model_features(stats):
+    """Cechy modelu do regresji: [1, log(punkty), log(wielokąty), MeshLevel]"""
+    try:
+        mesh_level = float(stats.get('mesh_control', {}).get('MeshLevel', 8))
+    except ValueError:
+        mesh_level = 8.0
+    return [1.0, math.log1p(stats.get('points', 0)), math.log1p(stats.get('polygons', 0)), mesh_level]
+
+def _solve(matrix, vector):
+    """Układ równań liniowych metodą Gaussa z wyborem elementu głównego"""
+    size = len(vector)
+    rows = [list(matrix[i]) + [vector[i]] for i in range(size)]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda row: abs(rows[row][col]))
+        if abs(rows[pivot][col]) < 1e-12:
+            return None
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for row in range(col + 1, size):
+            factor = rows[row][col] / rows[col][col]
+            for k in range(col, size + 1):
+                rows[row][k] -= factor * rows[col][k]
+    weights = [0.0] * size
+    for row in range(size - 1, -1, -1):
+        weights[row] = (rows[row][size] - sum(rows[row][k] * weights[k] for k in range(row + 1, size))) / rows[row][row]
+    return weights
+
+class RuntimeModel:
+    """Historia czasów obliczeń i dopasowana do niej regresja"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(MODEL_DIR, MODEL_FILENAME)
+        self.samples = []
+        self.weights = None
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.samples = json.load(f).get('samples', [])
+        except (OSError, ValueError, AttributeError):
+            self.samples = []
+        self.fit()
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'samples': self.samples}, f, indent=1)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  Nie można zapisać historii czasów THERM: {e}")
+
+    def fit(self):
+        """Regresja grzbietowa w przestrzeni logarytmów (równania normalne)"""
+        if len(self.samples) < MIN_SAMPLES:
+            self.weights = None
+            return
+        size = 4
+        matrix = [[0.0] * size for _ in range(size)]
+        vector = [0.0] * size
+        for sample in self.samples:
+            features = sample['features']
+            target = math.log(max(sample['seconds'], 0.1))
+            for i in range(size):
+                vector[i] += features[i] * target
+                for j in range(size):
+                    matrix[i][j] += features[i] * features[j]
+        for i in range(1, size):
+            matrix[i][i] += RIDGE * len(self.samples)
+        self.weights = _solve(matrix, vector)
+
+    def _regression(self, features):
+        return sum(w * x for w, x in zip(self.weights, features))
+
+    def predict(self, stats):
+        """Przewidywany czas obliczeń [s] lub None, gdy historia jest za krótka"""
+        if self.weights is None:
+            return None
+        features = model_features(stats)
+        log_prediction = self._regression(features)
+
+        # Poprawka o odchyłkę najbardziej podobnych zadań (ten sam typ detalu liczy się podobnie)
+        nearest = sorted(self.samples, key=lambda sample: sum((a - b) ** 2 for a, b in
+                                                               zip(sample['features'][1:], features[1:])))[:NEIGHBOURS]
+        residuals = [math.log(max(sample['seconds'], 0.1)) - self._regression(sample['features']) for sample in nearest]
+        if residuals:
+            log_prediction += sum(residuals) / len(residuals)
+
+        return math.exp(min(log_prediction, math.log(MAX_TIMEOUT)))
+
+    def record(self, stats, seconds, censored=False):
+        """Dopisuje czas zakończonego zadania i dopasowuje model na nowo"""
+        with self._lock:
+            # Inny proces (np. proces roboczy kolejki) mógł dopisać próbki od ostatniego odczytu
+            self.load()
+            self.samples.append({
+                'features': model_features(stats),
+                'seconds': seconds * CENSORED_GROWTH if censored else seconds,
+                'censored': censored,
+                'recorded': time.time()
+            })
+            self.samples = self.samples[-MAX_SAMPLES:]
+            self.save()
+            self.fit()
+
+class TimeoutPolicy:
+    """Dobiera limit czasu zadania i uczy model po każdym obliczeniu
+
+    Bez historii (lub gdy enabled=False) używany jest limit fallback.
+    """
+
+    def __init__(self, fallback=300.0, safety_factor=DEFAULT_SAFETY_FACTOR, enabled=True, model_path=None):
+        self.fallback = fallback
+        self.safety_factor = safety_factor
+        self.enabled = enabled
+        self.model = RuntimeModel(model_path)
+        # Rozmiary modeli od doboru limitu do zapisu czasu - wspólne dla wątków therm_scheduler
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def _read_stats(self, thmx_filepath):
+        key = os.path.abspath(thmx_filepath)
+        with self._stats_lock:
+            stats = self._stats.get(key)
+        if stats is None:
+            try:
+                stats = therm_results.read_model_stats(thmx_filepath)
+            except (OSError, SyntaxError) as e:
+                print(f"⚠️  Nie można odczytać rozmiaru modelu {os.path.basename(thmx_filepath)}: {e}")
+                return None
+            with self._stats_lock:
+                self._stats[key] = stats
+        return stats
+
+    def _pop_stats(self, thmx_filepath):
+        with self._stats_lock:
+            return self._stats.pop(os.path.abspath(thmx_filepath), None)
+
+    def timeout_for(self, thmx_filepath, fallback=None, safety_factor=None):
+        """Limit czasu [s] dla pliku .thmx"""
+        fallback = fallback or self.fallback
+        safety_factor = safety_factor or self.safety_factor
+        if not self.enabled:
+            return fallback
+        stats = self._read_stats(thmx_filepath)
+        prediction = self.model.predict(stats) if stats else None
+        if prediction is None:
+            return fallback
+
+        timeout = min(max(prediction * safety_factor + TIMEOUT_MARGIN, MIN_TIMEOUT), MAX_TIMEOUT)
+        print(f"⏱️  {os.path.basename(thmx_filepath)}: przewidywane {prediction:.0f} s, limit {timeout:.0f} s "
+              f"({stats['polygons']} wielokątów, {stats['points']} punktów)")
+        return timeout
+
+    def record(self, handle):
+        """Zapisuje czas zakończonego zadania (uchwyt backendu) - anulowane i zawieszone pomijane"""
+        stats = self._pop_stats(handle.thmx_filepath)
+        # Zawieszony solver nie mówi nic o czasie obliczeń
+        if handle.cancelled or handle.input_changed or getattr(handle, 'stalled', False):
+            return
+        if not handle.timed_out and not handle.succeeded():
+            return
+        if stats is None:
+            # Limit nie był dobierany (np. wyłączony) - model i tak uczy się na tym zadaniu
+            stats = self._read_stats(handle.thmx_filepath)
+            self._pop_stats(handle.thmx_filepath)
+        if not stats:
+            return
+        # Czas samego THERM (dla folderu wymiany bez oczekiwania na proces roboczy)
+        seconds = getattr(handle, 'solve_elapsed', None) or handle.elapsed
+        self.model.record(stats, seconds, censored=handle.timed_out)
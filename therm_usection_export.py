@@ -1,11 +1,17 @@
 import bpy
 import os
-import xml.etree.ElementTree as ET
-from datetime import datetime
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+# Procesy puli (spawn) importują moduł roboczy pod nazwą pakietu dodatku - bez bpy
+# __init__ dodatku nie ładuje modułów Blendera, a sys.path procesu pozostaje bez zmian
+from . import therm_export, therm_sockets, therm_usection_worker as usection_worker
 
 class THERMUSectionExporter:
     def __init__(self):
         self.usection_data = {}
+        self.mesh_cache = therm_export.MeshPolygonCache()
     
     def get_geometry_nodes_values(self, curve_obj):
         """Pobiera wartości z Geometry Nodes dla krzywej U-Section"""
@@ -20,44 +26,21 @@ class THERMUSectionExporter:
             
             for modifier in curve_obj.modifiers:
                 if modifier.type == 'NODES' and modifier.node_group:
-                    # Pobierz dostępne socket-y
-                    available_inputs = list(modifier.keys())
+                    # Sockety rozpoznawane po nazwach w interfejsie grupy (mapa z pamięci podręcznej)
+                    usection_name = therm_sockets.get_modifier_input(modifier, 'usection')
+                    if usection_name:
+                        data['usection_name'] = usection_name
                     
-                    # Pobierz USection
-                    if 'Socket_2' in available_inputs:
-                        data['usection_name'] = modifier['Socket_2']
+                    data['ti_curve'] = therm_sockets.get_modifier_input(modifier, 'ti') or data['ti_curve']
+                    data['te_curve'] = therm_sockets.get_modifier_input(modifier, 'te') or data['te_curve']
                     
-                    # Pobierz Ti curve
-                    if 'Socket_22' in available_inputs and modifier['Socket_22']:
-                        data['ti_curve'] = modifier['Socket_22']
-                    elif 'Socket_8' in available_inputs and modifier['Socket_8']:
-                        data['ti_curve'] = modifier['Socket_8']
-                    
-                    # Pobierz Te curve  
-                    if 'Socket_23' in available_inputs and modifier['Socket_23']:
-                        data['te_curve'] = modifier['Socket_23']
-                    elif 'Socket_25' in available_inputs and modifier['Socket_25']:
-                        data['te_curve'] = modifier['Socket_25']
-                    
-                    # Pobierz Objects (M1-M10)
-                    object_sockets = ['Socket_14', 'Socket_15', 'Socket_16', 'Socket_17', 'Socket_18',
-                                     'Socket_19', 'Socket_20', 'Socket_13', 'Socket_12', 'Socket_8']
-                    
-                    for socket_id in object_sockets:
-                        if socket_id in available_inputs and modifier[socket_id]:
-                            obj = modifier[socket_id]
-                            if obj and obj.type == 'MESH':
-                                data['objects'].append(obj)
-                                
-                                # Pobierz materiały
-                                if obj.data.materials:
-                                    for mat in obj.data.materials:
-                                        if mat:
-                                            conductivity, emissivity = self.get_material_properties(mat)
-                                            data['materials'][mat.name] = {
-                                                'conductivity': conductivity,
-                                                'emissivity': emissivity
-                                            }
+                    # Pobierz Objects (M01, M02, ...)
+                    for obj_key in therm_sockets.numbered_keys(modifier, 'm'):
+                        self.add_layer_object(data, therm_sockets.get_modifier_input(modifier, obj_key))
+            
+            # Warstwy ponad liczbę socketów grupy - z pełnego układu zapisanego na krzywej
+            for layer in therm_sockets.read_layer_stack(curve_obj):
+                self.add_layer_object(data, bpy.data.objects.get(layer.get('object', '')))
             
             return data
             
@@ -65,6 +48,21 @@ class THERMUSectionExporter:
             print(f"Błąd pobierania Geometry Nodes: {e}")
             return data
     
+    def add_layer_object(self, data, obj):
+        """Dodaje obiekt warstwy i właściwości jego materiałów do danych sekcji"""
+        if not obj or obj.type != 'MESH' or obj in data['objects']:
+            return
+        data['objects'].append(obj)
+        
+        # Pobierz materiały
+        for mat in obj.data.materials:
+            if mat:
+                conductivity, emissivity = self.get_material_properties(mat)
+                data['materials'][mat.name] = {
+                    'conductivity': conductivity,
+                    'emissivity': emissivity
+                }
+    
     def get_material_properties(self, material):
         """Pobiera właściwości materiału"""
         conductivity = "0.04"  # domyślna wartość
@@ -84,205 +82,68 @@ class THERMUSectionExporter:
     
     def find_adiabatic_edges(self, mesh_objects, ti_curve, te_curve):
         """Znajduje krawędzie adiabatyczne (nieprzypisane do Ti/Te)"""
-        adiabatic_edges = []
+        polygons = [poly_data['coords'] for obj in mesh_objects if obj.type == 'MESH'
+                    for poly_data in self.get_polygons_from_mesh(obj)]
+        ti_points = self.get_curve_points(ti_curve) if ti_curve else []
+        te_points = self.get_curve_points(te_curve) if te_curve else []
+        return [(start, end) for _, start, end in usection_worker.find_adiabatic_edges(polygons, ti_points, te_points)]
+    
+    def snapshot_usection(self, curve_obj, filepath=""):
+        """Zbiera dane sekcji U ze sceny do słownika niezależnego od bpy (dla puli procesów)"""
+        data = self.get_geometry_nodes_values(curve_obj)
+        node_name = data['usection_name']
         
-        # Tutaj dodaj logikę znajdowania krawędzi adiabatycznych
-        # Na razie zwracamy pustą listę - trzeba dostosować do Twojej struktury
-        return adiabatic_edges
+        if not data['usection_name']:
+            data['usection_name'] = curve_obj.name.replace('USection_', 'U')
+            print(f"⚠️  Używam nazwy z obiektu: {data['usection_name']}")
+        
+        polygons = []
+        for obj in data['objects']:
+            if obj.type == 'MESH':
+                for poly_data in self.get_polygons_from_mesh(obj):
+                    polygons.append({
+                        'coords': [(float(x), float(y)) for x, y in poly_data['coords']],
+                        'material': poly_data['material'],
+                        'object': obj.name
+                    })
+        
+        props = bpy.context.scene.therm_props
+        clip = None
+        if props.usection_clip_enabled:
+            clip = {'width': props.usection_strip_width}
+        
+        return {
+            'usection_name': data['usection_name'],
+            'node_name': node_name,
+            'curve_name': curve_obj.name,
+            'thmx_path': filepath,
+            'materials': {name: dict(props) for name, props in data['materials'].items()},
+            'objects': [obj.name for obj in data['objects']],
+            'polygons': polygons,
+            'ti_name': data['ti_curve'].name if data['ti_curve'] else None,
+            'te_name': data['te_curve'].name if data['te_curve'] else None,
+            'ti_points': self.get_curve_points(data['ti_curve']) if data['ti_curve'] else [],
+            'te_points': self.get_curve_points(data['te_curve']) if data['te_curve'] else [],
+            'curve_points': self.get_curve_points(curve_obj),
+            'clip': clip,
+            'mesh_control': therm_export.mesh_control_settings(props)
+        }
     
     def export_usection_thmx(self, curve_obj, filepath):
         """Eksportuje pojedynczą sekcję U do pliku .thmx z właściwą geometrią"""
         try:
-            # Pobierz dane z Geometry Nodes
-            data = self.get_geometry_nodes_values(curve_obj)
-            
-            if not data['usection_name']:
-                data['usection_name'] = curve_obj.name.replace('USection_', 'U')
-                print(f"⚠️  Używam nazwy z obiektu: {data['usection_name']}")
-            
-            print(f"📦 Eksportowanie {data['usection_name']} do {filepath}...")
-            print(f"   Obiekty: {[obj.name for obj in data['objects']]}")
-            print(f"   Ti: {data['ti_curve'].name if data['ti_curve'] else 'Brak'}")
-            print(f"   Te: {data['te_curve'].name if data['te_curve'] else 'Brak'}")
-            
-            # Utwórz strukturę XML dla THERM
-            therm_xml = ET.Element("THERM-XML")
-            therm_xml.set("xmlns", "http://windows.lbl.gov")
+            snapshot = self.snapshot_usection(curve_obj, filepath)
             
-            # Nagłówek
-            ET.SubElement(therm_xml, "ThermVersion").text = "Version 7.8.74.0"
-            ET.SubElement(therm_xml, "FileVersion").text = "1"
-            ET.SubElement(therm_xml, "SaveDate").text = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-            ET.SubElement(therm_xml, "Title").text = data['usection_name']
-            ET.SubElement(therm_xml, "CreatedBy").text = "Blender THERM Exporter"
-            ET.SubElement(therm_xml, "Company").text = ""
-            ET.SubElement(therm_xml, "Client").text = ""
-            ET.SubElement(therm_xml, "CrossSectionType").text = "Sill"
-            ET.SubElement(therm_xml, "Notes").text = f"Auto-generated from {curve_obj.name}"
-            ET.SubElement(therm_xml, "Units").text = "SI"
+            print(f"📦 Eksportowanie {snapshot['usection_name']} do {filepath}...")
+            print(f"   Obiekty: {snapshot['objects']}")
+            print(f"   Ti: {snapshot['ti_name'] or 'Brak'}")
+            print(f"   Te: {snapshot['te_name'] or 'Brak'}")
             
-            # Kontrola siatki
-            mesh_control = ET.SubElement(therm_xml, "MeshControl")
-            mesh_control.set("MeshLevel", "8")
-            mesh_control.set("ErrorCheckFlag", "1")
-            mesh_control.set("ErrorLimit", "10.00")
-            mesh_control.set("MaxIterations", "10")
-            mesh_control.set("CMAflag", "0")
-            
-            # Materiały
-            materials_elem = ET.SubElement(therm_xml, "Materials")
-            for i, (mat_name, mat_props) in enumerate(data['materials'].items(), 1):
-                material_elem = ET.SubElement(materials_elem, "Material",
-                                        Name=mat_name,
-                                        Index=str(i),
-                                        Type="0",
-                                        Conductivity=mat_props['conductivity'],
-                                        Tir="0.00",
-                                        EmissivityFront=mat_props['emissivity'],
-                                        EmissivityBack=mat_props['emissivity'],
-                                        RGBColor="0x808080")
-                
-                # Dodaj właściwości materiału
-                for side, range_type, specularity in [
-                    ("Front", "Visible", "Direct"), ("Front", "Visible", "Diffuse"),
-                    ("Front", "Solar", "Direct"), ("Front", "Solar", "Diffuse"),
-                    ("Back", "Visible", "Direct"), ("Back", "Visible", "Diffuse"),
-                    ("Back", "Solar", "Direct"), ("Back", "Solar", "Diffuse")
-                ]:
-                    ET.SubElement(material_elem, "Property",
-                                Side=side, Range=range_type, Specularity=specularity,
-                                T="0.00", R="0.00")
-            
-            # Jeśli brak materiałów, dodaj domyślny
-            if not data['materials']:
-                material_elem = ET.SubElement(materials_elem, "Material",
-                                        Name="DefaultMaterial",
-                                        Index="1",
-                                        Type="0",
-                                        Conductivity="0.04",
-                                        Tir="0.00",
-                                        EmissivityFront="0.90",
-                                        EmissivityBack="0.90",
-                                        RGBColor="0x808080")
-                
-                for side, range_type, specularity in [
-                    ("Front", "Visible", "Direct"), ("Front", "Visible", "Diffuse"),
-                    ("Front", "Solar", "Direct"), ("Front", "Solar", "Diffuse"),
-                    ("Back", "Visible", "Direct"), ("Back", "Visible", "Diffuse"),
-                    ("Back", "Solar", "Direct"), ("Back", "Solar", "Diffuse")
-                ]:
-                    ET.SubElement(material_elem, "Property",
-                                Side=side, Range=range_type, Specularity=specularity,
-                                T="0.00", R="0.00")
-            
-            # Warunki brzegowe
-            boundary_conditions = ET.SubElement(therm_xml, "BoundaryConditions")
-            
-            # Dodaj warunki Ti i Te
-            if data['ti_curve']:
-                ET.SubElement(boundary_conditions, "BoundaryCondition",
-                            Name="Ti", Type="0", H="7.69", HeatFLux="0.00", 
-                            Temperature="20.00", RGBColor="0xFF0000")
-            
-            if data['te_curve']:
-                ET.SubElement(boundary_conditions, "BoundaryCondition",
-                            Name="Te", Type="0", H="25.00", HeatFLux="0.00",
-                            Temperature="-20.00", RGBColor="0x0000FF")
-            
-            # Warunek adiabatyczny
-            ET.SubElement(boundary_conditions, "BoundaryCondition",
-                        Name="Adiabatic", Type="0", H="0.00", HeatFLux="0.00",
-                        Temperature="0.00", RGBColor="0x808080")
-            
-            # Polygony (geometria) - EKSPORTUJ RZECZYWISTĄ GEOMETRIĘ
-            polygons = ET.SubElement(therm_xml, "Polygons")
-            polygon_id = 1
-            
-            for obj in data['objects']:
-                if obj.type == 'MESH':
-                    mesh_polygons = self.get_polygons_from_mesh(obj)
-                    
-                    for poly_data in mesh_polygons:
-                        material_name = "DefaultMaterial"
-                        if obj.data.materials and poly_data['material_index'] < len(obj.data.materials):
-                            material = obj.data.materials[poly_data['material_index']]
-                            if material:
-                                material_name = material.name
-                        
-                        polygon = ET.SubElement(polygons, "Polygon",
-                                            ID=str(polygon_id), 
-                                            Material=material_name,
-                                            NSides=str(poly_data['num_sides']),
-                                            Type="1", 
-                                            units="mm")
-                        
-                        for index, x, y in poly_data['points']:
-                            ET.SubElement(polygon, "Point", index=index, x=x, y=y)
-                        
-                        polygon_id += 1
-            
-            # Warunki brzegowe jako krzywe
-            boundaries = ET.SubElement(therm_xml, "Boundaries")
-            boundary_id = polygon_id
-            
-            # Eksportuj krzywe Ti
-            if data['ti_curve']:
-                ti_points = self.get_curve_points(data['ti_curve'])
-                if len(ti_points) >= 2:
-                    bc_polygon = ET.SubElement(boundaries, "BCPolygon",
-                                            ID=str(boundary_id), 
-                                            BC="Ti",
-                                            units="mm", 
-                                            MaterialName="",
-                                            PolygonID="1",
-                                            EnclosureID="0", 
-                                            UFactorTag="",
-                                            Emissivity="0.90",
-                                            MaterialSide="Front", 
-                                            IlluminatedSurface="FALSE")
-                    
-                    for i, (x, y) in enumerate(ti_points[:2]):  # Tylko pierwsze 2 punkty
-                        ET.SubElement(bc_polygon, "Point", index=str(i), 
-                                    x=self.format_therm_value(x), 
-                                    y=self.format_therm_value(y))
-                    
-                    boundary_id += 1
-            
-            # Eksportuj krzywe Te
-            if data['te_curve']:
-                te_points = self.get_curve_points(data['te_curve'])
-                if len(te_points) >= 2:
-                    bc_polygon = ET.SubElement(boundaries, "BCPolygon",
-                                            ID=str(boundary_id), 
-                                            BC="Te",
-                                            units="mm", 
-                                            MaterialName="",
-                                            PolygonID="1",
-                                            EnclosureID="0", 
-                                            UFactorTag="",
-                                            Emissivity="0.90",
-                                            MaterialSide="Front", 
-                                            IlluminatedSurface="FALSE")
-                    
-                    for i, (x, y) in enumerate(te_points[:2]):  # Tylko pierwsze 2 punkty
-                        ET.SubElement(bc_polygon, "Point", index=str(i), 
-                                    x=self.format_therm_value(x), 
-                                    y=self.format_therm_value(y))
-                    
-                    boundary_id += 1
-            
-            # Formatuj i zapisz XML
-            self.indent_xml(therm_xml)
-            
-            # Zapisz plik
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write('<?xml version="1.0"?>\n')
-                tree = ET.ElementTree(therm_xml)
-                tree.write(f, encoding='unicode')
+            polygon_count, boundary_count = usection_worker.write_usection_thmx(snapshot, filepath)
             
             print(f"✅ Wyeksportowano: {filepath}")
-            print(f"   Polygony: {polygon_id-1}")
-            print(f"   Boundary conditions: {boundary_id - polygon_id}")
+            print(f"   Polygony: {polygon_count}")
+            print(f"   Boundary conditions: {boundary_count}")
             return True
             
         except Exception as e:
@@ -291,106 +152,80 @@ class THERMUSectionExporter:
             traceback.print_exc()
             return False
 
-    def export_to_excel_with_additional_heat_flows(self, thmx_filepath, excel_filepath):
-        """Eksportuje wyniki do Excela z wszystkimi strumieniami ciepła"""
-        try:
-            import openpyxl
-            
-            # Sprawdź czy plik THMX istnieje
-            if not os.path.exists(thmx_filepath):
-                print(f"❌ Plik THMX nie istnieje: {thmx_filepath}")
-                return False
-            
-            # Parsuj plik THMX
-            tree = ET.parse(thmx_filepath)
-            root = tree.getroot()
-            
-            # Znajdź wszystkie U-factors z różnymi Tagami
-            heat_flows = {}
-            
-            # Szukaj wszystkich sekcji U-factors
-            for ufactors_elem in root.findall('.//U-factors'):
-                tag_elem = ufactors_elem.find('Tag')
-                if tag_elem is not None and tag_elem.text:
-                    tag_name = tag_elem.text.strip()
-                    
-                    # Dla każdego Tag szukamy wartości U-factor dla "Total length"
-                    ufactor_value = None
-                    
-                    for projection in ufactors_elem.findall('Projection'):
-                        length_type = projection.find('Length-type')
-                        if length_type is not None and length_type.text == 'Total length':
-                            ufactor_elem = projection.find('U-factor')
-                            if ufactor_elem is not None:
-                                # Sprawdź czy wartość jest w atrybucie 'value'
-                                if 'value' in ufactor_elem.attrib:
-                                    ufactor_value = ufactor_elem.attrib['value']
-                                # Sprawdź czy wartość jest w treści elementu
-                                elif ufactor_elem.text and ufactor_elem.text.strip():
-                                    ufactor_value = ufactor_elem.text.strip()
-                                break
-                    
-                    # Zapisz wartość jeśli znaleziono i nie jest "NA"
-                    if ufactor_value and ufactor_value != 'NA':
-                        try:
-                            heat_flows[tag_name] = float(ufactor_value)
-                        except ValueError:
-                            # Jeśli nie można przekonwertować na float, zapisz jako string
-                            heat_flows[tag_name] = ufactor_value
-            
-            print(f"📊 Znalezione strumienie ciepła: {heat_flows}")
-            
-            # Otwórz plik Excel
-            if os.path.exists(excel_filepath):
-                wb = openpyxl.load_workbook(excel_filepath)
+    def export_usection_curves(self, usection_curves, base_dir, base_name, object_name_fallback=False):
+        """Eksportuje sekcje U w puli procesów - dane ze sceny zbierane są w wątku głównym"""
+        snapshots = []
+        
+        for curve_obj in usection_curves:
+            try:
+                snapshot = self.snapshot_usection(curve_obj)
+            except Exception as e:
+                print(f"❌ Błąd odczytu sekcji {curve_obj.name}: {e}")
+                continue
+            
+            if object_name_fallback:
+                usection_name = snapshot['node_name'] or curve_obj.name
             else:
-                wb = openpyxl.Workbook()
-                # Jeśli tworzymy nowy plik, ustaw domyślny arkusz
-                ws = wb.active
-                ws.title = "THERM Results"
-            
-            # Wybierz aktywny arkusz
-            ws = wb.active
-            
-            # Przygotuj listę strumieni do eksportu (maksymalnie 6)
-            heat_flow_list = list(heat_flows.items())[:6]
-            
-            # Wstaw nazwy strumieni do komórek B22, D22, F22, H22, J22, L22
-            heat_flow_headers = ['B22', 'D22', 'F22', 'H22', 'J22', 'L22']
-            
-            # Wstaw wartości strumieni do komórek B24, D24, F24, H24, J24, L24
-            heat_flow_values = ['B24', 'D24', 'F24', 'H24', 'J24', 'L24']
-            
-            # Wyczyść poprzednie dane
-            for header_cell in heat_flow_headers:
-                ws[header_cell] = ""
-            
-            for value_cell in heat_flow_values:
-                ws[value_cell] = ""
+                usection_name = snapshot['usection_name']
             
-            # Wstaw dane do Excela
-            for i, (flow_name, flow_value) in enumerate(heat_flow_list):
-                if i < len(heat_flow_headers):
-                    # Wstaw nazwę strumienia
-                    ws[heat_flow_headers[i]] = flow_name
-                    # Wstaw wartość strumienia
-                    ws[heat_flow_values[i]] = flow_value
-                    print(f"   📝 {flow_name}: {flow_value} -> {heat_flow_headers[i]}/{heat_flow_values[i]}")
-            
-            # Jeśli brakuje danych, wyświetl informację
-            if len(heat_flow_list) < 6:
-                print(f"   ℹ️  Znaleziono tylko {len(heat_flow_list)} strumieni z 6 możliwych")
-            
-            # Zapisz plik Excel
-            wb.save(excel_filepath)
-            print(f"✅ Wyeksportowano {len(heat_flow_list)} strumieni ciepła do: {excel_filepath}")
-            return True
-            
-        except Exception as e:
-            print(f"❌ Błąd eksportu do Excel: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+            snapshot['thmx_path'] = os.path.join(base_dir, f"{base_name}-{usection_name}.thmx")
+            snapshots.append(snapshot)
+        
+        results = self.run_export_jobs(snapshots)
+        return [result['thmx'] for result in results if result['success']]
+    
+    def run_export_jobs(self, snapshots):
+        """Zapisuje pliki .thmx dla migawek sekcji U (pula procesów z awaryjnym trybem szeregowym)"""
+        if not snapshots:
+            return []
+        
+        total = len(snapshots)
+        max_workers = min(total, os.cpu_count() or 1)
+        results = []
+        started = time.perf_counter()
+        
+        def report(result):
+            results.append(result)
+            name = result['usection_name']
+            if result['success']:
+                print(f"   [{len(results)}/{total}] ✅ {name}: {result.get('polygons', 0)} polygonów, "
+                      f"{result['elapsed']:.2f} s")
+            else:
+                print(f"   [{len(results)}/{total}] ❌ {name}: {result['error']}")
+        
+        pending = list(snapshots)
+        
+        if max_workers > 1:
+            print(f"⚙️  Eksport {total} sekcji U w {max_workers} procesach...")
+            try:
+                context = multiprocessing.get_context('spawn')
+                with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+                    futures = {executor.submit(usection_worker.process_usection, snapshot): snapshot
+                               for snapshot in snapshots}
+                    for future in as_completed(futures):
+                        snapshot = futures[future]
+                        try:
+                            result = future.result()
+                        except BrokenProcessPool:
+                            raise
+                        except Exception as e:
+                            result = {'usection_name': snapshot['usection_name'], 'thmx': snapshot['thmx_path'],
+                                      'success': False,
+                                      'error': f"{e.__class__.__name__}: {e}", 'elapsed': 0.0}
+                        pending.remove(snapshot)
+                        report(result)
+            except (OSError, BrokenProcessPool, RuntimeError) as e:
+                print(f"⚠️  Pula procesów niedostępna ({e}) - eksport szeregowy {len(pending)} sekcji")
+        
+        for snapshot in pending:
+            report(usection_worker.process_usection(snapshot))
+        
+        failed = [result['usection_name'] for result in results if not result['success']]
+        print(f"⏱️  Eksport sekcji U: {time.perf_counter() - started:.2f} s")
+        if failed:
+            print(f"⚠️  Nieudane sekcje: {', '.join(failed)}")
+        
+        return results
         
     def export_selected_usections(self, context):
         """Eksportuje TYLKO ZAZNACZONE U-Sections"""
@@ -430,28 +265,7 @@ class THERMUSectionExporter:
             base_dir = os.path.dirname(blend_filepath)
             base_name = os.path.splitext(os.path.basename(blend_filepath))[0]
             
-            exported_files = []
-            
-            # Eksportuj każdą ZAZNACZONĄ sekcję U
-            for curve_obj in selected_usection_curves:
-                # Pobierz nazwę USection
-                data = self.get_geometry_nodes_values(curve_obj)
-                usection_name = data['usection_name'] or curve_obj.name.replace('USection_', 'U')
-                
-                # Utwórz nazwę pliku
-                filename = f"{base_name}-{usection_name}.thmx"
-                filepath = os.path.join(base_dir, filename)
-                
-                print(f"🎯 Eksportuję ZAZNACZONĄ sekcję: {usection_name} -> {filename}")
-                
-                # Eksportuj
-                if self.export_usection_thmx(curve_obj, filepath):
-                    exported_files.append(filepath)
-                    
-                    # Eksportuj do Excela z dodatkowymi strumieniami ciepła
-                    excel_filename = f"{base_name}-{usection_name}_results.xlsx"
-                    excel_filepath = os.path.join(base_dir, excel_filename)
-                    self.export_to_excel_with_additional_heat_flows(filepath, excel_filepath)
+            exported_files = self.export_usection_curves(selected_usection_curves, base_dir, base_name)
             
             print(f"📦 Wyeksportowano {len(exported_files)} ZAZNACZONYCH plików U-Section")
             return exported_files
@@ -462,32 +276,7 @@ class THERMUSectionExporter:
 
     def get_polygons_from_mesh(self, obj):
         """Pobiera polygony z obiektu siatki"""
-        mesh = obj.data
-        world_matrix = obj.matrix_world
-        
-        polygons_data = []
-        
-        for poly_index, polygon in enumerate(mesh.polygons):
-            points = []
-            
-            for loop_index in polygon.loop_indices:
-                loop = mesh.loops[loop_index]
-                vert = mesh.vertices[loop.vertex_index]
-                world_vert = world_matrix @ vert.co
-                
-                # Konwertuj metry na milimetry i zaokrąglij
-                x = round(world_vert.x * 1000, 2)
-                y = round(world_vert.y * 1000, 2)
-                points.append((str(len(points)), self.format_therm_value(x), self.format_therm_value(y)))
-            
-            if len(points) >= 3:
-                polygons_data.append({
-                    'points': points,
-                    'num_sides': len(points),
-                    'material_index': polygon.material_index
-                })
-        
-        return polygons_data
+        return therm_export.get_all_polygons_from_mesh(obj, cache=self.mesh_cache)
 
     def get_curve_points(self, curve_obj):
         """Pobiera punkty z krzywej"""
@@ -506,23 +295,12 @@ class THERMUSectionExporter:
 
     def format_therm_value(self, value):
         """Formatuje wartość dla THERM"""
-        return f"{float(value):.6f}"
+        return usection_worker.format_therm_value(value)
 
     def indent_xml(self, elem, level=0):
         """Formatuje XML z wcięciami"""
-        i = "\n" + level * "\t"
-        if len(elem):
-            if not elem.text or not elem.text.strip():
-                elem.text = i + "\t"
-            if not elem.tail or not elem.tail.strip():
-                elem.tail = i
-            for child in elem:
-                self.indent_xml(child, level + 1)
-            if not elem.tail or not elem.tail.strip():
-                elem.tail = i
-        else:
-            if level and (not elem.tail or not elem.tail.strip()):
-                elem.tail = i    
+        usection_worker.indent_xml(elem, level)
+
     def export_all_usections(self, context):
         """Eksportuje wszystkie U-Sections"""
         try:
@@ -545,26 +323,8 @@ class THERMUSectionExporter:
             base_dir = os.path.dirname(blend_filepath)
             base_name = os.path.splitext(os.path.basename(blend_filepath))[0]
             
-            exported_files = []
-            
-            # Eksportuj każdą sekcję U
-            for curve_obj in usection_curves:
-                # Pobierz nazwę USection
-                data = self.get_geometry_nodes_values(curve_obj)
-                usection_name = data['usection_name'] or curve_obj.name
-                
-                # Utwórz nazwę pliku
-                filename = f"{base_name}-{usection_name}.thmx"
-                filepath = os.path.join(base_dir, filename)
-                
-                # Eksportuj
-                if self.export_usection_thmx(curve_obj, filepath):
-                    exported_files.append(filepath)
-                    
-                    # Eksportuj do Excela z dodatkowymi strumieniami ciepła
-                    excel_filename = f"{base_name}-{usection_name}_results.xlsx"
-                    excel_filepath = os.path.join(base_dir, excel_filename)
-                    self.export_to_excel_with_additional_heat_flows(filepath, excel_filepath)
+            exported_files = self.export_usection_curves(usection_curves, base_dir, base_name,
+                                                         object_name_fallback=True)
             
             print(f"📦 Wyeksportowano {len(exported_files)} plików U-Section")
             return exported_files
@@ -575,57 +335,57 @@ class THERMUSectionExporter:
     
     def get_all_polygons_from_mesh(self, obj):
         """Pobiera WSZYSTKIE polygony z obiektu siatki - alternatywna wersja"""
-        mesh = obj.data
-        world_matrix = obj.matrix_world
-        
-        polygons_data = []
-        
-        for poly_index, polygon in enumerate(mesh.polygons):
-            points = []
-            
-            for loop_index in polygon.loop_indices:
-                loop = mesh.loops[loop_index]
-                vert = mesh.vertices[loop.vertex_index]
-                world_vert = world_matrix @ vert.co
-                
-                x = round(world_vert.x * 1000, 2)
-                y = round(world_vert.y * 1000, 2)
-                points.append((str(len(points)), self.format_therm_value(x), self.format_therm_value(y)))
-            
-            if len(points) >= 3:
-                polygons_data.append({
-                    'points': points,
-                    'num_sides': len(points),
-                    'material_index': polygon.material_index
-                })
-        
-        return polygons_data
+        return therm_export.get_all_polygons_from_mesh(obj, cache=self.mesh_cache)
     
-    def run_therm_calculations(self, filepaths):
-        """Uruchamia obliczenia THERM dla plików"""
+    def results_workbook_path(self, filepaths):
+        """Ścieżka zbiorczego skoroszytu wyników sekcji U"""
+        blend_filepath = bpy.data.filepath
+        if blend_filepath:
+            base_name = os.path.splitext(os.path.basename(blend_filepath))[0]
+            return os.path.join(os.path.dirname(blend_filepath), f"{base_name}_usections_results.xlsx")
+        return os.path.join(os.path.dirname(filepaths[0]), "usections_results.xlsx")
+    
+    def run_therm_calculations(self, filepaths, max_workers=None, excel_filepath=None):
+        """Uruchamia obliczenia THERM dla plików w puli wątków
+        
+        Zwraca listę wyników: plik, status, czas obliczeń i strumienie ciepła.
+        Strumienie wszystkich sekcji zapisywane są jednorazowo do zbiorczego skoroszytu.
+        """
         try:
             from . import therm_runner
             
             runner = therm_runner.THERMRunner()
-            success_count = 0
             
-            for filepath in filepaths:
-                print(f"🔄 Uruchamianie obliczeń dla: {os.path.basename(filepath)}")
-                
-                # Uruchom obliczenia
-                if runner._run_therm_calculation_thmx(filepath):
-                    success_count += 1
-                    print(f"✅ Ukończono obliczenia: {os.path.basename(filepath)}")
-                    
-                    # Po obliczeniach eksportuj wyniki do Excela
-                    excel_filepath = filepath.replace('.thmx', '_results.xlsx')
-                    self.export_to_excel_with_additional_heat_flows(filepath, excel_filepath)
-                else:
-                    print(f"❌ Błąd obliczeń: {os.path.basename(filepath)}")
-            
-            print(f"🎯 Ukończono {success_count}/{len(filepaths)} obliczeń")
-            return success_count
+            # Ustawienia ze sceny odczytywane w wątku głównym - wątki robocze nie używają bpy
+            props = bpy.context.scene.therm_props
+            runner.backend = runner.create_backend()
+            runner.timeout_policy = runner.create_timeout_policy()
+            runner.refinement = runner.create_refinement_settings()
+            if runner.backend is None:
+                return [{'thmx': filepath, 'success': False, 'heat_flows': {},
+                         'error': "Nie znaleziono THERM.exe", 'solve_time': 0.0, 'elapsed': 0.0}
+                        for filepath in filepaths]
+            
+            if max_workers is None:
+                max_workers = props.therm_max_workers
+            # Pula wątków w therm_scheduler - strumienie ciepła odczytywane zaraz po obliczeniach każdego pliku
+            results = runner.run_jobs(filepaths, reuse_results=props.reuse_results, max_workers=max_workers,
+                                      read_results=usection_worker.collect_heat_flows)
+            
+            if filepaths:
+                rows = [(usection_worker.section_name_for(result['thmx']), result['heat_flows'])
+                        for result in results if result['success']]
+                self.write_results_workbook(rows, excel_filepath or self.results_workbook_path(filepaths))
+            
+            return results
             
         except Exception as e:
             print(f"❌ Błąd uruchamiania obliczeń: {e}")
-            return 0
\ No newline at end of file
+            return []
+    
+    def write_results_workbook(self, rows, excel_filepath):
+        """Zapisuje strumienie ciepła sekcji (nazwa, {tag: wartość}) do jednego skoroszytu"""
+        if not rows:
+            print("ℹ️  Brak wyników do zapisania w Excelu")
+            return False
+        return usection_worker.write_heat_flow_workbook(rows, excel_filepath)
@@ -0,0 +1,323 @@
+import math
+import os
+import time
+import traceback
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+try:
+    from . import therm_geometry, therm_results, therm_refine
+except ImportError:
+    import therm_geometry
+    import therm_results
+    import therm_refine
+
+# Zapis plików sekcji U bez zależności od bpy - moduł jest importowany także
+# w procesach roboczych puli, które nie mają dostępu do Blendera.
+
+MATERIAL_PROPERTY_LAYOUT = [
+    ("Front", "Visible", "Direct"), ("Front", "Visible", "Diffuse"),
+    ("Front", "Solar", "Direct"), ("Front", "Solar", "Diffuse"),
+    ("Back", "Visible", "Direct"), ("Back", "Visible", "Diffuse"),
+    ("Back", "Solar", "Direct"), ("Back", "Solar", "Diffuse")
+]
+
+# Odległość [mm], w której krawędź uznawana jest za pokrytą krzywą Ti/Te
+ADIABATIC_TOLERANCE = 0.1
+
+def format_therm_value(value):
+    """Formatuje wartość dla THERM"""
+    return f"{float(value):.6f}"
+
+def indent_xml(elem, level=0):
+    """Formatuje XML z wcięciami"""
+    i = "\n" + level * "\t"
+    if len(elem):
+        if not elem.text or not elem.text.strip():
+            elem.text = i + "\t"
+        if not elem.tail or not elem.tail.strip():
+            elem.tail = i
+        for child in elem:
+            indent_xml(child, level + 1)
+        if not elem.tail or not elem.tail.strip():
+            elem.tail = i
+    else:
+        if level and (not elem.tail or not elem.tail.strip()):
+            elem.tail = i
+
+def _add_material(materials_elem, name, index, conductivity, emissivity):
+    material_elem = ET.SubElement(materials_elem, "Material",
+                                  Name=name,
+                                  Index=str(index),
+                                  Type="0",
+                                  Conductivity=conductivity,
+                                  Tir="0.00",
+                                  EmissivityFront=emissivity,
+                                  EmissivityBack=emissivity,
+                                  RGBColor="0x808080")
+
+    for side, range_type, specularity in MATERIAL_PROPERTY_LAYOUT:
+        ET.SubElement(material_elem, "Property",
+                      Side=side, Range=range_type, Specularity=specularity,
+                      T="0.00", R="0.00")
+
+def _add_bc_polygon(boundaries, boundary_id, bc_name, points, polygon_id=1, material_name=""):
+    bc_polygon = ET.SubElement(boundaries, "BCPolygon",
+                               ID=str(boundary_id),
+                               BC=bc_name,
+                               units="mm",
+                               MaterialName=material_name,
+                               PolygonID=str(polygon_id),
+                               EnclosureID="0",
+                               UFactorTag="",
+                               Emissivity="0.90",
+                               MaterialSide="Front",
+                               IlluminatedSurface="FALSE")
+
+    for i, (x, y) in enumerate(points):
+        ET.SubElement(bc_polygon, "Point", index=str(i),
+                      x=format_therm_value(x),
+                      y=format_therm_value(y))
+
+def find_adiabatic_edges(polygons, ti_points, te_points, tolerance=ADIABATIC_TOLERANCE):
+    """Krawędzie zewnętrzne nieobjęte krzywymi Ti/Te - (indeks polygonu, początek, koniec)"""
+    bc_segments = [points[:2] for points in (ti_points, te_points) if len(points) >= 2]
+    return [(poly_index, start, end)
+            for poly_index, start, end in therm_geometry.find_external_edges(polygons)
+            if not any(therm_geometry.segment_covers_edge(segment, start, end, tolerance)
+                       for segment in bc_segments)]
+
+def build_usection_xml(snapshot):
+    """Buduje drzewo THERM-XML sekcji U na podstawie migawki danych ze sceny
+
+    Zwraca (element główny, liczba polygonów, liczba warunków brzegowych).
+    """
+    therm_xml = ET.Element("THERM-XML")
+    therm_xml.set("xmlns", "http://windows.lbl.gov")
+
+    # Nagłówek
+    ET.SubElement(therm_xml, "ThermVersion").text = "Version 7.8.74.0"
+    ET.SubElement(therm_xml, "FileVersion").text = "1"
+    ET.SubElement(therm_xml, "SaveDate").text = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    ET.SubElement(therm_xml, "Title").text = snapshot['usection_name']
+    ET.SubElement(therm_xml, "CreatedBy").text = "Blender THERM Exporter"
+    ET.SubElement(therm_xml, "Company").text = ""
+    ET.SubElement(therm_xml, "Client").text = ""
+    ET.SubElement(therm_xml, "CrossSectionType").text = "Sill"
+    ET.SubElement(therm_xml, "Notes").text = f"Auto-generated from {snapshot['curve_name']}"
+    ET.SubElement(therm_xml, "Units").text = "SI"
+
+    # Kontrola siatki
+    mesh_control = ET.SubElement(therm_xml, "MeshControl")
+    therm_refine.apply_mesh_control(mesh_control, snapshot.get('mesh_control'))
+
+    # Materiały
+    materials_elem = ET.SubElement(therm_xml, "Materials")
+    for i, (mat_name, mat_props) in enumerate(snapshot['materials'].items(), 1):
+        _add_material(materials_elem, mat_name, i, mat_props['conductivity'], mat_props['emissivity'])
+
+    # Jeśli brak materiałów, dodaj domyślny
+    if not snapshot['materials']:
+        _add_material(materials_elem, "DefaultMaterial", 1, "0.04", "0.90")
+
+    # Warunki brzegowe
+    boundary_conditions = ET.SubElement(therm_xml, "BoundaryConditions")
+
+    if snapshot['ti_points']:
+        ET.SubElement(boundary_conditions, "BoundaryCondition",
+                      Name="Ti", Type="0", H="7.69", HeatFLux="0.00",
+                      Temperature="20.00", RGBColor="0xFF0000")
+
+    if snapshot['te_points']:
+        ET.SubElement(boundary_conditions, "BoundaryCondition",
+                      Name="Te", Type="0", H="25.00", HeatFLux="0.00",
+                      Temperature="-20.00", RGBColor="0x0000FF")
+
+    # Warunek adiabatyczny
+    ET.SubElement(boundary_conditions, "BoundaryCondition",
+                  Name="Adiabatic", Type="0", H="0.00", HeatFLux="0.00",
+                  Temperature="0.00", RGBColor="0x808080")
+
+    # Polygony (geometria)
+    polygons = ET.SubElement(therm_xml, "Polygons")
+    polygon_id = 1
+
+    for poly_data in snapshot['polygons']:
+        coords = poly_data['coords']
+        polygon = ET.SubElement(polygons, "Polygon",
+                                ID=str(polygon_id),
+                                Material=poly_data['material'],
+                                NSides=str(len(coords)),
+                                Type="1",
+                                units="mm")
+
+        for index, (x, y) in enumerate(coords):
+            ET.SubElement(polygon, "Point", index=str(index),
+                          x=format_therm_value(x), y=format_therm_value(y))
+
+        polygon_id += 1
+
+    # Warunki brzegowe jako krzywe
+    boundaries = ET.SubElement(therm_xml, "Boundaries")
+    boundary_id = polygon_id
+
+    for bc_name, points in (("Ti", snapshot['ti_points']), ("Te", snapshot['te_points'])):
+        if len(points) >= 2:
+            _add_bc_polygon(boundaries, boundary_id, bc_name, points[:2])  # Tylko pierwsze 2 punkty
+            boundary_id += 1
+
+    # Pozostałe krawędzie zewnętrzne (cięcia pasa, boki) jako warunek adiabatyczny
+    polygon_coords = [poly_data['coords'] for poly_data in snapshot['polygons']]
+    for poly_index, start, end in find_adiabatic_edges(polygon_coords, snapshot['ti_points'], snapshot['te_points']):
+        _add_bc_polygon(boundaries, boundary_id, "Adiabatic", [start, end],
+                        polygon_id=poly_index + 1, material_name=snapshot['polygons'][poly_index]['material'])
+        boundary_id += 1
+
+    return therm_xml, polygon_id - 1, boundary_id - polygon_id
+
+def _unit_direction(points):
+    if len(points) < 2:
+        return None
+    dx = points[1][0] - points[0][0]
+    dy = points[1][1] - points[0][1]
+    length = math.hypot(dx, dy)
+    if length == 0:
+        return None
+    return (dx / length, dy / length), length
+
+def usection_strip(snapshot):
+    """Półpłaszczyzny pasa sekcji U: kierunek z krzywej Ti (lub Te), środek na krzywej sekcji"""
+    clip = snapshot.get('clip')
+    if not clip:
+        return []
+
+    oriented = _unit_direction(snapshot['ti_points']) or _unit_direction(snapshot['te_points'])
+    if not oriented:
+        return []
+    direction, bc_length = oriented
+
+    reference = snapshot.get('curve_points') or snapshot['ti_points'] or snapshot['te_points']
+    center = ((reference[0][0] + reference[1][0]) / 2, (reference[0][1] + reference[1][1]) / 2)
+
+    half_width = clip['width'] / 2 if clip.get('width', 0) > 0 else bc_length / 2
+    start = (center[0] - direction[0] * half_width, center[1] - direction[1] * half_width)
+    end = (center[0] + direction[0] * half_width, center[1] + direction[1] * half_width)
+
+    # Głębokość pasa: od powierzchni Ti do Te (rzuty na normalną) - materiał poza Te nie należy do sekcji
+    depth_range = None
+    if snapshot['ti_points'] and snapshot['te_points']:
+        normal = (-direction[1], direction[0])
+        depths = [(x - start[0]) * normal[0] + (y - start[1]) * normal[1]
+                  for x, y in snapshot['ti_points'][:2] + snapshot['te_points'][:2]]
+        depth_range = (min(depths), max(depths))
+
+    return therm_geometry.strip_halfplanes(start, end, half_width, depth_range)
+
+def clip_usection_geometry(snapshot):
+    """Przycina polygony i krzywe Ti/Te do pasa sekcji U (zwraca nową migawkę)"""
+    halfplanes = usection_strip(snapshot)
+    if not halfplanes:
+        return snapshot
+
+    polygons = []
+    for poly_data in snapshot['polygons']:
+        for coords in therm_geometry.clip_polygon_to_halfplanes(poly_data['coords'], halfplanes):
+            polygons.append(dict(poly_data, coords=coords))
+
+    # Krzywe warunków brzegowych przycinane tylko wzdłuż szerokości pasa
+    width_planes = halfplanes[:2]
+    clipped = dict(snapshot, polygons=polygons)
+    for key in ('ti_points', 'te_points'):
+        points = snapshot[key]
+        if len(points) >= 2:
+            segment = therm_geometry.clip_segment_to_halfplanes(points[0], points[1], width_planes)
+            clipped[key] = list(segment) if segment else []
+
+    return clipped
+
+def write_usection_thmx(snapshot, filepath):
+    """Zapisuje sekcję U do pliku .thmx"""
+    snapshot = clip_usection_geometry(snapshot)
+    therm_xml, polygon_count, boundary_count = build_usection_xml(snapshot)
+    indent_xml(therm_xml)
+
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0"?>\n')
+        tree = ET.ElementTree(therm_xml)
+        tree.write(f, encoding='unicode')
+
+    return polygon_count, boundary_count
+
+def read_heat_flows(thmx_filepath):
+    """Odczytuje wartości U-factor ("Total length") dla wszystkich tagów z pliku .thmx"""
+    return therm_results.read_ufactors(thmx_filepath)
+
+def write_heat_flow_workbook(rows, excel_filepath):
+    """Zapisuje strumienie ciepła wszystkich sekcji do jednego skoroszytu (jeden wiersz na sekcję)
+
+    rows: lista (nazwa sekcji, {tag: wartość}). Kolumny tagów w kolejności pierwszego wystąpienia.
+    """
+    try:
+        import openpyxl
+
+        tags = []
+        for _, heat_flows in rows:
+            for tag in heat_flows:
+                if tag not in tags:
+                    tags.append(tag)
+
+        # Tryb write-only: wiersze trafiają strumieniowo do pliku, bez budowania arkusza w pamięci
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("THERM Results")
+        ws.append(["Sekcja"] + tags)
+
+        for section_name, heat_flows in rows:
+            ws.append([section_name] + [heat_flows.get(tag) for tag in tags])
+
+        wb.save(excel_filepath)
+        print(f"✅ Wyeksportowano {len(rows)} sekcji ({len(tags)} strumieni ciepła) do: {excel_filepath}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Błąd eksportu do Excel: {e}")
+        traceback.print_exc()
+        return False
+
+def section_name_for(thmx_filepath):
+    """Nazwa wiersza sekcji w skoroszycie wyników"""
+    return os.path.splitext(os.path.basename(thmx_filepath))[0]
+
+def collect_heat_flows(thmx_filepath):
+    """Odczytuje strumienie ciepła pliku .thmx (pusty słownik przy braku wyników lub błędzie)"""
+    if not os.path.exists(thmx_filepath):
+        print(f"❌ Plik THMX nie istnieje: {thmx_filepath}")
+        return {}
+    try:
+        return read_heat_flows(thmx_filepath)
+    except Exception as e:
+        print(f"❌ Błąd odczytu wyników {os.path.basename(thmx_filepath)}: {e}")
+        return {}
+
+def process_usection(snapshot):
+    """Zadanie puli: zapis pliku .thmx dla jednej sekcji U"""
+    started = time.perf_counter()
+    result = {
+        'usection_name': snapshot['usection_name'],
+        'thmx': snapshot['thmx_path'],
+        'success': False,
+        'error': None,
+        'elapsed': 0.0
+    }
+
+    try:
+        polygon_count, boundary_count = write_usection_thmx(snapshot, snapshot['thmx_path'])
+        result['success'] = True
+        result['polygons'] = polygon_count
+        result['boundaries'] = boundary_count
+
+    except Exception as e:
+        result['error'] = f"{e.__class__.__name__}: {e}"
+        traceback.print_exc()
+
+    result['elapsed'] = time.perf_counter() - started
+    return result
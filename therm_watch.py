@@ -0,0 +1,186 @@
+import os
+import time
+import struct
+import ctypes
+import ctypes.util
+import platform
+
+# Obserwacja plików wynikowych THERM (bez zależności od bpy)
+#
+# THERM potrafi zapisać wyniki długo przed zakończeniem procesu. Obserwator
+# folderu roboczego zadania wykrywa zmiany plików - na Linuksie przez inotify
+# (ctypes, bez dodatkowych pakietów), gdzie indziej przez porównywanie rozmiaru
+# i czasu modyfikacji. Zadanie uznaje się za gotowe, gdy plik .thmx został
+# zapisany na nowo, zawiera sekcję Results i żaden plik wynikowy nie zmienił się
+# przez QUIET_SECONDS. Sekcja Results z poprzednich obliczeń nie wystarcza.
+
+QUIET_SECONDS = 3.0
+TAIL_BYTES = 64 * 1024
+RESULTS_END_TAG = b'</Results>'
+
+# Stałe inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct('iIII')
+
+def results_written(thmx_filepath):
+    """Czy plik .thmx kończy się zamkniętą sekcją Results (czytany jest tylko koniec pliku)"""
+    try:
+        with open(thmx_filepath, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - TAIL_BYTES))
+            return RESULTS_END_TAG in f.read()
+    except OSError:
+        return False
+
+class PollingWatcher:
+    """Zmiany plików wykrywane porównaniem rozmiaru i czasu modyfikacji"""
+
+    def __init__(self, directory, paths):
+        self.directory = directory
+        self.paths = list(paths)
+        self.last_change = time.time()
+        self._signature = self._stat()
+
+    def _stat(self):
+        signature = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+        return signature
+
+    def poll(self):
+        """True, jeśli od poprzedniego wywołania zmienił się któryś plik"""
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        self.last_change = time.time()
+        return True
+
+    def quiet_for(self):
+        return time.time() - self.last_change
+
+    def close(self):
+        pass
+
+class InotifyWatcher(PollingWatcher):
+    """Zmiany plików zgłaszane przez jądro Linuksa (inotify) - bez odpytywania dysku"""
+
+    def __init__(self, directory, paths, libc):
+        self._libc = libc
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, "inotify_add_watch")
+        super().__init__(directory, paths)
+        self._names = {os.fsencode(os.path.basename(path)) for path in self.paths}
+
+    def poll(self):
+        changed = False
+        while True:
+            try:
+                data = os.read(self._fd, 4096)
+            except BlockingIOError:
+                break
+            except OSError:
+                # Deskryptor nieczynny - dalej jak przy odpytywaniu
+                return super().poll()
+            offset = 0
+            while offset + INOTIFY_EVENT.size <= len(data):
+                _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                name = data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + length].rstrip(b'\0')
+                offset += INOTIFY_EVENT.size + length
+                # Przepełniona kolejka zdarzeń - zmiana mogła przepaść
+                if name in self._names or mask & IN_Q_OVERFLOW:
+                    changed = True
+        if changed:
+            self.last_change = time.time()
+        return changed
+
+    def close(self):
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+_libc = None
+
+def _inotify_libc():
+    global _libc
+    if _libc is None:
+        _libc = False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            _libc = libc
+        except (OSError, AttributeError):
+            pass
+    return _libc or None
+
+def watch_files(directory, paths):
+    """Obserwator plików w folderze - inotify na Linuksie, odpytywanie gdzie indziej"""
+    if platform.system() == "Linux":
+        libc = _inotify_libc()
+        if libc is not None:
+            try:
+                return InotifyWatcher(directory, paths, libc)
+            except OSError:
+                pass
+    return PollingWatcher(directory, paths)
+
+def _stamp(path):
+    try:
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+    except OSError:
+        return None
+
+class ResultHarvester:
+    """Wykrywa gotowe wyniki zadania zanim proces THERM się zakończy"""
+
+    def __init__(self, thmx_filepath, output_paths, quiet_seconds=QUIET_SECONDS):
+        self.thmx_filepath = thmx_filepath
+        self.quiet_seconds = quiet_seconds
+        # Plik wejściowy z wynikami poprzednich obliczeń - liczy się dopiero jego nowy zapis
+        self._input_stamp = _stamp(thmx_filepath)
+        self.watcher = watch_files(os.path.dirname(thmx_filepath), [thmx_filepath] + list(output_paths))
+        self._written = False
+        self._checked = False
+        self._complete = False
+
+    def rewritten(self):
+        """Czy THERM zapisał plik .thmx od rozpoczęcia obserwacji"""
+        return _stamp(self.thmx_filepath) != self._input_stamp
+
+    def ready(self):
+        """True, gdy plik .thmx zapisano na nowo z sekcją Results i pliki przestały się zmieniać"""
+        if self.watcher.poll():
+            self._written = True
+            self._checked = False
+        if not self._written or self.watcher.quiet_for() < self.quiet_seconds:
+            return False
+        # Koniec pliku czytany raz na każdą serię zmian
+        if not self._checked:
+            self._checked = True
+            self._complete = self.rewritten() and results_written(self.thmx_filepath)
+        return self._complete
+
+    def close(self):
+        self.watcher.close()